@@ -12,14 +12,27 @@ POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "123456")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "chat_rag")
 
-# Connection pool settings
-DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
-DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+# Connection pool settings: one budget split between the checkpointer/store and ORM pools of every worker
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "40"))  # across all API workers; keep below Postgres max_connections
+DB_POOL_SHARES = os.getenv("DB_POOL_SHARES", "checkpoint_async=7,checkpoint_sync=2,orm=3,orm_async=7")  # relative split
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))  # connections each checkpoint pool keeps open
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))  # seconds before idle checkpoint pool connections close
 DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
 DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 30 minutes
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")  # PgBouncer in transaction mode
 DB_CONNECTION_RETRIES = int(os.getenv("DB_CONNECTION_RETRIES", "5"))
 DB_RETRY_DELAY = int(os.getenv("DB_RETRY_DELAY", "5"))  # seconds
 
+# Checkpoint storage settings
+CHECKPOINT_COMPRESSION_THRESHOLD = int(os.getenv("CHECKPOINT_COMPRESSION_THRESHOLD", "1024"))  # bytes, 0 disables
+CHECKPOINT_KEEP_PER_THREAD = int(os.getenv("CHECKPOINT_KEEP_PER_THREAD", "3"))  # latest checkpoints kept by pruning
+CHECKPOINT_MAINTENANCE_INTERVAL = int(os.getenv("CHECKPOINT_MAINTENANCE_INTERVAL", "3600"))  # seconds, 0 disables
+CHECKPOINT_PRUNE_MIN_IDLE = int(os.getenv("CHECKPOINT_PRUNE_MIN_IDLE", "300"))  # seconds since a thread's last checkpoint
+CHECKPOINT_PRUNE_BATCH_SIZE = int(os.getenv("CHECKPOINT_PRUNE_BATCH_SIZE", "100"))  # threads per transaction
+THREAD_TTL = int(os.getenv("THREAD_TTL", "2592000"))  # idle seconds before a thread is archived (30 days), 0 disables
+THREAD_ARCHIVE_BATCH_SIZE = int(os.getenv("THREAD_ARCHIVE_BATCH_SIZE", "50"))  # threads per transaction
+MAINTENANCE_LOCK_TIMEOUT_MS = int(os.getenv("MAINTENANCE_LOCK_TIMEOUT_MS", "2000"))  # a batch gives up on locked rows
+
 # API settings
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "9027"))
@@ -29,10 +42,87 @@ API_WORKERS = int(os.getenv("API_WORKERS", "2"))
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
 LLM_MODEL_LARGE = os.getenv("LLM_MODEL_LARGE", "gpt-4o")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")  # Empty uses the OpenAI default; set for proxies or fake servers
+
+# LLM HTTP client settings (shared keep-alive connection pool)
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))  # seconds
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))  # seconds
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# Conversation history budget (summary + messages sent to the LLM and kept in the checkpoint)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))  # history tokens before compaction
+CONTEXT_KEEP_RECENT_MESSAGES = int(os.getenv("CONTEXT_KEEP_RECENT_MESSAGES", "6"))  # kept verbatim when compacting
+PROMPT_TOKEN_TREND_WINDOW = int(os.getenv("PROMPT_TOKEN_TREND_WINDOW", "20"))  # turns kept per thread
+PROMPT_TOKEN_TREND_MAX_THREADS = int(os.getenv("PROMPT_TOKEN_TREND_MAX_THREADS", "1000"))  # threads tracked per worker
+HISTORY_CACHE_SIZE = int(os.getenv("HISTORY_CACHE_SIZE", "1000"))  # threads whose chat history is cached per worker
+HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", "30"))  # seconds; bounds staleness from other workers' writes
+
+# Embedding settings
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))  # texts per embeddings API call
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))  # concurrent embeddings API calls per document
+
+# Document ingestion settings
+CHUNK_SIZE_TOKENS = int(os.getenv("CHUNK_SIZE_TOKENS", "800"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "100"))
+QDRANT_UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "128"))
+
+# Background ingestion queue settings
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "4"))  # concurrent ingestion jobs per process
+INGESTION_QUEUE_SIZE = int(os.getenv("INGESTION_QUEUE_SIZE", "8"))  # claimed jobs waiting for a worker
+INGESTION_MAX_PENDING = int(os.getenv("INGESTION_MAX_PENDING", "1000"))  # reject bulk uploads beyond this backlog
+INGESTION_MAX_ATTEMPTS = int(os.getenv("INGESTION_MAX_ATTEMPTS", "3"))
+INGESTION_POLL_INTERVAL = float(os.getenv("INGESTION_POLL_INTERVAL", "5"))  # seconds
+INGESTION_STALE_AFTER = int(os.getenv("INGESTION_STALE_AFTER", "900"))  # seconds before a running job is requeued
+INGESTION_STALE_SWEEP_INTERVAL = float(os.getenv("INGESTION_STALE_SWEEP_INTERVAL", "60"))  # seconds
+INGESTION_RETRY_BACKOFF = float(os.getenv("INGESTION_RETRY_BACKOFF", "30"))  # seconds, doubled on each retry
+
+# Embedding cache settings
+EMBEDDING_CACHE_BACKEND = os.getenv("EMBEDDING_CACHE_BACKEND", "postgres")  # "postgres", "disk" or "none"
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "5000"))  # entries in the LRU tier
+EMBEDDING_CACHE_WARMUP_SIZE = int(os.getenv("EMBEDDING_CACHE_WARMUP_SIZE", "500"))  # hottest entries preloaded
+
+# Semantic response cache settings
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")  # "memory" or "postgres"
+RESPONSE_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SIMILARITY_THRESHOLD", "0.95"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "86400"))  # seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_MAX_CANDIDATES = int(os.getenv("RESPONSE_CACHE_MAX_CANDIDATES", "200"))
+
+# Semantic router settings
+SEMANTIC_ROUTER_CACHE_PATH = os.getenv("SEMANTIC_ROUTER_CACHE_PATH", ".cache/route_utterances.npz")
+SEMANTIC_ROUTER_BACKEND = os.getenv("SEMANTIC_ROUTER_BACKEND", "hybrid")  # "local", "encoder" or "hybrid"
+SEMANTIC_ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("SEMANTIC_ROUTER_CONFIDENCE_THRESHOLD", "0.1"))  # local margin
 
 #VECTOR STORE
 QDRANT_URL = os.getenv("QDRANT_URL", "https://your-qdrant-url")  # Reemplázalo con tu URL real
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", "")  # Asegúrate de que esté en tu .env
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() in ("1", "true", "yes")
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+
+# Routing / geocoding settings
+MAPBOX_BASE_URL = os.getenv("MAPBOX_BASE_URL", "https://api.mapbox.com")
+ROUTING_TIMEOUT = float(os.getenv("ROUTING_TIMEOUT", "10"))  # seconds
+ROUTING_MAX_CONNECTIONS = int(os.getenv("ROUTING_MAX_CONNECTIONS", "20"))
+ROUTING_MAX_CONCURRENCY = int(os.getenv("ROUTING_MAX_CONCURRENCY", "8"))  # in-flight per-plant requests
+ROAD_DISTANCE_FACTOR = float(os.getenv("ROAD_DISTANCE_FACTOR", "1.3"))  # road km per great-circle km
+AVERAGE_DRIVING_SPEED_KMH = float(os.getenv("AVERAGE_DRIVING_SPEED_KMH", "25"))  # Lima traffic
+ROUTING_TOP_K = int(os.getenv("ROUTING_TOP_K", "4"))  # nearest plants (great-circle) sent to the routing API
+LOCATION_OFFLINE_MODE = os.getenv("LOCATION_OFFLINE_MODE", "false").lower() in ("1", "true", "yes")
+GEOCODE_CACHE_MEMORY_SIZE = int(os.getenv("GEOCODE_CACHE_MEMORY_SIZE", "1024"))  # entries in the LRU tier
+GEOCODE_CACHE_TTL = int(os.getenv("GEOCODE_CACHE_TTL", "2592000"))  # seconds (30 days)
+GEOCODE_CACHE_NEGATIVE_TTL = int(os.getenv("GEOCODE_CACHE_NEGATIVE_TTL", "3600"))  # seconds, for failed lookups
+DISTRICT_MATRIX_PATH = os.getenv("DISTRICT_MATRIX_PATH", ".cache/district_matrix.npz")
+DISTRICT_MATRIX_REFRESH_INTERVAL = int(os.getenv("DISTRICT_MATRIX_REFRESH_INTERVAL", "604800"))  # seconds, 0 disables
+DISTRICT_MATRIX_MATCH_RADIUS_KM = float(os.getenv("DISTRICT_MATRIX_MATCH_RADIUS_KM", "0.05"))  # origin to district point
+LOCATION_PROVIDERS = os.getenv("LOCATION_PROVIDERS", "mapbox,google")  # preference order for failover
+LOCATION_PROVIDER_SLOW_THRESHOLD = float(os.getenv("LOCATION_PROVIDER_SLOW_THRESHOLD", "3"))  # seconds
+LOCATION_PROVIDER_COOLDOWN = float(os.getenv("LOCATION_PROVIDER_COOLDOWN", "60"))  # seconds a degraded provider is skipped
+GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
 
 # Google Drive settings
 GOOGLE_APPLICATION_CREDENTIALS = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
@@ -47,8 +137,8 @@ def get_sync_connection_string() -> str:
     return f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
 def get_async_connection_string() -> str:
-    """Build the PostgreSQL connection string for asynchronous connections."""
-    return f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    """Build the SQLAlchemy URL (psycopg 3 driver, used by both the sync and async engines)."""
+    return f"postgresql+psycopg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
 # Connection strings as properties
 postgresql_connection_string = get_sync_connection_string()
@@ -0,0 +1,525 @@
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from psycopg import errors
+from psycopg.types.json import Jsonb
+
+from app.config.settings import (
+    CHECKPOINT_KEEP_PER_THREAD,
+    CHECKPOINT_MAINTENANCE_INTERVAL,
+    CHECKPOINT_PRUNE_MIN_IDLE,
+    CHECKPOINT_PRUNE_BATCH_SIZE,
+    THREAD_TTL,
+    THREAD_ARCHIVE_BATCH_SIZE,
+    MAINTENANCE_LOCK_TIMEOUT_MS
+)
+from app.database.pool import connect_dedicated, get_async_connection_pool
+from app.database.postgres import get_connection_pool
+from app.util.metrics import Counters
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_TABLES = ["checkpoints", "checkpoint_blobs", "checkpoint_writes", "checkpoint_archive"]
+# pg_try_advisory_xact_lock key: only one worker runs maintenance at a time
+MAINTENANCE_LOCK_KEY = 7_402_118
+
+# Threads with more checkpoints than kept, idle long enough that no turn is writing to them
+_PRUNABLE_THREADS_SQL = """
+SELECT thread_id
+FROM checkpoints
+WHERE thread_id > %(after)s
+GROUP BY thread_id
+HAVING count(*) > %(keep)s
+   AND max((checkpoint ->> 'ts')::timestamptz) < now() - make_interval(secs => %(min_idle)s)
+ORDER BY thread_id
+LIMIT %(limit)s
+"""
+
+# Superseded checkpoints: all but the latest `keep` per thread and namespace (IDs are time-ordered)
+_DELETE_CHECKPOINTS_SQL = """
+WITH ranked AS (
+    SELECT thread_id, checkpoint_ns, checkpoint_id,
+           row_number() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS position
+    FROM checkpoints
+    WHERE thread_id = ANY(%(threads)s)
+)
+DELETE FROM checkpoints c
+USING ranked r
+WHERE c.thread_id = r.thread_id
+  AND c.checkpoint_ns = r.checkpoint_ns
+  AND c.checkpoint_id = r.checkpoint_id
+  AND r.position > %(keep)s
+"""
+
+# Pending writes of checkpoints that no longer exist
+_DELETE_WRITES_SQL = """
+DELETE FROM checkpoint_writes w
+WHERE w.thread_id = ANY(%(threads)s)
+  AND NOT EXISTS (
+      SELECT 1 FROM checkpoints c
+      WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns AND c.checkpoint_id = w.checkpoint_id
+  )
+"""
+
+# Channel values no remaining checkpoint points to
+_DELETE_BLOBS_SQL = """
+DELETE FROM checkpoint_blobs b
+WHERE b.thread_id = ANY(%(threads)s)
+  AND NOT EXISTS (
+      SELECT 1 FROM checkpoints c
+      WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+        AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version
+  )
+"""
+
+# Stored bytes per thread across the three checkpoint tables
+_THREAD_SIZES_SQL = """
+WITH c AS (
+    SELECT thread_id, count(*) AS checkpoints,
+           sum(pg_column_size(checkpoint) + pg_column_size(metadata)) AS checkpoint_bytes
+    FROM checkpoints {where} GROUP BY thread_id
+), b AS (
+    SELECT thread_id, count(*) AS blobs, sum(coalesce(pg_column_size(blob), 0)) AS blob_bytes
+    FROM checkpoint_blobs {where} GROUP BY thread_id
+), w AS (
+    SELECT thread_id, count(*) AS writes, sum(coalesce(pg_column_size(blob), 0)) AS write_bytes
+    FROM checkpoint_writes {where} GROUP BY thread_id
+)
+SELECT c.thread_id, c.checkpoints, coalesce(b.blobs, 0) AS blobs, coalesce(w.writes, 0) AS writes,
+       c.checkpoint_bytes + coalesce(b.blob_bytes, 0) + coalesce(w.write_bytes, 0) AS total_bytes
+FROM c LEFT JOIN b USING (thread_id) LEFT JOIN w USING (thread_id)
+ORDER BY total_bytes DESC
+LIMIT %(limit)s
+"""
+
+# Threads whose last checkpoint is older than the TTL
+_EXPIRED_THREADS_SQL = """
+SELECT thread_id, count(*) AS checkpoints, max((checkpoint ->> 'ts')::timestamptz) AS last_checkpoint_at
+FROM checkpoints
+WHERE thread_id > %(after)s
+GROUP BY thread_id
+HAVING max((checkpoint ->> 'ts')::timestamptz) < now() - make_interval(secs => %(ttl)s)
+ORDER BY thread_id
+LIMIT %(limit)s
+"""
+
+# Latest checkpoint per thread and namespace, which is all an archived thread keeps
+_LATEST_CHECKPOINTS_SQL = """
+SELECT DISTINCT ON (thread_id, checkpoint_ns)
+       thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata
+FROM checkpoints
+WHERE thread_id = ANY(%(threads)s)
+ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC
+"""
+
+_LATEST_BLOBS_SQL = """
+WITH latest AS (""" + _LATEST_CHECKPOINTS_SQL + """)
+SELECT b.thread_id, b.checkpoint_ns, b.channel, b.version, b.type, b.blob
+FROM checkpoint_blobs b
+JOIN latest l ON l.thread_id = b.thread_id AND l.checkpoint_ns = b.checkpoint_ns
+             AND l.checkpoint -> 'channel_versions' ->> b.channel = b.version
+"""
+
+_LATEST_WRITES_SQL = """
+WITH latest AS (""" + _LATEST_CHECKPOINTS_SQL + """)
+SELECT w.thread_id, w.checkpoint_ns, w.checkpoint_id, w.task_id, w.idx, w.channel, w.type, w.blob
+FROM checkpoint_writes w
+JOIN latest l ON l.thread_id = w.thread_id AND l.checkpoint_ns = w.checkpoint_ns AND l.checkpoint_id = w.checkpoint_id
+"""
+
+_INSERT_ARCHIVE_SQL = """
+INSERT INTO checkpoint_archive (thread_id, last_checkpoint_at, checkpoints, payload, created_at, updated_at)
+VALUES (%(thread_id)s, %(last_checkpoint_at)s, %(checkpoints)s, %(payload)s, now(), now())
+ON CONFLICT (thread_id) DO UPDATE
+SET last_checkpoint_at = EXCLUDED.last_checkpoint_at, checkpoints = EXCLUDED.checkpoints,
+    payload = EXCLUDED.payload, updated_at = now()
+"""
+
+_DELETE_THREADS_SQL = [
+    "DELETE FROM checkpoint_writes WHERE thread_id = ANY(%(threads)s)",
+    "DELETE FROM checkpoint_blobs WHERE thread_id = ANY(%(threads)s)",
+    "DELETE FROM checkpoints WHERE thread_id = ANY(%(threads)s)",
+]
+
+# Size on disk (with indexes and TOAST) and planner row estimate; no table scans
+_TABLE_STATS_SQL = """
+SELECT c.relname AS table_name, pg_total_relation_size(c.oid) AS total_bytes,
+       greatest(c.reltuples, 0)::bigint AS estimated_rows
+FROM pg_class c
+WHERE c.relname = ANY(%(tables)s) AND c.relkind = 'r' AND pg_table_is_visible(c.oid)
+"""
+
+_maintenance_counters = Counters("runs", "skipped_runs", "failures", "threads_pruned", "checkpoints_deleted",
+                                 "writes_deleted", "blobs_deleted", "threads_archived", "threads_restored",
+                                 "batches_lock_timeout")
+_maintenance_task: Optional[asyncio.Task] = None
+# Checkpoint table sizes as of the last maintenance run
+_table_stats: Dict[str, Any] = {}
+
+
+def thread_sizes(limit: int = 20, thread_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Stored checkpoint bytes per thread, largest first.
+
+    Args:
+        limit: Maximum threads to return
+        thread_ids: Only report these threads
+
+    Returns:
+        Rows with thread_id, checkpoints, blobs, writes and total_bytes
+    """
+    where = "WHERE thread_id = ANY(%(threads)s)" if thread_ids is not None else ""
+    with get_connection_pool().connection() as conn:
+        rows = conn.execute(_THREAD_SIZES_SQL.format(where=where),
+                            {"threads": thread_ids, "limit": limit}).fetchall()
+    return [dict(row) for row in rows]
+
+
+def prune_threads(thread_ids: List[str], keep: int = CHECKPOINT_KEEP_PER_THREAD) -> Dict[str, int]:
+    """
+    Delete the superseded checkpoints of the given threads, with their pending writes and unreferenced blobs.
+
+    Runs in one transaction that gives up on rows locked by a live turn; the
+    latest `keep` checkpoints of each thread stay loadable (with their pending
+    writes, so interrupted threads can resume).
+
+    Returns:
+        Rows deleted per table
+    """
+    params = {"threads": thread_ids, "keep": keep}
+    with get_connection_pool().connection() as conn:
+        with conn.transaction():
+            conn.execute("SELECT set_config('lock_timeout', %s, true)", (f"{MAINTENANCE_LOCK_TIMEOUT_MS}ms",))
+            checkpoints = conn.execute(_DELETE_CHECKPOINTS_SQL, params).rowcount
+            writes = conn.execute(_DELETE_WRITES_SQL, params).rowcount
+            blobs = conn.execute(_DELETE_BLOBS_SQL, params).rowcount
+    return {"checkpoints_deleted": checkpoints, "writes_deleted": writes, "blobs_deleted": blobs}
+
+
+def prune_checkpoints(keep: int = CHECKPOINT_KEEP_PER_THREAD, min_idle: int = CHECKPOINT_PRUNE_MIN_IDLE,
+                      batch_size: int = CHECKPOINT_PRUNE_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Apply the retention policy to every idle thread, batch_size threads per transaction.
+
+    Threads written to in the last min_idle seconds are skipped so pruning
+    never races a turn that is still saving its checkpoint.
+
+    Returns:
+        Threads pruned and rows deleted per table
+    """
+    totals = {"threads_pruned": 0, "checkpoints_deleted": 0, "writes_deleted": 0, "blobs_deleted": 0}
+    after = ""
+    while True:
+        with get_connection_pool().connection() as conn:
+            rows = conn.execute(_PRUNABLE_THREADS_SQL, {
+                "after": after, "keep": keep, "min_idle": min_idle, "limit": batch_size
+            }).fetchall()
+        if not rows:
+            break
+
+        thread_ids = [row["thread_id"] for row in rows]
+        after = thread_ids[-1]
+        try:
+            deleted = prune_threads(thread_ids, keep)
+        except errors.LockNotAvailable:
+            _maintenance_counters.increment("batches_lock_timeout")
+            logger.warning(f"Skipping {len(thread_ids)} threads to prune: rows are locked")
+            continue
+
+        totals["threads_pruned"] += len(thread_ids)
+        for name, count in deleted.items():
+            totals[name] += count
+
+    for name, count in totals.items():
+        _maintenance_counters.increment(name, count)
+    return totals
+
+
+def _archive_payloads(conn, thread_ids: List[str]) -> Dict[str, bytes]:
+    """Pack each thread's latest checkpoints, with their blobs and pending writes, as compressed JSON."""
+    params = {"threads": thread_ids}
+    threads: Dict[str, Dict[str, List[Dict[str, Any]]]] = defaultdict(
+        lambda: {"checkpoints": [], "blobs": [], "writes": []}
+    )
+    for row in conn.execute(_LATEST_CHECKPOINTS_SQL, params).fetchall():
+        threads[row["thread_id"]]["checkpoints"].append(dict(row))
+    for row in conn.execute(_LATEST_BLOBS_SQL, params).fetchall():
+        threads[row["thread_id"]]["blobs"].append(dict(row))
+    for row in conn.execute(_LATEST_WRITES_SQL, params).fetchall():
+        threads[row["thread_id"]]["writes"].append(dict(row))
+
+    def encode(value: Any) -> Any:
+        if isinstance(value, (bytes, memoryview)):
+            return base64.b64encode(bytes(value)).decode("ascii")
+        raise TypeError(f"Unexpected archive value: {type(value)}")
+
+    return {
+        thread_id: zlib.compress(json.dumps(rows, default=encode).encode("utf-8"))
+        for thread_id, rows in threads.items()
+    }
+
+
+def archive_threads(threads: List[Dict[str, Any]]) -> int:
+    """
+    Move threads to checkpoint_archive and delete them from the checkpoint tables, in one transaction.
+
+    The transaction gives up after MAINTENANCE_LOCK_TIMEOUT_MS on rows locked
+    by a live turn instead of queueing behind it.
+
+    Args:
+        threads: Rows with thread_id, checkpoints and last_checkpoint_at
+
+    Returns:
+        Threads archived
+    """
+    thread_ids = [thread["thread_id"] for thread in threads]
+    with get_connection_pool().connection() as conn:
+        with conn.transaction():
+            conn.execute("SELECT set_config('lock_timeout', %s, true)", (f"{MAINTENANCE_LOCK_TIMEOUT_MS}ms",))
+            payloads = _archive_payloads(conn, thread_ids)
+            with conn.cursor() as cursor:
+                cursor.executemany(_INSERT_ARCHIVE_SQL, [
+                    {**thread, "payload": payloads[thread["thread_id"]]}
+                    for thread in threads if thread["thread_id"] in payloads
+                ])
+            for statement in _DELETE_THREADS_SQL:
+                conn.execute(statement, {"threads": thread_ids})
+    return len(payloads)
+
+
+def archive_expired_threads(ttl: int = THREAD_TTL, batch_size: int = THREAD_ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Archive every thread idle for longer than the TTL, batch_size threads per transaction.
+
+    Returns:
+        Threads archived
+    """
+    archived, after = 0, ""
+    while True:
+        with get_connection_pool().connection() as conn:
+            threads = [dict(row) for row in conn.execute(_EXPIRED_THREADS_SQL, {
+                "after": after, "ttl": ttl, "limit": batch_size
+            }).fetchall()]
+        if not threads:
+            break
+
+        try:
+            archived += archive_threads(threads)
+        except errors.LockNotAvailable:
+            # Some row is in use; these threads are retried on the next run
+            _maintenance_counters.increment("batches_lock_timeout")
+            logger.warning(f"Skipping {len(threads)} threads to archive: rows are locked")
+        after = threads[-1]["thread_id"]
+
+    _maintenance_counters.increment("threads_archived", archived)
+    return archived
+
+
+async def is_archived(thread_id: str) -> bool:
+    """
+    Whether a thread is in checkpoint_archive. A primary key lookup on the async
+    pool, so the chat path doesn't wait behind maintenance for the sync pool.
+    """
+    pool = await get_async_connection_pool()
+    async with pool.connection() as conn:
+        cursor = await conn.execute("SELECT 1 FROM checkpoint_archive WHERE thread_id = %s", (thread_id,))
+        return await cursor.fetchone() is not None
+
+
+def restore_thread(thread_id: str) -> bool:
+    """
+    Put an archived thread back into the checkpoint tables (its latest checkpoint only).
+
+    Called by the chat service before a thread is used, so users coming back
+    after THREAD_TTL find their conversation; the CLI can also restore threads.
+    The restored checkpoint's ts is set to the restore time, so the next
+    maintenance run doesn't archive the thread again right away.
+
+    Returns:
+        False if the thread isn't archived
+    """
+    restored_at = datetime.now(timezone.utc).isoformat()
+    with get_connection_pool().connection() as conn:
+        with conn.transaction():
+            row = conn.execute("SELECT payload FROM checkpoint_archive WHERE thread_id = %s FOR UPDATE",
+                               (thread_id,)).fetchone()
+            if row is None:
+                return False
+
+            data = json.loads(zlib.decompress(row["payload"]))
+            with conn.cursor() as cursor:
+                cursor.executemany(
+                    "INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, "
+                    "checkpoint, metadata) VALUES (%(thread_id)s, %(checkpoint_ns)s, %(checkpoint_id)s, "
+                    "%(parent_checkpoint_id)s, %(type)s, %(checkpoint)s, %(metadata)s) ON CONFLICT DO NOTHING",
+                    [{**checkpoint, "checkpoint": Jsonb({**checkpoint["checkpoint"], "ts": restored_at}),
+                      "metadata": Jsonb(checkpoint["metadata"])}
+                     for checkpoint in data["checkpoints"]]
+                )
+                cursor.executemany(
+                    "INSERT INTO checkpoint_blobs (thread_id, checkpoint_ns, channel, version, type, blob) "
+                    "VALUES (%(thread_id)s, %(checkpoint_ns)s, %(channel)s, %(version)s, %(type)s, %(blob)s) "
+                    "ON CONFLICT DO NOTHING",
+                    [{**blob, "blob": base64.b64decode(blob["blob"]) if blob["blob"] is not None else None}
+                     for blob in data["blobs"]]
+                )
+                cursor.executemany(
+                    "INSERT INTO checkpoint_writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, "
+                    "type, blob) VALUES (%(thread_id)s, %(checkpoint_ns)s, %(checkpoint_id)s, %(task_id)s, %(idx)s, "
+                    "%(channel)s, %(type)s, %(blob)s) ON CONFLICT DO NOTHING",
+                    [{**write, "blob": base64.b64decode(write["blob"])} for write in data["writes"]]
+                )
+            conn.execute("DELETE FROM checkpoint_archive WHERE thread_id = %s", (thread_id,))
+    _maintenance_counters.increment("threads_restored")
+    return True
+
+
+def refresh_table_stats() -> Dict[str, Any]:
+    """Read the size and estimated row count of the checkpoint tables."""
+    global _table_stats
+
+    with get_connection_pool().connection() as conn:
+        rows = conn.execute(_TABLE_STATS_SQL, {"tables": CHECKPOINT_TABLES}).fetchall()
+    _table_stats = {
+        "tables": {row["table_name"]: {"total_bytes": row["total_bytes"], "estimated_rows": row["estimated_rows"]}
+                   for row in rows},
+        "measured_at": time.time()
+    }
+    return _table_stats
+
+
+def run_maintenance() -> Optional[Dict[str, int]]:
+    """
+    One maintenance pass: archive expired threads, prune the rest, refresh table stats.
+
+    Returns:
+        What was done, or None if another worker holds the maintenance lock
+    """
+    # Transaction-scoped lock: also held correctly behind PgBouncer in transaction mode,
+    # where a session lock could be taken and released on different server connections.
+    # The lock connection is dedicated so the batches below don't compete with it for the pool.
+    with connect_dedicated() as lock_conn, lock_conn.transaction():
+        locked = lock_conn.execute("SELECT pg_try_advisory_xact_lock(%s) AS locked",
+                                   (MAINTENANCE_LOCK_KEY,)).fetchone()
+        if not locked["locked"]:
+            _maintenance_counters.increment("skipped_runs")
+            return None
+
+        archived = archive_expired_threads() if THREAD_TTL > 0 else 0
+        totals = {"threads_archived": archived, **prune_checkpoints()}
+        refresh_table_stats()
+        return totals
+
+
+async def _maintain_periodically(interval: int) -> None:
+    """Run maintenance every interval seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            totals = await asyncio.to_thread(run_maintenance)
+            _maintenance_counters.increment("runs")
+            if totals is not None:
+                logger.info(f"Checkpoint maintenance: {totals}")
+        except Exception as e:
+            _maintenance_counters.increment("failures")
+            logger.error(f"Error in checkpoint maintenance: {str(e)}")
+
+
+async def start_checkpoint_maintenance(interval: int = CHECKPOINT_MAINTENANCE_INTERVAL) -> None:
+    """
+    Schedule checkpoint archival and pruning.
+    Called on application startup.
+    """
+    global _maintenance_task
+
+    if interval <= 0 or _maintenance_task is not None:
+        return
+    _maintenance_task = asyncio.create_task(_maintain_periodically(interval), name="checkpoint-maintenance")
+
+
+async def stop_checkpoint_maintenance() -> None:
+    """
+    Cancel the scheduled maintenance.
+    Called on application shutdown.
+    """
+    global _maintenance_task
+
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+        await asyncio.gather(_maintenance_task, return_exceptions=True)
+        _maintenance_task = None
+
+
+def get_checkpoint_maintenance_metrics() -> Dict[str, Any]:
+    """Return maintenance counters and the checkpoint table sizes from the last run."""
+    return {**_maintenance_counters.snapshot(), "table_stats": _table_stats}
+
+
+def _print_sizes(rows: List[Dict[str, Any]], before: Optional[Dict[str, int]] = None) -> None:
+    header = ["thread_id", "checkpoints", "blobs", "writes", "bytes"] + (["bytes_before"] if before else [])
+    print("\t".join(header))
+    for row in rows:
+        values = [row["thread_id"], row["checkpoints"], row["blobs"], row["writes"], row["total_bytes"]]
+        if before:
+            values.append(before.get(row["thread_id"], ""))
+        print("\t".join(str(value) for value in values))
+
+
+def main() -> None:
+    """Report checkpoint bytes per thread, prune superseded checkpoints, archive and restore threads."""
+    parser = argparse.ArgumentParser(description="Checkpoint size report, pruning and thread archival")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    report_parser = subparsers.add_parser("report", help="Show the largest threads")
+    report_parser.add_argument("--limit", type=int, default=20, help="Threads to show")
+
+    prune_parser = subparsers.add_parser("prune", help="Prune idle threads and show bytes before and after")
+    prune_parser.add_argument("--keep", type=int, default=CHECKPOINT_KEEP_PER_THREAD, help="Checkpoints kept per thread")
+    prune_parser.add_argument("--min-idle", type=int, default=CHECKPOINT_PRUNE_MIN_IDLE,
+                              help="Skip threads written to in the last N seconds")
+    prune_parser.add_argument("--limit", type=int, default=20, help="Threads to show")
+
+    archive_parser = subparsers.add_parser("archive", help="Archive threads idle for longer than the TTL")
+    archive_parser.add_argument("--ttl", type=int, default=THREAD_TTL, help="Idle seconds before a thread is archived")
+
+    restore_parser = subparsers.add_parser("restore", help="Put an archived thread back")
+    restore_parser.add_argument("thread_id")
+
+    subparsers.add_parser("stats", help="Show checkpoint table sizes")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        _print_sizes(thread_sizes(args.limit))
+        return
+    if args.command == "archive":
+        print(f"Archived {archive_expired_threads(ttl=args.ttl)} threads")
+        return
+    if args.command == "restore":
+        print("Restored" if restore_thread(args.thread_id) else f"Thread {args.thread_id} is not archived")
+        return
+    if args.command == "stats":
+        for table, stats in refresh_table_stats()["tables"].items():
+            print(f"{table}\t{stats['total_bytes']} bytes\t~{stats['estimated_rows']} rows")
+        return
+
+    before_rows = thread_sizes(args.limit)
+    totals = prune_checkpoints(keep=args.keep, min_idle=args.min_idle)
+    after_rows = thread_sizes(args.limit, thread_ids=[row["thread_id"] for row in before_rows])
+    _print_sizes(after_rows, before={row["thread_id"]: row["total_bytes"] for row in before_rows})
+    print(f"Pruned {totals['threads_pruned']} threads: {totals['checkpoints_deleted']} checkpoints, "
+          f"{totals['writes_deleted']} writes, {totals['blobs_deleted']} blobs deleted; "
+          f"{sum(row['total_bytes'] for row in before_rows) - sum(row['total_bytes'] for row in after_rows)} "
+          f"bytes freed in the threads shown")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
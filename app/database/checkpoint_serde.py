@@ -0,0 +1,70 @@
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from app.config.settings import CHECKPOINT_COMPRESSION_THRESHOLD
+from app.util.metrics import Counters
+
+COMPRESSED_SUFFIX = "+zlib"
+COMPRESSION_LEVEL = 6
+
+
+class CompactingSerializer(SerializerProtocol):
+    """
+    Checkpoint serializer that zlib-compresses large channel blobs and pending writes.
+
+    Compressed payloads are tagged by appending "+zlib" to the serialized type
+    stored next to the blob, so existing uncompressed rows still load.
+    """
+
+    def __init__(self, serde: Optional[SerializerProtocol] = None,
+                 threshold: int = CHECKPOINT_COMPRESSION_THRESHOLD):
+        """
+        Args:
+            serde: Serializer producing the payloads (LangGraph's default if None)
+            threshold: Minimum payload size in bytes to compress; 0 disables compression
+        """
+        self.serde = serde or JsonPlusSerializer()
+        self.threshold = threshold
+        self.metrics = Counters("compressed", "uncompressed", "bytes_before", "bytes_after")
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.serde.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.serde.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        if self.threshold and len(data) >= self.threshold:
+            compressed = zlib.compress(data, COMPRESSION_LEVEL)
+            if len(compressed) < len(data):
+                self.metrics.increment("compressed")
+                self.metrics.increment("bytes_before", len(data))
+                self.metrics.increment("bytes_after", len(compressed))
+                return f"{type_}{COMPRESSED_SUFFIX}", compressed
+
+        self.metrics.increment("uncompressed")
+        return type_, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(COMPRESSED_SUFFIX):
+            return self.serde.loads_typed((type_[:-len(COMPRESSED_SUFFIX)], zlib.decompress(payload)))
+        return self.serde.loads_typed(data)
+
+
+# Singleton instance, shared by the sync and async savers
+_checkpoint_serializer = CompactingSerializer()
+
+
+def get_checkpoint_serializer() -> CompactingSerializer:
+    """Get the process-wide checkpoint serializer."""
+    return _checkpoint_serializer
+
+
+def get_checkpoint_serializer_metrics() -> Dict[str, int]:
+    """Return how many payloads were compressed and the bytes saved."""
+    return _checkpoint_serializer.metrics.snapshot()
@@ -1,80 +1,44 @@
 import logging
-from sqlalchemy import create_engine
+from typing import Callable, Optional
+
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config.settings import (
-    postgresql_connection_string,
-    postgresql_async_connection_string,
-    DB_POOL_SIZE,
-    DB_MAX_OVERFLOW,
-    DB_POOL_TIMEOUT,
-    DB_POOL_RECYCLE
-)
+# Engines are created lazily by the shared pooling layer; re-exported here for existing callers
+from app.database.pool import get_engine, get_async_engine
 
 logger = logging.getLogger(__name__)
 
-# Global engine instances
-_sync_engine = None
-_async_engine = None
-
-
-def get_engine():
-    """
-    Get or create the SQLAlchemy engine for synchronous operations.
-    Uses a singleton pattern to ensure only one engine exists.
-    """
-    global _sync_engine
-
-    if _sync_engine is None:
-        logger.info("Creating SQLAlchemy sync engine")
-        _sync_engine = create_engine(
-            postgresql_connection_string,
-            poolclass=QueuePool,
-            pool_size=DB_POOL_SIZE,
-            max_overflow=DB_MAX_OVERFLOW,
-            pool_timeout=DB_POOL_TIMEOUT,
-            pool_recycle=DB_POOL_RECYCLE,
-            pool_pre_ping=True  # Verify connection is still alive before using
-        )
 
-    return _sync_engine
-
-
-def get_async_engine():
+class _LazySessionmaker:
     """
-    Get or create the SQLAlchemy engine for asynchronous operations.
-    Uses a singleton pattern to ensure only one engine exists.
+    Session factory bound to its engine on first call, so importing this module
+    doesn't open a pool for processes that never use the ORM.
     """
-    global _async_engine
 
-    if _async_engine is None:
-        logger.info("Creating SQLAlchemy async engine")
-        _async_engine = create_async_engine(
-            postgresql_async_connection_string,
-            pool_size=DB_POOL_SIZE,
-            max_overflow=DB_MAX_OVERFLOW,
-            pool_timeout=DB_POOL_TIMEOUT,
-            pool_recycle=DB_POOL_RECYCLE,
-            pool_pre_ping=True  # Verify connection is still alive before using
-        )
+    def __init__(self, engine_factory: Callable, **kwargs):
+        self._engine_factory = engine_factory
+        self._kwargs = kwargs
+        self._factory: Optional[sessionmaker] = None
 
-    return _async_engine
+    def __call__(self, **kwargs):
+        if self._factory is None:
+            self._factory = sessionmaker(bind=self._engine_factory(), **self._kwargs)
+        return self._factory(**kwargs)
 
 
 # Create session factories
-SessionLocal = sessionmaker(
+SessionLocal = _LazySessionmaker(
+    get_engine,
     autocommit=False,
-    autoflush=False,
-    bind=get_engine()
+    autoflush=False
 )
 
-AsyncSessionLocal = sessionmaker(
+AsyncSessionLocal = _LazySessionmaker(
+    get_async_engine,
     class_=AsyncSession,
     autocommit=False,
-    autoflush=False,
-    bind=get_async_engine()
+    autoflush=False
 )
 
 
@@ -97,33 +61,3 @@ async def get_async_db():
     """
     async with AsyncSessionLocal() as session:
         yield session
-
-
-def close_connections():
-    """Close all database connections on application shutdown."""
-    _sync_engine = get_engine()
-    _async_engine = get_async_engine()
-    if _sync_engine:
-        _sync_engine.dispose()
-        logger.info("Synchronous database connections closed")
-
-        # Para el motor asíncrono, no podemos usar await directamente aquí
-        # ya que esta función no es asíncrona
-    if _async_engine:
-        # Programamos la tarea para que se ejecute
-        import asyncio
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                loop.create_task(_async_engine.dispose())
-            else:
-                # Si no hay un bucle en ejecución, creamos uno temporal
-                asyncio.run(_async_engine.dispose())
-        except Exception as e:
-            logger.error(f"Error closing async engine: {str(e)}")
-
-        logger.info("Asynchronous database connections scheduled for closure")
-
-        # Reseteamos las referencias
-    _sync_engine = None
-    _async_engine = None
\ No newline at end of file
@@ -1,6 +1,6 @@
 import logging
 import time
-from psycopg2 import connect, sql
+from psycopg import connect, sql
 from app.config.settings import (
     POSTGRES_HOST,
     POSTGRES_PORT,
@@ -28,9 +28,9 @@ def create_database_if_not_exists():
                 user=POSTGRES_USER,
                 password=POSTGRES_PASSWORD,
                 host=POSTGRES_HOST,
-                port=POSTGRES_PORT
+                port=POSTGRES_PORT,
+                autocommit=True  # CREATE DATABASE can't run inside a transaction
             )
-            conn.autocommit = True
             cursor = conn.cursor()
 
             # Check if database exists
@@ -69,6 +69,7 @@ def init_db():
     """
     from app.database.base import Base
     from app.database.engine import get_engine
+    import app.database.models  # noqa: F401 - registers the models on Base.metadata
 
     try:
         # Ensure database exists
@@ -0,0 +1,138 @@
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple
+
+from app.util.metrics import Counters, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint operations counted by InstrumentedCheckpointer (sync and async alike)
+_checkpoint_counters = Counters("reads", "lists", "writes", "write_batches", "deletes")
+_checkpoint_latency = {"read": Histogram(), "write": Histogram(), "write_batch": Histogram()}
+# Called with the thread ID after each checkpoint this process writes
+_write_listeners: List[Callable[[str], None]] = []
+
+
+def on_checkpoint_write(listener: Callable[[str], None]) -> None:
+    """Register a function called with the thread ID whenever a checkpoint of that thread is written."""
+    _write_listeners.append(listener)
+
+
+def _notify_write(config: RunnableConfig) -> None:
+    thread_id = config.get("configurable", {}).get("thread_id")
+    if thread_id is None:
+        return
+    for listener in _write_listeners:
+        try:
+            listener(thread_id)
+        except Exception as e:
+            logger.error(f"Checkpoint write listener failed: {str(e)}")
+
+
+class InstrumentedCheckpointer(BaseCheckpointSaver):
+    """
+    Checkpointer proxy that counts and times the reads and writes of the saver it wraps.
+
+    Every graph step, get_state and update_state goes through the checkpointer,
+    so these counters show how many checkpoint round-trips a chat turn costs.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+
+    @property
+    def config_specs(self) -> list:
+        return self.saver.config_specs
+
+    def __getattr__(self, name: str) -> Any:
+        # Saver-specific API (setup, pool access, ...) is passed through
+        if name == "saver":
+            raise AttributeError(name)
+        return getattr(self.saver, name)
+
+    def get_next_version(self, current: Optional[Any], channel: Any) -> Any:
+        return self.saver.get_next_version(current, channel)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        start = time.perf_counter()
+        try:
+            return self.saver.get_tuple(config)
+        finally:
+            _checkpoint_counters.increment("reads")
+            _checkpoint_latency["read"].observe(time.perf_counter() - start)
+
+    def list(self, config: Optional[RunnableConfig], **kwargs: Any) -> Iterator[CheckpointTuple]:
+        _checkpoint_counters.increment("lists")
+        return self.saver.list(config, **kwargs)
+
+    def put(self, config: RunnableConfig, checkpoint: Any, metadata: Any, new_versions: Any) -> RunnableConfig:
+        start = time.perf_counter()
+        try:
+            return self.saver.put(config, checkpoint, metadata, new_versions)
+        finally:
+            _checkpoint_counters.increment("writes")
+            _checkpoint_latency["write"].observe(time.perf_counter() - start)
+            _notify_write(config)
+
+    def put_writes(self, config: RunnableConfig, writes: Any, task_id: str, *args: Any, **kwargs: Any) -> None:
+        start = time.perf_counter()
+        try:
+            return self.saver.put_writes(config, writes, task_id, *args, **kwargs)
+        finally:
+            _checkpoint_counters.increment("write_batches")
+            _checkpoint_latency["write_batch"].observe(time.perf_counter() - start)
+
+    def delete_thread(self, thread_id: str) -> None:
+        _checkpoint_counters.increment("deletes")
+        self.saver.delete_thread(thread_id)
+        for listener in _write_listeners:
+            listener(thread_id)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        start = time.perf_counter()
+        try:
+            return await self.saver.aget_tuple(config)
+        finally:
+            _checkpoint_counters.increment("reads")
+            _checkpoint_latency["read"].observe(time.perf_counter() - start)
+
+    async def alist(self, config: Optional[RunnableConfig], **kwargs: Any) -> AsyncIterator[CheckpointTuple]:
+        _checkpoint_counters.increment("lists")
+        async for checkpoint_tuple in self.saver.alist(config, **kwargs):
+            yield checkpoint_tuple
+
+    async def aput(self, config: RunnableConfig, checkpoint: Any, metadata: Any, new_versions: Any) -> RunnableConfig:
+        start = time.perf_counter()
+        try:
+            return await self.saver.aput(config, checkpoint, metadata, new_versions)
+        finally:
+            _checkpoint_counters.increment("writes")
+            _checkpoint_latency["write"].observe(time.perf_counter() - start)
+            _notify_write(config)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Any, task_id: str, *args: Any, **kwargs: Any) -> None:
+        start = time.perf_counter()
+        try:
+            return await self.saver.aput_writes(config, writes, task_id, *args, **kwargs)
+        finally:
+            _checkpoint_counters.increment("write_batches")
+            _checkpoint_latency["write_batch"].observe(time.perf_counter() - start)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        _checkpoint_counters.increment("deletes")
+        await self.saver.adelete_thread(thread_id)
+        for listener in _write_listeners:
+            listener(thread_id)
+
+
+def get_checkpoint_metrics() -> Dict[str, Any]:
+    """Return checkpoint operation counters and latency histograms."""
+    return {
+        **_checkpoint_counters.snapshot(),
+        "latency_seconds": {name: histogram.snapshot() for name, histogram in _checkpoint_latency.items()}
+    }
+
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, JSON, LargeBinary, String, Text
+
+from app.database.base import Base, TimeStampedModel
+
+
+class ResponseCacheEntry(Base, TimeStampedModel):
+    """
+    Cached LLM answer for the semantic response cache.
+    The query embedding is stored as raw float32 bytes.
+    """
+    __tablename__ = "response_cache"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    context_fingerprint = Column(String(64), nullable=False, index=True)
+    query_text = Column(Text, nullable=False)
+    embedding = Column(LargeBinary, nullable=False)
+    answer = Column(Text, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    last_hit_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)  # LRU order
+
+
+class EmbeddingCacheEntry(Base, TimeStampedModel):
+    """
+    Persistent tier of the embedding cache, keyed by a hash of (model, text).
+    Vectors are stored as raw float32 bytes.
+    """
+    __tablename__ = "embedding_cache"
+
+    content_hash = Column(String(64), primary_key=True)
+    model = Column(String(100), nullable=False)
+    dims = Column(Integer, nullable=False)
+    embedding = Column(LargeBinary, nullable=False)
+    hits = Column(Integer, nullable=False, default=0, index=True)
+
+
+class IngestionJob(Base, TimeStampedModel):
+    """
+    Document ingestion job processed by the background worker pool.
+    The file content is kept until the job completes so pending work survives restarts.
+    """
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(String(36), primary_key=True)
+    filename = Column(String(512), nullable=False)
+    mime_type = Column(String(255), nullable=False)
+    folder_id = Column(String(255), nullable=True)
+    document_metadata = Column("metadata", JSON, nullable=True)
+    content = Column(LargeBinary, nullable=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)  # pending, running, completed, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+    drive_file = Column(JSON, nullable=True)  # Drive upload of an earlier attempt, so retries don't upload again
+    next_attempt_at = Column(DateTime, nullable=True)  # retry backoff: not claimed before this time
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class GeocodeCacheEntry(Base, TimeStampedModel):
+    """
+    Persistent tier of the geocode cache, keyed by provider and normalized location text.
+    Failed lookups are stored with found=False (and no coordinates) so they aren't retried until they expire.
+    """
+    __tablename__ = "geocode_cache"
+
+    provider = Column(String(20), primary_key=True)
+    location_key = Column(String(255), primary_key=True)
+    found = Column(Boolean, nullable=False, default=True)
+    lat = Column(Float, nullable=True)
+    lng = Column(Float, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class ArchivedThread(Base, TimeStampedModel):
+    """
+    Cold copy of a conversation thread removed from the LangGraph checkpoint tables after its TTL.
+    The payload is the thread's latest checkpoint (with its channel blobs and pending writes) as zlib-compressed JSON.
+    """
+    __tablename__ = "checkpoint_archive"
+
+    thread_id = Column(Text, primary_key=True)
+    last_checkpoint_at = Column(DateTime, nullable=False, index=True)
+    checkpoints = Column(Integer, nullable=False)  # checkpoints the thread had when archived
+    payload = Column(LargeBinary, nullable=False)
@@ -0,0 +1,346 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from psycopg import Connection
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool, AsyncConnectionPool
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config.settings import (
+    postgresql_connection_string,
+    postgresql_async_connection_string,
+    API_WORKERS,
+    DB_MAX_CONNECTIONS,
+    DB_POOL_SHARES,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_IDLE,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_PGBOUNCER,
+    INGESTION_WORKERS
+)
+from app.util.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+POOL_NAMES = ("checkpoint_async", "checkpoint_sync", "orm", "orm_async")
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)  # seconds waiting for a connection
+# Connections opened outside the pools: the maintenance lock connection
+DEDICATED_CONNECTIONS = 1
+# orm_async connections kept for API requests (enqueue, job status) next to the ingestion dispatcher and workers
+ORM_ASYNC_API_HEADROOM = 2
+
+
+@dataclass(frozen=True)
+class PoolBudget:
+    """
+    Connections each pool of this worker may open.
+
+    DB_MAX_CONNECTIONS is the budget for the whole deployment; every API
+    worker gets an equal part, split between its pools by DB_POOL_SHARES
+    after setting aside its DEDICATED_CONNECTIONS.
+    """
+    per_worker: int
+    sizes: Dict[str, int]
+
+
+def _parse_shares(shares: str) -> Dict[str, float]:
+    """Parse "name=weight,..." into weights for the known pools."""
+    weights = {name: 1.0 for name in POOL_NAMES}
+    for item in shares.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() in weights and weight.strip():
+            weights[name.strip()] = float(weight)
+    return weights
+
+
+def ingestion_connections(workers: int = INGESTION_WORKERS) -> int:
+    """orm_async connections the ingestion service and the API need together: workers, dispatcher, headroom."""
+    return workers + 1 + ORM_ASYNC_API_HEADROOM
+
+
+def compute_pool_budget(max_connections: int = DB_MAX_CONNECTIONS, workers: int = API_WORKERS,
+                        shares: str = DB_POOL_SHARES,
+                        minimums: Optional[Dict[str, int]] = None) -> PoolBudget:
+    """
+    Split the connection budget between the workers and each worker's pools.
+
+    Every pool gets at least one connection, and at least its minimum (by
+    default, orm_async is sized for the ingestion workers) up to half the
+    worker's budget: the connections are taken from the pools with the most.
+    start_ingestion_service caps its workers to what orm_async ends up with.
+    """
+    if minimums is None:
+        minimums = {"orm_async": ingestion_connections()}
+    per_worker = max(max_connections // max(workers, 1), len(POOL_NAMES) + DEDICATED_CONNECTIONS)
+    pooled = per_worker - DEDICATED_CONNECTIONS
+    weights = _parse_shares(shares)
+    total_weight = sum(weights.values())
+    sizes = {name: max(int(pooled * weights[name] / total_weight), 1) for name in POOL_NAMES}
+
+    # Settle rounding on the pools with the largest share: hand out leftovers, take back the excess
+    by_share = sorted(POOL_NAMES, key=lambda pool_name: weights[pool_name], reverse=True)
+    for name in by_share:
+        if sum(sizes.values()) >= pooled:
+            break
+        sizes[name] += 1
+    for name in by_share:
+        if sum(sizes.values()) <= pooled:
+            break
+        if sizes[name] > 1:
+            sizes[name] -= 1
+
+    # Raise pools below their minimum with connections from the largest pools that have spare
+    for name, minimum in minimums.items():
+        while sizes[name] < min(minimum, pooled // 2):
+            donors = [pool_name for pool_name in POOL_NAMES
+                      if pool_name != name and sizes[pool_name] > max(minimums.get(pool_name, 1), 1)]
+            if not donors:
+                break
+            sizes[max(donors, key=sizes.__getitem__)] -= 1
+            sizes[name] += 1
+    return PoolBudget(per_worker=per_worker, sizes=sizes)
+
+
+def connection_kwargs() -> Dict[str, Any]:
+    """Connection settings for the checkpoint pools (LangGraph needs autocommit and dict rows)."""
+    return {
+        "autocommit": True,
+        # PgBouncer in transaction mode can't keep prepared statements across transactions
+        "prepare_threshold": None if DB_PGBOUNCER else 0,
+        "row_factory": dict_row
+    }
+
+
+class _TimedCheckout:
+    """Mixin timing how long SQLAlchemy pool checkouts wait for a connection."""
+
+    wait_histogram: Histogram
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_histogram.observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    wait_histogram = Histogram(WAIT_BUCKETS)
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    wait_histogram = Histogram(WAIT_BUCKETS)
+
+
+# Singleton instances
+_budget = compute_pool_budget()
+_connection_pool: Optional[ConnectionPool] = None
+_async_connection_pool: Optional[AsyncConnectionPool] = None
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_lock = threading.Lock()
+
+
+def get_pool_budget() -> PoolBudget:
+    """Get this worker's connection budget."""
+    return _budget
+
+
+def get_connection_pool() -> ConnectionPool:
+    """
+    Get or create the sync psycopg pool (sync checkpointer/store, health checks, maintenance jobs).
+    """
+    global _connection_pool
+
+    if _connection_pool is None:
+        with _lock:
+            if _connection_pool is None:
+                _connection_pool = ConnectionPool(
+                    conninfo=postgresql_connection_string,
+                    min_size=min(DB_POOL_MIN_SIZE, _budget.sizes["checkpoint_sync"]),
+                    max_size=_budget.sizes["checkpoint_sync"],
+                    max_idle=DB_POOL_MAX_IDLE,
+                    max_lifetime=DB_POOL_RECYCLE,
+                    timeout=DB_POOL_TIMEOUT,
+                    kwargs=connection_kwargs(),
+                    name="checkpoint_sync",
+                    open=True
+                )
+                logger.info(f"PostgreSQL connection pool initialized (max {_budget.sizes['checkpoint_sync']})")
+
+    return _connection_pool
+
+
+async def get_async_connection_pool() -> AsyncConnectionPool:
+    """
+    Get or create the async psycopg pool (async checkpointer and store on the API path).
+    """
+    global _async_connection_pool
+
+    if _async_connection_pool is None:
+        pool = AsyncConnectionPool(
+            conninfo=postgresql_connection_string,
+            min_size=min(DB_POOL_MIN_SIZE, _budget.sizes["checkpoint_async"]),
+            max_size=_budget.sizes["checkpoint_async"],
+            max_idle=DB_POOL_MAX_IDLE,
+            max_lifetime=DB_POOL_RECYCLE,
+            timeout=DB_POOL_TIMEOUT,
+            kwargs=connection_kwargs(),
+            name="checkpoint_async",
+            open=False,
+        )
+        # Async pools must be opened from inside the running event loop
+        await pool.open()
+        if _async_connection_pool is None:
+            _async_connection_pool = pool
+            logger.info(f"Async PostgreSQL connection pool initialized (max {_budget.sizes['checkpoint_async']})")
+        else:
+            # Another coroutine opened one while we were waiting
+            await pool.close()
+
+    return _async_connection_pool
+
+
+def connect_dedicated() -> Connection:
+    """
+    Open a connection outside the pools, for holding a lock while the work it
+    guards uses pooled connections. Counted in DEDICATED_CONNECTIONS; close it
+    when done (it's a context manager).
+    """
+    return Connection.connect(postgresql_connection_string, **connection_kwargs())
+
+
+def _engine_connect_args() -> Dict[str, Any]:
+    return {"prepare_threshold": None} if DB_PGBOUNCER else {}
+
+
+def get_engine() -> Engine:
+    """
+    Get or create the SQLAlchemy engine for synchronous ORM sessions.
+    Created on first use; its pool never grows past the worker's ORM budget.
+    """
+    global _engine
+
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                logger.info(f"Creating SQLAlchemy sync engine (pool {_budget.sizes['orm']})")
+                _engine = create_engine(
+                    postgresql_async_connection_string,
+                    poolclass=TimedQueuePool,
+                    pool_size=_budget.sizes["orm"],
+                    max_overflow=0,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=True,  # Verify connection is still alive before using
+                    connect_args=_engine_connect_args()
+                )
+
+    return _engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Get or create the SQLAlchemy engine for asynchronous ORM sessions.
+    Created on first use; its pool never grows past the worker's async ORM budget.
+    """
+    global _async_engine
+
+    if _async_engine is None:
+        with _lock:
+            if _async_engine is None:
+                logger.info(f"Creating SQLAlchemy async engine (pool {_budget.sizes['orm_async']})")
+                _async_engine = create_async_engine(
+                    postgresql_async_connection_string,
+                    poolclass=TimedAsyncQueuePool,
+                    pool_size=_budget.sizes["orm_async"],
+                    max_overflow=0,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=True,  # Verify connection is still alive before using
+                    connect_args=_engine_connect_args()
+                )
+
+    return _async_engine
+
+
+def _psycopg_pool_stats(pool: Any) -> Dict[str, Any]:
+    stats = pool.get_stats()
+    in_use = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+    requests = stats.get("requests_num", 0)
+    return {
+        "max_size": pool.max_size,
+        "open": stats.get("pool_size", 0),
+        "in_use": in_use,
+        "saturation": round(in_use / pool.max_size, 3) if pool.max_size else 0.0,
+        "waiting": stats.get("requests_waiting", 0),
+        "requests": requests,
+        "requests_queued": stats.get("requests_queued", 0),
+        "timeouts": stats.get("requests_errors", 0),
+        "mean_wait_ms": round(stats.get("requests_wait_ms", 0) / requests, 3) if requests else 0.0
+    }
+
+
+def _engine_pool_stats(engine: Any, histogram: Histogram) -> Dict[str, Any]:
+    pool = engine.pool
+    max_size = pool.size() + max(pool._max_overflow, 0)
+    in_use = pool.checkedout()
+    return {
+        "max_size": max_size,
+        "open": pool.checkedin() + in_use,
+        "in_use": in_use,
+        "saturation": round(in_use / max_size, 3) if max_size else 0.0,
+        "wait_seconds": histogram.snapshot()
+    }
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """Return the budget and the saturation and wait times of every pool created so far."""
+    pools: Dict[str, Any] = {}
+    if _async_connection_pool is not None:
+        pools["checkpoint_async"] = _psycopg_pool_stats(_async_connection_pool)
+    if _connection_pool is not None:
+        pools["checkpoint_sync"] = _psycopg_pool_stats(_connection_pool)
+    if _engine is not None:
+        pools["orm"] = _engine_pool_stats(_engine, TimedQueuePool.wait_histogram)
+    if _async_engine is not None:
+        pools["orm_async"] = _engine_pool_stats(_async_engine.sync_engine, TimedAsyncQueuePool.wait_histogram)
+
+    return {
+        "budget": {"max_connections": DB_MAX_CONNECTIONS, "workers": API_WORKERS, "per_worker": _budget.per_worker,
+                   "sizes": _budget.sizes, "pgbouncer": DB_PGBOUNCER},
+        "pools": pools
+    }
+
+
+async def close_pools() -> None:
+    """
+    Close every pool and engine that was created.
+    Called on application shutdown.
+    """
+    global _connection_pool, _async_connection_pool, _engine, _async_engine
+
+    try:
+        if _connection_pool is not None:
+            _connection_pool.close()
+        if _async_connection_pool is not None:
+            await _async_connection_pool.close()
+        if _engine is not None:
+            _engine.dispose()
+        if _async_engine is not None:
+            await _async_engine.dispose()
+        logger.info("Database connection pools closed")
+    except Exception as e:
+        logger.error(f"Error closing database connection pools: {str(e)}")
+
+    _connection_pool = None
+    _async_connection_pool = None
+    _engine = None
+    _async_engine = None
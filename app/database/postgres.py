@@ -4,14 +4,14 @@ from functools import wraps
 from typing import Callable, TypeVar, Any
 
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
-from psycopg_pool import ConnectionPool, AsyncConnectionPool
-from psycopg.rows import dict_row
 from langgraph.checkpoint.postgres import PostgresSaver
 from langgraph.store.postgres import PostgresStore
+from langgraph.store.postgres.aio import AsyncPostgresStore
 
+from app.database.checkpoint_serde import get_checkpoint_serializer
+# Pools live in app.database.pool; re-exported here for existing callers
+from app.database.pool import get_connection_pool, get_async_connection_pool, close_pools
 from app.config.settings import (
-    postgresql_connection_string,
-    DB_POOL_SIZE,
     DB_CONNECTION_RETRIES,
     DB_RETRY_DELAY
 )
@@ -21,19 +21,11 @@ logger = logging.getLogger(__name__)
 # Type variable for function return types
 T = TypeVar('T')
 
-# Connection settings
-connection_kwargs = {
-    "autocommit": True,
-    "prepare_threshold": 0,
-    "row_factory": dict_row
-}
-
 # Singleton instances
-_connection_pool = None
-_async_connection_pool = None
 _postgres_saver = None
 _async_postgres_saver = None
 _postgres_store = None
+_async_postgres_store = None
 
 
 def with_retry(max_retries: int = DB_CONNECTION_RETRIES, delay: int = DB_RETRY_DELAY) -> Callable:
@@ -77,56 +69,6 @@ def with_retry(max_retries: int = DB_CONNECTION_RETRIES, delay: int = DB_RETRY_D
     return decorator
 
 
-def get_connection_pool() -> ConnectionPool:
-    """
-    Get or create a PostgreSQL connection pool.
-    This is a singleton pattern to ensure we only have one connection pool.
-    """
-    global _connection_pool
-
-    if _connection_pool is None:
-        try:
-            # Create connection pool
-            _connection_pool = ConnectionPool(
-                conninfo=postgresql_connection_string,
-                max_size=DB_POOL_SIZE,
-                kwargs=connection_kwargs,
-            )
-
-            logger.info("PostgreSQL connection pool initialized")
-        except Exception as e:
-            print(e)
-            logger.error(f"Failed to initialize PostgreSQL connection pool: {str(e)}")
-            raise
-
-    return _connection_pool
-
-
-async def get_async_connection_pool() -> AsyncConnectionPool:
-    """
-    Get or create an asynchronous PostgreSQL connection pool.
-    This is a singleton pattern to ensure we only have one connection pool.
-    """
-    global _async_connection_pool
-
-    if _async_connection_pool is None:
-        try:
-            # Create async connection pool
-            _async_connection_pool = AsyncConnectionPool(
-                conninfo=postgresql_connection_string,
-                max_size=DB_POOL_SIZE,
-                kwargs=connection_kwargs,
-            )
-
-            logger.info("Async PostgreSQL connection pool initialized")
-        except Exception as e:
-            print(e)
-            logger.error(f"Failed to initialize async PostgreSQL connection pool: {str(e)}")
-            raise
-
-    return _async_connection_pool
-
-
 @with_retry()
 def get_postgres_saver() -> PostgresSaver:
     """
@@ -139,8 +81,8 @@ def get_postgres_saver() -> PostgresSaver:
         try:
             pool = get_connection_pool()
 
-            # Create PostgresSaver
-            _postgres_saver = PostgresSaver(pool)
+            # Create PostgresSaver; large blobs are stored compressed
+            _postgres_saver = PostgresSaver(pool, serde=get_checkpoint_serializer())
 
             # Initialize tables
             _postgres_saver.setup()
@@ -170,8 +112,8 @@ async def get_async_postgres_saver() -> AsyncPostgresSaver:
 
             pool = await get_async_connection_pool()
 
-            # Create AsyncPostgresSaver
-            _async_postgres_saver = AsyncPostgresSaver(pool)
+            # Create AsyncPostgresSaver; large blobs are stored compressed
+            _async_postgres_saver = AsyncPostgresSaver(pool, serde=get_checkpoint_serializer())
 
             # Initialize tables
             await _async_postgres_saver.setup()
@@ -207,6 +149,28 @@ def get_postgres_store() -> PostgresStore:
     return _postgres_store
 
 
+async def get_async_postgres_store() -> AsyncPostgresStore:
+    """
+    Get or create an AsyncPostgresStore instance.
+    This is a singleton pattern to ensure we only have one instance.
+    """
+    global _async_postgres_store
+
+    if _async_postgres_store is None:
+        try:
+            pool = await get_async_connection_pool()
+
+            # Create AsyncPostgresStore
+            _async_postgres_store = AsyncPostgresStore(pool)
+            logger.info("Async PostgreSQL store initialized successfully")
+        except Exception as e:
+            print(e)
+            logger.error(f"Failed to initialize async PostgreSQL store: {str(e)}")
+            raise
+
+    return _async_postgres_store
+
+
 def check_postgres_connection() -> bool:
     """
     Check if the PostgreSQL connection is working.
@@ -227,29 +191,17 @@ def check_postgres_connection() -> bool:
         return False
 
 
-def close_postgres_connections() -> None:
+async def close_postgres_connections() -> None:
     """
-    Close all PostgreSQL connections.
+    Close all PostgreSQL connections (checkpoint, store and ORM pools).
     Called on application shutdown.
     """
-    global _connection_pool, _async_connection_pool, _postgres_saver, _async_postgres_saver, _postgres_store
+    global _postgres_saver, _async_postgres_saver, _postgres_store, _async_postgres_store
 
-    try:
-        if _connection_pool is not None:
-            _connection_pool.close()
-            logger.info("PostgreSQL connection pool closed")
-
-        if _async_connection_pool is not None:
-            # Close async pool
-            import asyncio
-            asyncio.create_task(_async_connection_pool.close())
-            logger.info("Async PostgreSQL connection pool closing")
-    except Exception as e:
-        logger.error(f"Error closing PostgreSQL connection pools: {str(e)}")
+    await close_pools()
 
     # Reset singleton instances
-    _connection_pool = None
-    _async_connection_pool = None
     _postgres_saver = None
     _async_postgres_saver = None
     _postgres_store = None
+    _async_postgres_store = None
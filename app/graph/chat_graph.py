@@ -1,8 +1,16 @@
+import asyncio
 import logging
 import platform
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from langchain_core.runnables import RunnableLambda
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.checkpoint.postgres import PostgresSaver
 from langgraph.graph import StateGraph, START, END, MessagesState
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.store.memory import InMemoryStore
 from langgraph.store.postgres import PostgresStore
 from psycopg.rows import dict_row
 from psycopg_pool import ConnectionPool
@@ -10,21 +18,23 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.graph.state import State
-from app.graph.nodes import retrieve_context, generate_response, summarize_conversation, human_feedback, \
-    capture_important_info, end_node
-from app.database.postgres import get_postgres_saver, get_postgres_store, get_async_postgres_saver
+from app.graph.nodes import retrieve_context, generate_response, human_feedback, \
+    capture_important_info, end_node, aretrieve_context, acapture_important_info, agenerate_response, \
+    classify_route, aclassify_route
+from app.database.instrumented_saver import InstrumentedCheckpointer
+from app.database.postgres import get_postgres_saver, get_postgres_store, get_async_postgres_saver, \
+    get_async_postgres_store
 import os
 from dotenv import load_dotenv
-from typing import Optional
 
 # Load environment variables
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-
-def should_summarize(state: State) -> str:
-    """Decide si resumir o continuar."""
-    return "summarize_conversation" if len(state["messages"]) > 6 else "generate_response"
+# Compiled graphs keyed by (checkpointer, store) variant
+_compiled_graphs: Dict[Tuple[Optional[str], Optional[str]], CompiledStateGraph] = {}
+_compiled_graphs_lock = threading.Lock()
+_async_compiled_graphs_lock = asyncio.Lock()
 
 
 def should_ambiguity(state: State) -> str:
@@ -32,6 +42,174 @@ def should_ambiguity(state: State) -> str:
     return "ask_clarification" if state["ambiguity_classification"]["is_ambiguous"] else "generate_response"
 
 
+def build_chat_workflow() -> StateGraph:
+    """
+    Build the (uncompiled) chat workflow with the node functions and edges.
+
+    Returns:
+        The StateGraph definition
+    """
+    # Create the graph with our State type
+    workflow = StateGraph(State)
+
+    # Add the nodes. I/O-bound nodes carry an async implementation that
+    # is used when the graph is driven with ainvoke/astream.
+    workflow.add_node("classify_route", RunnableLambda(classify_route, afunc=aclassify_route))
+    workflow.add_node("retrieve_context", RunnableLambda(retrieve_context, afunc=aretrieve_context))
+    workflow.add_node("capture_important_info", RunnableLambda(capture_important_info, afunc=acapture_important_info))
+    workflow.add_node("generate_response", RunnableLambda(generate_response, afunc=agenerate_response))
+    workflow.add_node("human_feedback", human_feedback)
+    workflow.add_node("end_node", end_node)
+    # Define the flow. The route decides what retrieve_context fetches;
+    # extraction doesn't depend on it and starts right away.
+    workflow.add_edge(START, "classify_route")
+    workflow.add_edge("classify_route", "retrieve_context")
+    workflow.add_edge(START, "capture_important_info")
+    workflow.add_edge(["retrieve_context", "capture_important_info"], "generate_response")
+    workflow.add_edge("generate_response", "human_feedback")
+    workflow.add_edge("human_feedback", "generate_response")
+    workflow.add_edge("human_feedback", "end_node")
+    workflow.set_finish_point("end_node")
+
+    return workflow
+
+
+def _resolve_checkpointer(kind: Optional[str]):
+    """Resolve a checkpointer variant name to its (singleton) instance."""
+    if kind is None:
+        return None
+    # Wrapped so checkpoint reads and writes show up in the metrics
+    if kind == "postgres":
+        return InstrumentedCheckpointer(get_postgres_saver())
+    if kind == "memory":
+        return InstrumentedCheckpointer(MemorySaver())
+    raise ValueError(f"Unknown checkpointer variant: {kind}")
+
+
+def _resolve_store(kind: Optional[str]):
+    """Resolve a store variant name to its (singleton) instance."""
+    if kind is None:
+        return None
+    if kind == "postgres":
+        return get_postgres_store()
+    if kind == "memory":
+        return InMemoryStore()
+    raise ValueError(f"Unknown store variant: {kind}")
+
+
+def get_chat_graph(checkpointer: Optional[str] = "postgres", store: Optional[str] = "postgres") -> CompiledStateGraph:
+    """
+    Get the compiled chat graph for a checkpointer/store variant.
+
+    The graph is built and compiled once per process and variant; later calls
+    return the cached instance, so request handlers can call this freely.
+
+    Args:
+        checkpointer: Checkpointer variant ("postgres", "memory" or None)
+        store: Store variant ("postgres", "memory" or None)
+
+    Returns:
+        The compiled graph ready to be invoked
+    """
+    key = (checkpointer, store)
+    graph = _compiled_graphs.get(key)
+    if graph is not None:
+        return graph
+
+    with _compiled_graphs_lock:
+        # Another thread may have compiled it while we were waiting
+        graph = _compiled_graphs.get(key)
+        if graph is None:
+            try:
+                start = time.perf_counter()
+                graph = build_chat_workflow().compile(
+                    checkpointer=_resolve_checkpointer(checkpointer),
+                    store=_resolve_store(store)
+                )
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                _compiled_graphs[key] = graph
+                logger.info(f"Chat graph compiled for variant {key} in {elapsed_ms:.1f} ms")
+            except Exception as e:
+                logger.error(f"Error creating chat graph for variant {key}: {str(e)}")
+                raise
+
+    return graph
+
+
+async def _aresolve_checkpointer(kind: Optional[str]):
+    """Resolve a checkpointer variant name, including async-only variants."""
+    if kind == "async_postgres":
+        return InstrumentedCheckpointer(await get_async_postgres_saver())
+    return _resolve_checkpointer(kind)
+
+
+async def _aresolve_store(kind: Optional[str]):
+    """Resolve a store variant name, including async-only variants."""
+    if kind == "async_postgres":
+        return await get_async_postgres_store()
+    return _resolve_store(kind)
+
+
+async def get_async_chat_graph(
+        checkpointer: Optional[str] = "async_postgres",
+        store: Optional[str] = "async_postgres"
+) -> CompiledStateGraph:
+    """
+    Get the compiled chat graph for async execution (ainvoke/astream).
+
+    Shares the per-variant cache with get_chat_graph; the default variant uses
+    the AsyncPostgresSaver and AsyncPostgresStore so checkpoint I/O never blocks
+    the event loop.
+
+    Args:
+        checkpointer: Checkpointer variant ("async_postgres", "postgres", "memory" or None)
+        store: Store variant ("async_postgres", "postgres", "memory" or None)
+
+    Returns:
+        The compiled graph ready to be invoked
+    """
+    key = (checkpointer, store)
+    graph = _compiled_graphs.get(key)
+    if graph is not None:
+        return graph
+
+    async with _async_compiled_graphs_lock:
+        graph = _compiled_graphs.get(key)
+        if graph is None:
+            try:
+                resolved_checkpointer = await _aresolve_checkpointer(checkpointer)
+                resolved_store = await _aresolve_store(store)
+
+                start = time.perf_counter()
+                graph = build_chat_workflow().compile(
+                    checkpointer=resolved_checkpointer,
+                    store=resolved_store
+                )
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                with _compiled_graphs_lock:
+                    _compiled_graphs[key] = graph
+                logger.info(f"Chat graph compiled for variant {key} in {elapsed_ms:.1f} ms")
+            except Exception as e:
+                logger.error(f"Error creating chat graph for variant {key}: {str(e)}")
+                raise
+
+    return graph
+
+
+async def warm_up_chat_graph() -> None:
+    """
+    Compile the chat graph variant used by the API ahead of the first request.
+    Called on application startup.
+    """
+    await get_async_chat_graph()
+
+
+def clear_chat_graph_cache() -> None:
+    """Drop all compiled graphs, e.g. after the database pools are closed."""
+    with _compiled_graphs_lock:
+        _compiled_graphs.clear()
+
+
 def create_chat_graph():
     """
     Create and compile the chat graph with the node functions.
@@ -40,32 +218,7 @@ def create_chat_graph():
         The compiled graph ready to be invoked
     """
     try:
-        # Create the graph with our State type
-        workflow = StateGraph(State)
-
-        # Add the nodes
-        workflow.add_node("retrieve_context", retrieve_context)
-        workflow.add_node("capture_important_info", capture_important_info)
-        workflow.add_node("generate_response", generate_response)
-        workflow.add_node("human_feedback", human_feedback)
-        workflow.add_node("summarize_conversation", summarize_conversation)
-        workflow.add_node("end_node", end_node)
-        # Define the flow
-        workflow.add_edge(START, "retrieve_context")
-        workflow.add_edge(START, "capture_important_info")
-        workflow.add_edge(["retrieve_context", "capture_important_info"], "generate_response")
-        workflow.add_edge("generate_response", "human_feedback")
-        workflow.add_edge("human_feedback", "generate_response")
-        workflow.add_edge("human_feedback", "end_node")
-        workflow.set_finish_point("end_node")
-
-        store = get_postgres_store()
-        checkpointer = get_postgres_saver()
-        # Compile the graph with the checkpointer
-        compiled_graph = workflow.compile(checkpointer=checkpointer, store=store)
-
-        logger.info("Chat graph compiled successfully")
-        return compiled_graph
+        return get_chat_graph()
 
     except Exception as e:
         print(f"Error creating chat graph: {str(e)}")
@@ -1,12 +1,17 @@
+import asyncio
+import json
 import logging
-from typing import Dict, Any, Literal
+import re
+import time
+from typing import Dict, Any, List, Literal, Optional, Tuple
 
 from dotenv import load_dotenv
 from langchain_core.documents import Document
-from langchain_core.messages import HumanMessage, AIMessage, RemoveMessage, SystemMessage
+from langchain_core.messages import HumanMessage, AIMessage, RemoveMessage, SystemMessage, BaseMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableConfig
 from langchain_qdrant import Qdrant
 from langgraph.types import interrupt, Command
 from numpy.f2py.crackfortran import previous_context
@@ -16,48 +21,60 @@ from app.graph.state import State, AmbiguityClassification, VehicleInfo
 from app.config.settings import LLM_MODEL, QDRANT_URL, QDRANT_API_KEY
 
 from app.services.document_service import DocumentService
-from app.services.location_services_map_box import get_district_coordinates, PLANTS, calculate_distances
-from app.util.prompt import SALES_TALK_PROMPT, IMPORTANT_INFO_PROMPT
+from app.services.llm_service import get_llm
+from app.services.service_container import get_service_container
+from app.services.response_cache import get_response_cache, SemanticResponseCache
+from app.services.info_detector import has_extractable_info
+from app.services.location_matcher import DISTRICTS, extract_location_from_message, fold_accents
+from app.services.location_provider import get_location_service
+from app.services.plant_registry import PLANTS
+from app.services.sematic_service import get_ambiguity_router
+from app.services.token_budget import get_token_counter, messages_to_compact, messages_within_budget, \
+    record_prompt_tokens
+from app.util.metrics import Counters, Histogram
+from app.util.prompt import SALES_TALK_PROMPT, INCREMENTAL_INFO_PROMPT
 
 logger = logging.getLogger(__name__)
 
-# Singleton document service
-_document_service = None
+ROUTE_PLANT_TARIFF = "plant_tariff"
+MAX_PLANTS_IN_CONTEXT = 5  # nearest plants listed when the user gave a location
+# Price/tariff wording on the plant_tariff route: the plant registry has no prices, so these still search Qdrant
+_TARIFF_RE = re.compile(r"\b(?:cuanto|cuesta|cuestan|costos?|cobran?|precios?|tarifas?|pagar?|pago|soles|valor)\b")
+
+# Per-route metrics: turns per route, Qdrant calls made/skipped, and latency
+_route_counters = Counters("requirements", "plant_tariff", "qdrant_calls", "qdrant_skipped")
+_route_latency = {"classify_route": Histogram(), "requirements": Histogram(), "plant_tariff": Histogram()}
+# Vehicle info extraction runs vs. turns skipped by the local detector
+_extraction_counters = Counters("executed", "skipped")
+
+
+def get_route_metrics() -> Dict[str, Any]:
+    """Return per-route counters and latency histograms (classification, and context retrieval per route)."""
+    return {
+        **_route_counters.snapshot(),
+        "latency_seconds": {name: histogram.snapshot() for name, histogram in _route_latency.items()}
+    }
 
 
 def get_document_service() -> DocumentService:
-    """Get or create a DocumentService singleton."""
-    global _document_service
-    if _document_service is None:
-        try:
-            _document_service = DocumentService()
-        except Exception as e:
-            logger.error(f"Error initializing document service: {str(e)}")
-            raise
-    return _document_service
+    """Get the DocumentService shared with the routers through the service container."""
+    try:
+        return get_service_container().document_service
+    except Exception as e:
+        logger.error(f"Error initializing document service: {str(e)}")
+        raise
 
 
-def retrieve_context(state: State) -> dict:
+def _build_context(search_results: List[Dict[str, Any]]) -> Tuple[List[Document], str]:
     """
-    Retrieve relevant context based on the user's input.
-
-    In a more advanced implementation, this would use a vector store
-    to retrieve relevant documents based on the user's query.
+    Convert search results into LangChain documents and a context string.
 
     Args:
-        state: The current state
+        search_results: Results returned by DocumentService.search_documents
 
     Returns:
-        The updated state with context
+        Tuple of (documents, context text)
     """
-    query_text = state["input"]
-
-    # Get the document service
-    document_service = get_document_service()
-
-    # Search for relevant documents
-    search_results = document_service.search_documents(query_text, limit=5)
-
     # Convert to LangChain Document objects
     documents = []
     for result in search_results:
@@ -85,120 +102,477 @@ def retrieve_context(state: State) -> dict:
     else:
         context = ""
 
-    # Update state
-    state["context"] = context
+    return documents, context
+
+
+def classify_route(state: State) -> dict:
+    """
+    Classify the turn with the semantic router so later nodes can skip work it doesn't need.
+
+    Args:
+        state: The current state
+
+    Returns:
+        The updated state with the route
+    """
+    start = time.perf_counter()
+    route = get_ambiguity_router().route_query(state["input"])
+    _route_latency["classify_route"].observe(time.perf_counter() - start)
+    _route_counters.increment(route)
+    return {"route": route}
+
+
+async def aclassify_route(state: State) -> dict:
+    """
+    Async version of classify_route; the router may call the remote encoder, so it runs in a worker thread.
+    """
+    start = time.perf_counter()
+    route = await asyncio.to_thread(get_ambiguity_router().route_query, state["input"])
+    _route_latency["classify_route"].observe(time.perf_counter() - start)
+    _route_counters.increment(route)
+    return {"route": route}
+
+
+def _build_plant_context(location: str, distances: Optional[List[Dict[str, Any]]]) -> str:
+    """
+    Build the plant part of the context for plant/tariff questions from the in-process plant data.
+
+    Args:
+        location: Location mentioned by the user ("" if none)
+        distances: Plants with distances from calculate_distances, nearest first (None if no location)
+
+    Returns:
+        Context text listing the plants
+    """
+    if distances:
+        header = f"Plantas de revisión técnica más cercanas a {location}:"
+        entries = [
+            f"{i}. {plant['name']}\nDirección: {plant['address']}\nTeléfono: {plant['phone']}\n"
+            f"Horario: {plant['hours']}\nDistancia: {plant['distance_text']} ({plant['duration_text']})"
+            for i, plant in enumerate(distances[:MAX_PLANTS_IN_CONTEXT], 1)
+        ]
+    else:
+        header = "Plantas de revisión técnica:"
+        entries = [
+            f"{i}. {plant.name}\nDirección: {plant.address}\nTeléfono: {plant.phone}\nHorario: {plant.hours}"
+            for i, plant in enumerate(PLANTS.values(), 1)
+        ]
+
+    return header + "\n\n" + "\n\n".join(entries)
+
+
+def _plant_context(query_text: str) -> str:
+    """Plant context for a query, with plants ranked by distance when it mentions a location."""
+    location = extract_location_from_message(query_text)
+    if not location:
+        return _build_plant_context("", None)
+
+    service = get_location_service()
+    lat, lng = service.get_district_coordinates(location)
+    district = location if location in DISTRICTS.values() else None
+    return _build_plant_context(location, service.calculate_distances(lat, lng, district=district))
+
+
+async def _aplant_context(query_text: str) -> str:
+    """Async version of _plant_context."""
+    location = extract_location_from_message(query_text)
+    if not location:
+        return _build_plant_context("", None)
+
+    service = get_location_service()
+    lat, lng = await asyncio.to_thread(service.get_district_coordinates, location)
+    district = location if location in DISTRICTS.values() else None
+    return _build_plant_context(location, await service.acalculate_distances(lat, lng, district=district))
+
+
+def _asks_for_tariff(query_text: str) -> bool:
+    """Whether a plant/tariff question asks about prices, which only the documents answer."""
+    return _TARIFF_RE.search(fold_accents(query_text)) is not None
+
+
+def _join_context(*parts: str) -> str:
+    return "\n\n---\n\n".join(part for part in parts if part)
+
+
+def retrieve_context(state: State) -> dict:
+    """
+    Retrieve relevant context based on the user's input.
+
+    Plant location questions are answered from the in-process plant data
+    (ranked by distance when the user mentions a location) without querying
+    Qdrant; tariff questions and other turns search the vector store, with
+    the plant data appended for tariffs.
+
+    Args:
+        state: The current state
+
+    Returns:
+        The updated state with context
+    """
+    query_text = state["input"]
+    route = state.get("route") or "requirements"
+    start = time.perf_counter()
+
+    plant_context = ""
+    if route == ROUTE_PLANT_TARIFF:
+        plant_context = _plant_context(query_text)
+        if not _asks_for_tariff(query_text):
+            _route_counters.increment("qdrant_skipped")
+            _route_latency[route].observe(time.perf_counter() - start)
+            logger.info(f"Built plant context without retrieval for query: {query_text[:50]}...")
+            return {"context": plant_context}
+
+    # Get the document service
+    document_service = get_document_service()
+
+    # Search for relevant documents
+    search_results = document_service.search_documents(query_text, limit=5)
+    documents, context = _build_context(search_results)
+    _route_counters.increment("qdrant_calls")
+    _route_latency[route].observe(time.perf_counter() - start)
 
     logger.info(f"Retrieved {len(documents)} relevant documents for query: {query_text[:50]}...")
-    return {"context": context}
+    return {"context": _join_context(context, plant_context)}
 
-def capture_important_info(state: State) -> dict:
+
+async def aretrieve_context(state: State) -> dict:
     """
-    Analiza la conversación para extraer y almacenar información importante
-    sobre el vehículo y las necesidades del usuario.
+    Async version of retrieve_context used by the async graph.
+
+    Args:
+        state: The current state
+
+    Returns:
+        The updated state with context
     """
-    llm = ChatOpenAI(model=LLM_MODEL)
+    query_text = state["input"]
+    route = state.get("route") or "requirements"
+    start = time.perf_counter()
+
+    plant_context = ""
+    if route == ROUTE_PLANT_TARIFF:
+        plant_context = await _aplant_context(query_text)
+        if not _asks_for_tariff(query_text):
+            _route_counters.increment("qdrant_skipped")
+            _route_latency[route].observe(time.perf_counter() - start)
+            logger.info(f"Built plant context without retrieval for query: {query_text[:50]}...")
+            return {"context": plant_context}
+
+    # Get the document service
+    document_service = get_document_service()
+
+    # Search for relevant documents without blocking the event loop
+    search_results = await document_service.asearch_documents(query_text, limit=5)
+    documents, context = _build_context(search_results)
+    _route_counters.increment("qdrant_calls")
+    _route_latency[route].observe(time.perf_counter() - start)
 
-    # Obtenemos los mensajes recientes para analizar
-    messages = state["messages"][-5:] if len(state["messages"]) > 5 else state["messages"]
-    #logger.info(f"messages: {messages}")
-    question = state["input"]
+    logger.info(f"Retrieved {len(documents)} relevant documents for query: {query_text[:50]}...")
+    return {"context": _join_context(context, plant_context)}
 
-    system_instructions = IMPORTANT_INFO_PROMPT.format(
-        question=question,
-        messages=messages
+
+def _build_info_messages(state: State) -> List[BaseMessage]:
+    """Build the extraction messages for the new turn against the stored vehicle_info."""
+    system_instructions = INCREMENTAL_INFO_PROMPT.format(
+        vehicle_info=json.dumps(state.get("vehicle_info") or {}, ensure_ascii=False),
+        question=state["input"]
     )
-    # gf
+
+    return [
+        SystemMessage(content=system_instructions),
+        HumanMessage(content="Extrae los puntos clave del nuevo mensaje")
+    ]
+
+
+def _merge_vehicle_info(previous: Optional[Dict[str, Any]], update: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Overlay the fields extracted from the new turn on the stored vehicle_info."""
+    merged = dict(previous or {})
+    merged.update({key: value for key, value in (update or {}).items() if value not in (None, "", [])})
+    return merged
+
+
+def _should_extract(state: State) -> bool:
+    """Run the LLM extraction only when the new message looks like it contains vehicle facts."""
+    if has_extractable_info(state["input"]):
+        _extraction_counters.increment("executed")
+        return True
+    _extraction_counters.increment("skipped")
+    return False
+
+
+def get_extraction_metrics() -> Dict[str, int]:
+    """Return how many turns ran or skipped the vehicle info extraction."""
+    return _extraction_counters.snapshot()
+
+
+def capture_important_info(state: State) -> dict:
+    """
+    Analiza el nuevo mensaje para extraer información importante sobre el
+    vehículo y las necesidades del usuario, y la combina con la ya registrada.
+    Si el mensaje no contiene datos extraíbles, no se llama al LLM.
+    """
+    if not _should_extract(state):
+        return {}
+
+    llm = get_llm()
+
     # Configuramos el LLM para obtener salida estructurada
     structured_llm = llm.with_structured_output(VehicleInfo)
 
-    # Invocamos el modelo
-    result = structured_llm.invoke([
-        SystemMessage(content=system_instructions),
-        HumanMessage(content="Extrae los puntos clave de la conversación")
+    # Invocamos el modelo solo con el nuevo turno
+    result = structured_llm.invoke(_build_info_messages(state))
+
+    return {
+        "vehicle_info": _merge_vehicle_info(state.get("vehicle_info"), result),
+    }
+
+
+async def acapture_important_info(state: State) -> dict:
+    """
+    Versión asíncrona de capture_important_info usada por el grafo asíncrono.
+    """
+    if not _should_extract(state):
+        return {}
+
+    llm = get_llm()
+
+    # Configuramos el LLM para obtener salida estructurada
+    structured_llm = llm.with_structured_output(VehicleInfo)
+
+    # Invocamos el modelo sin bloquear el event loop
+    result = await structured_llm.ainvoke(_build_info_messages(state))
+
+    return {
+        "vehicle_info": _merge_vehicle_info(state.get("vehicle_info"), result),
+    }
+
+
+def _history_messages(state: State) -> List[BaseMessage]:
+    """
+    Conversation history for the prompt: the summary of compacted turns plus
+    the most recent messages that fit in the token budget.
+    """
+    history = messages_within_budget(state.get("messages") or [])
+    summary = state.get("summary")
+    if summary:
+        return [SystemMessage(content=f"Resumen de la conversación hasta ahora: {summary}")] + history
+    return history
+
+
+def _build_response_chain(state: State, llm: ChatOpenAI, config: Optional[RunnableConfig] = None):
+    """
+    Build the prompt | llm | parser chain used by generate_response, and record the prompt size of the turn.
+
+    Args:
+        state: The current state including user input, chat history, and context.
+        llm: The chat model to use
+        config: The runnable config (its thread_id keys the prompt token trend)
+
+    Returns:
+        The runnable chain and the history messages to pass as "messages"
+    """
+    context = state.get("context", "")
+    summary = state.get("summary", "")
+    vehicle_info = state.get("vehicle_info") or {}
+    user_query = state["input"]
+    history = _history_messages(state)
+
+    # Construir el mensaje del sistema con el contexto y resumen
+    system_message = SALES_TALK_PROMPT.format(
+        user_query=user_query,
+        context=context,
+        chat_history=summary,
+        recent_messages=history,
+        vehicle_info=vehicle_info
+    )
+
+    counter = get_token_counter()
+    prompt_tokens = counter.count_text(system_message) + counter.count_messages(history) + counter.count_text(user_query)
+    record_prompt_tokens((config or {}).get("configurable", {}).get("thread_id"), prompt_tokens)
+
+    # Construir el prompt con historial y nuevo input
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", system_message),
+        MessagesPlaceholder(variable_name="messages"),
+        ("human", "{input}")
     ])
 
-    # Con reducers, simplemente devolvemos los resultados
-    # La función reducer se encargará de preservar los valores existentes
+    return prompt | llm | StrOutputParser(), history
+
+
+def _response_update(state: State, response: str) -> Dict[str, Any]:
+    """Build the state update for a generated response."""
+    updated_messages = state.get("messages", []) + [
+        HumanMessage(content=state["input"]),
+        AIMessage(content=response)
+    ]
+    logger.info(f"Generated response for input: {state['input'][:50]}...")
+
     return {
-        "vehicle_info": result,
+        "answer": response,
+        "messages": updated_messages,
+        # The retrieved context is only needed for this turn; don't keep it in the checkpoint
+        "context": "",
     }
 
 
-def generate_response(state: State) -> Dict[str, Any]:
+def _is_stateless_turn(state: State) -> bool:
+    """
+    True when the answer can only depend on the input and the retrieved context:
+    no earlier messages, summary or stored vehicle_info in the thread.
+    """
+    return not (state.get("messages") or state.get("summary") or state.get("vehicle_info"))
+
+
+def _is_resumed_turn(state: State) -> bool:
+    """
+    A turn resumed from human_feedback: it still carries the previous answer
+    (new turns start with an empty one), but not the previous turn's context,
+    which _response_update doesn't keep in the checkpoint.
+    """
+    return not state.get("context") and bool(state.get("answer"))
+
+
+def _with_resumed_context(state: State) -> State:
+    """Route and retrieve context for the feedback of a resumed turn; other turns are returned as they are."""
+    if not _is_resumed_turn(state):
+        return state
+    state = {**state, **classify_route(state)}
+    return {**state, **retrieve_context(state)}
+
+
+async def _awith_resumed_context(state: State) -> State:
+    """Async version of _with_resumed_context."""
+    if not _is_resumed_turn(state):
+        return state
+    state = {**state, **await aclassify_route(state)}
+    return {**state, **await aretrieve_context(state)}
+
+
+def _get_response_cache(state: State, config: Optional[RunnableConfig]) -> Optional[SemanticResponseCache]:
+    """
+    Return the semantic response cache unless it's disabled, the thread opted out
+    with configurable "use_response_cache": False, or the turn has conversation
+    state. The cache is shared by every thread and keyed only on the input and
+    context, so answers that depend on a thread's history are never looked up or stored.
+    """
+    cache = get_response_cache(get_document_service().embeddings)
+    if cache is None:
+        return None
+
+    configurable = (config or {}).get("configurable", {})
+    if not configurable.get("use_response_cache", True) or not _is_stateless_turn(state):
+        cache.metrics.increment("skipped")
+        return None
+
+    return cache
+
+
+def generate_response(state: State, config: RunnableConfig = None) -> Dict[str, Any]:
     """
     Generate a response based on chat history, context, and summary.
 
+    Near-duplicate questions over the same retrieved context are answered from
+    the semantic response cache without calling the LLM, on turns that don't
+    depend on the thread's history. Turns resumed from human_feedback retrieve
+    context for the feedback first, since the previous turn's isn't kept.
+
     Args:
         state: The current state including user input, chat history, and context.
+        config: The runnable config (used for the per-thread cache opt-out).
 
     Returns:
         Updated state with the generated answer.
     """
     try:
-        llm = ChatOpenAI(model=LLM_MODEL)
-        context = state["context"]
-        summary = state["summary"]
-        vehicle_info = state["vehicle_info"]
-        user_query = state["input"]
-        # Limitar la cantidad de mensajes en el historial
-        recent_messages = state["messages"][-7:] if len(state["messages"]) > 7 else state["messages"]
-
-        # Construir el mensaje del sistema con el contexto y resumen
-        system_message = SALES_TALK_PROMPT.format(
-            user_query=user_query,
-            context=context,
-            chat_history=summary,
-            recent_messages=recent_messages,
-            vehicle_info=vehicle_info
-        )
+        state = _with_resumed_context(state)
+        cache, cache_query = None, None
+        try:
+            cache = _get_response_cache(state, config)
+            if cache is not None and state.get("context"):
+                cache_query = cache.prepare(state["input"], state["context"])
+                cached_answer = cache.lookup(cache_query)
+                if cached_answer is not None:
+                    logger.info(f"Response cache hit for input: {state['input'][:50]}...")
+                    return _response_update(state, cached_answer)
+        except Exception as e:
+            # The cache is an optimization; fall back to the LLM
+            logger.error(f"Response cache unavailable: {str(e)}")
 
-        # Construir el prompt con historial y nuevo input
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_message),
-            MessagesPlaceholder(variable_name="messages"),
-            ("human", "{input}")
-        ])
+        llm = get_llm()
 
         # Ejecutar la cadena del modelo
-        chain = prompt | llm | StrOutputParser()
+        chain, history = _build_response_chain(state, llm, config)
         response = chain.invoke({
-            "messages": state["messages"],
+            "messages": history,
             "input": state["input"]
         })
 
-        # Guardar la respuesta y actualizar el historial de chat
-        # state["answer"] = response
-        # state["messages"] += [
-        #     HumanMessage(content=state["input"]),
-        #     AIMessage(content=response)
-        # ]
-        updated_messages = state.get("messages", []) + [
-            HumanMessage(content=state["input"]),
-            AIMessage(content=response)
-        ]
-        logger.info(f"Generated response for input: {state['input'][:50]}...")
+        if cache_query is not None:
+            cache.store(cache_query, response)
 
-        return {
-            "answer": response,
-            "messages": updated_messages,
-        }
+        return _response_update(state, response)
 
     except Exception as e:
         logger.error(f"Error generating response: {str(e)}")
         raise Exception("I'm sorry, I encountered an error generating a response.")
 
 
-def summarize_conversation(state: State) -> Dict[str, Any]:
+async def agenerate_response(state: State, config: RunnableConfig = None) -> Dict[str, Any]:
     """
-    Summarizes the conversation and removes old messages.
+    Async version of generate_response used by the async graph.
 
     Args:
-        state: The current state including chat history.
+        state: The current state including user input, chat history, and context.
+        config: The runnable config (used for the per-thread cache opt-out).
 
     Returns:
-        Updated state with summary and trimmed messages.
+        Updated state with the generated answer.
     """
-    llm = ChatOpenAI(model=LLM_MODEL)
+    try:
+        state = await _awith_resumed_context(state)
+        cache, cache_query = None, None
+        try:
+            cache = _get_response_cache(state, config)
+            if cache is not None and state.get("context"):
+                cache_query = await cache.aprepare(state["input"], state["context"])
+                cached_answer = await cache.alookup(cache_query)
+                if cached_answer is not None:
+                    logger.info(f"Response cache hit for input: {state['input'][:50]}...")
+                    return _response_update(state, cached_answer)
+        except Exception as e:
+            # The cache is an optimization; fall back to the LLM
+            logger.error(f"Response cache unavailable: {str(e)}")
+
+        llm = get_llm()
+
+        # Ejecutar la cadena del modelo sin bloquear el event loop
+        chain, history = _build_response_chain(state, llm, config)
+        response = await chain.ainvoke({
+            "messages": history,
+            "input": state["input"]
+        })
+
+        if cache_query is not None:
+            await cache.astore(cache_query, response)
+
+        return _response_update(state, response)
+
+    except Exception as e:
+        logger.error(f"Error generating response: {str(e)}")
+        raise Exception("I'm sorry, I encountered an error generating a response.")
+
+
+def _summary_messages(state: State) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+    """
+    Select the messages to compact and build the summarization request for them.
+
+    Returns:
+        The messages to remove and the messages to send to the LLM; both empty while within budget
+    """
+    compacted = messages_to_compact(state.get("messages") or [], state.get("summary"))
+    if not compacted:
+        return [], []
 
     summary = state.get("summary", "")
     summary_prompt = (
@@ -206,14 +580,41 @@ def summarize_conversation(state: State) -> Dict[str, Any]:
         if summary else "Create a summary of the conversation above:"
     )
 
-    # Agregar el prompt al historial y ejecutar el resumen con el modelo
-    messages = state["messages"] + [HumanMessage(content=summary_prompt)]
-    response = llm.invoke(messages)
+    # Agregar el prompt al historial que se va a compactar
+    return compacted, compacted + [HumanMessage(content=summary_prompt)]
+
+
+def summarize_conversation(state: State) -> Dict[str, Any]:
+    """
+    Summarizes the oldest messages once the history exceeds the token budget and removes them.
+
+    Args:
+        state: The current state including chat history.
+
+    Returns:
+        Updated state with summary and trimmed messages, or {} while within budget.
+    """
+    compacted, messages = _summary_messages(state)
+    if not compacted:
+        return {}
+
+    response = get_llm().invoke(messages)
+
+    # Eliminar los mensajes resumidos; los más recientes se conservan tal cual
+    return {"summary": response.content, "messages": [RemoveMessage(id=m.id) for m in compacted]}
+
+
+async def asummarize_conversation(state: State) -> Dict[str, Any]:
+    """
+    Async version of summarize_conversation, used by the background compaction of chat threads.
+    """
+    compacted, messages = _summary_messages(state)
+    if not compacted:
+        return {}
 
-    # Eliminar todos los mensajes excepto los 2 más recientes
-    delete_messages = [RemoveMessage(id=m.id) for m in state["messages"][:-2]]
+    response = await get_llm().ainvoke(messages)
 
-    return {"summary": response.content, "messages": delete_messages}
+    return {"summary": response.content, "messages": [RemoveMessage(id=m.id) for m in compacted]}
 
 
 def human_feedback(state: State) -> Command:
@@ -28,6 +28,7 @@ class VehicleInfo(TypedDict):
 
 class State(TypedDict):
     input: str
+    route: Optional[str]  # Semantic route of the turn: "requirements" or "plant_tariff"
     messages: Annotated[List[BaseMessage], add_messages]
     context: str
     answer: str
@@ -1,10 +1,12 @@
+import json
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
 from pydantic import BaseModel, Field
 
-from app.services.chat_service import process_message, get_chat_history
+from app.services.chat_service import process_message, stream_message, get_chat_history
 
 router = APIRouter(
     prefix="/chat",
@@ -19,6 +21,7 @@ class ChatRequest(BaseModel):
     message: str = Field(..., description="The user's message")
     thread_id: str = Field(..., description="Unique identifier for the conversation thread")
     reset_thread: bool = Field(False, description="Whether to reset the thread and start a new conversation")
+    use_response_cache: bool = Field(True, description="Whether answers may be served from the semantic response cache")
 
 
 class ChatResponse(BaseModel):
@@ -51,10 +54,11 @@ async def chat_message(request: ChatRequest) -> Dict[str, Any]:
     """
     try:
         logger.info(f"Processing chat message for thread: {request.thread_id}")
-        result = process_message(
+        result = await process_message(
             message=request.message,
             thread_id=request.thread_id,
-            reset_thread=request.reset_thread
+            reset_thread=request.reset_thread,
+            use_response_cache=request.use_response_cache
         )
 
         return result
@@ -65,6 +69,43 @@ async def chat_message(request: ChatRequest) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _sse_events(request: ChatRequest) -> AsyncIterator[str]:
+    """Format chat service events as Server-Sent Events."""
+    async for event in stream_message(
+            message=request.message,
+            thread_id=request.thread_id,
+            reset_thread=request.reset_thread,
+            use_response_cache=request.use_response_cache
+    ):
+        yield f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+
+
+@router.post("/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """
+    Send a message to the chat assistant and stream the response.
+
+    The response is a Server-Sent Events stream: one "token" event per chunk
+    of the answer as the LLM produces it, followed by a trailing "end" event
+    with the full answer and interrupt status (or an "error" event).
+
+    Args:
+        request: The chat request containing the message and thread ID
+
+    Returns:
+        A text/event-stream response
+    """
+    logger.info(f"Streaming chat message for thread: {request.thread_id}")
+    return StreamingResponse(
+        _sse_events(request),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering so tokens flush immediately
+        }
+    )
+
+
 @router.get("/history/{thread_id}", response_model=ChatHistoryResponse)
 async def chat_history(thread_id: str) -> Dict[str, Any]:
     """
@@ -1,9 +1,13 @@
+import json
 import logging
+from datetime import datetime
 from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
 from pydantic import BaseModel, Field
 
 from app.services.document_service import DocumentService
+from app.services.service_container import get_service_container
+from app.services.ingestion_service import IngestionService, IngestionBacklogFullError, get_ingestion_service
 
 router = APIRouter(
     prefix="/documents",
@@ -13,16 +17,24 @@ router = APIRouter(
 logger = logging.getLogger(__name__)
 
 
-# Dependency for document service
+# Dependency for document service (shared instance from the service container)
 def get_document_service():
     try:
-        service = DocumentService()
-        return service
+        return get_service_container().document_service
     except Exception as e:
         logger.error(f"Error initializing document service: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Could not initialize document service: {str(e)}")
 
 
+# Dependency for the background ingestion service
+def get_ingestion():
+    try:
+        return get_ingestion_service()
+    except Exception as e:
+        logger.error(f"Ingestion service unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Ingestion service unavailable: {str(e)}")
+
+
 # Pydantic models for request/response validation
 class DocumentMetadata(BaseModel):
     title: Optional[str] = None
@@ -36,9 +48,28 @@ class DocumentResponse(BaseModel):
     drive_file_id: Optional[str] = None
     filename: str
     content_length: int
+    chunk_count: Optional[int] = None
     metadata: Dict[str, Any]
 
 
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    filename: str
+    status: str
+    attempts: int = 0
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    next_attempt_at: Optional[datetime] = None  # set while a failed job waits to be retried
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class BulkUploadResponse(BaseModel):
+    jobs: List[IngestionJobResponse]
+    count: int
+
+
 class SearchQuery(BaseModel):
     query: str
     limit: int = Field(5, ge=1, le=20)
@@ -107,6 +138,75 @@ async def upload_document(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/bulk-upload", response_model=BulkUploadResponse, status_code=202)
+async def bulk_upload_documents(
+        files: List[UploadFile] = File(...),
+        folder_id: Optional[str] = Form(None),
+        metadata_json: Optional[str] = Form(None),
+        ingestion_service: IngestionService = Depends(get_ingestion)
+):
+    """
+    Queue several documents for background processing and indexing.
+
+    The files are stored as ingestion jobs and processed by the worker pool;
+    poll /documents/jobs/{job_id} for each job's status.
+
+    Args:
+        files: The document files to upload
+        folder_id: Optional Google Drive folder ID to upload to
+        metadata_json: Optional JSON string with metadata applied to every document
+
+    Returns:
+        The created job IDs with their initial status
+    """
+    metadata = None
+    if metadata_json:
+        try:
+            metadata = json.loads(metadata_json)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid metadata JSON")
+
+    try:
+        file_entries = [
+            (file.filename, await file.read(), file.content_type or "application/octet-stream")
+            for file in files
+        ]
+        jobs = await ingestion_service.enqueue(file_entries, folder_id=folder_id, metadata=metadata)
+
+        return {"jobs": jobs, "count": len(jobs)}
+
+    except IngestionBacklogFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error queueing documents: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(
+        job_id: str,
+        ingestion_service: IngestionService = Depends(get_ingestion)
+):
+    """
+    Get the status of a background ingestion job.
+
+    Args:
+        job_id: ID returned by /documents/bulk-upload
+
+    Returns:
+        The job status, with the processed document metadata once completed
+    """
+    try:
+        job = await ingestion_service.get_job(job_id)
+    except Exception as e:
+        logger.error(f"Error retrieving ingestion job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @router.post("/search", response_model=SearchResponse)
 async def search_documents(
         search_query: SearchQuery,
@@ -122,7 +222,7 @@ async def search_documents(
         List of relevant documents
     """
     try:
-        results = document_service.search_documents(search_query.query, search_query.limit)
+        results = await document_service.asearch_documents(search_query.query, search_query.limit)
 
         return {
             "results": results,
@@ -150,7 +250,7 @@ async def delete_document(
         Success status
     """
     try:
-        success = document_service.delete_document(document_id)
+        success = await document_service.adelete_document(document_id)
 
         if not success:
             raise HTTPException(status_code=404, detail="Document not found or could not be deleted")
@@ -0,0 +1,50 @@
+import logging
+from typing import Dict, Any
+from fastapi import APIRouter
+
+from app.database.checkpoint_maintenance import get_checkpoint_maintenance_metrics
+from app.database.checkpoint_serde import get_checkpoint_serializer_metrics
+from app.database.instrumented_saver import get_checkpoint_metrics
+from app.database.pool import get_pool_metrics
+from app.graph.nodes import get_route_metrics, get_extraction_metrics
+from app.services.chat_service import get_compaction_metrics
+from app.services.embedding_cache import get_embedding_cache_metrics
+from app.services.geocode_cache import get_geocode_cache_metrics
+from app.services.history_cache import get_history_cache_metrics
+from app.services.llm_service import get_llm_client_metrics
+from app.services.location_provider import get_location_service_metrics
+from app.services.response_cache import get_response_cache_metrics
+from app.services.token_budget import get_prompt_token_metrics
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+)
+
+logger = logging.getLogger(__name__)
+
+
+@router.get("")
+def get_metrics() -> Dict[str, Any]:
+    """
+    In-process performance metrics for this worker.
+
+    Returns:
+        dict: Metrics grouped by subsystem
+    """
+    return {
+        "llm_clients": get_llm_client_metrics(),
+        "graph_routes": get_route_metrics(),
+        "info_extraction": get_extraction_metrics(),
+        "prompt_tokens": get_prompt_token_metrics(),
+        "conversation_compaction": get_compaction_metrics(),
+        "database_pools": get_pool_metrics(),
+        "checkpoints": get_checkpoint_metrics(),
+        "checkpoint_compression": get_checkpoint_serializer_metrics(),
+        "checkpoint_maintenance": get_checkpoint_maintenance_metrics(),
+        "history_cache": get_history_cache_metrics(),
+        "response_cache": get_response_cache_metrics(),
+        "embedding_cache": get_embedding_cache_metrics(),
+        "geocode_cache": get_geocode_cache_metrics(),
+        "location_providers": get_location_service_metrics(),
+    }
@@ -1,14 +1,44 @@
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
 import traceback
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import Command
 
+from app.config.settings import THREAD_TTL
+from app.database.checkpoint_maintenance import is_archived, restore_thread
+from app.database.instrumented_saver import on_checkpoint_write
 from app.database.postgres import get_postgres_saver, get_async_postgres_saver
-from app.graph.chat_graph import create_chat_graph
+from app.graph.chat_graph import get_async_chat_graph
+from app.graph.nodes import asummarize_conversation
+from app.services.history_cache import get_history_cache
+from app.services.token_budget import messages_to_compact
+from app.util.metrics import Counters
 
 logger = logging.getLogger(__name__)
 
+INTERRUPT_MESSAGE = "Proporcione su feedback o escriba 'done' para finalizar"
+
+# Node whose LLM tokens are forwarded to streaming clients
+STREAMED_NODE = "generate_response"
+
+# One lock per thread: a turn holds it while the graph runs, a compaction only to apply its update
+_thread_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+# Pending background compactions by thread
+_compaction_tasks: Dict[str, asyncio.Task] = {}
+_compaction_counters = Counters("scheduled", "compacted", "within_budget", "stale", "failed", "messages_removed")
+
+# Threads this worker used recently (monotonic time); they can't have been archived yet
+_recent_threads: "OrderedDict[str, float]" = OrderedDict()
+RECENT_THREADS_MAX = 10000
+
+# Any checkpoint this worker writes for a thread (turns, compactions) makes its cached history stale
+on_checkpoint_write(get_history_cache().invalidate)
+
 
 # def process_message(
 #         message: str,
@@ -87,11 +117,169 @@ logger = logging.getLogger(__name__)
 #         }
 
 
-def process_message(
+def _initial_state(message: str) -> Dict[str, Any]:
+    """
+    Prepare the graph input for a new turn.
+
+    Only per-turn channels are reset; the summary written by background
+    compaction and the vehicle_info gathered over previous turns are left
+    untouched in the checkpoint.
+    """
+    return {
+        "input": message,
+        "messages": [],
+        "context": "",
+        "answer": "",
+        "human_feedback": []
+    }
+
+
+async def _restore_if_archived(thread_id: str) -> None:
+    """
+    Bring a thread archived after THREAD_TTL back into the checkpoint tables before it's used.
+
+    Threads this worker used within half the TTL are skipped, so active
+    conversations don't pay the archive lookup on every turn. The lookup runs
+    on the async pool; only archived threads go through the restore
+    transaction on the sync pool that maintenance also uses.
+    """
+    if THREAD_TTL <= 0:
+        return
+
+    now = time.monotonic()
+    last_used = _recent_threads.get(thread_id)
+    if last_used is None or now - last_used > THREAD_TTL / 2:
+        try:
+            if await is_archived(thread_id) and await asyncio.to_thread(restore_thread, thread_id):
+                get_history_cache().invalidate(thread_id)
+                logger.info(f"Restored archived thread {thread_id}")
+        except Exception as e:
+            logger.error(f"Error restoring archived thread {thread_id}: {str(e)}")
+
+    _recent_threads[thread_id] = now
+    _recent_threads.move_to_end(thread_id)
+    while len(_recent_threads) > RECENT_THREADS_MAX:
+        _recent_threads.popitem(last=False)
+
+
+def _thread_lock(thread_id: str) -> asyncio.Lock:
+    """Get the lock serializing turns and compactions of a thread."""
+    lock = _thread_locks.get(thread_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _thread_locks[thread_id] = lock
+    return lock
+
+
+async def compact_thread(graph: CompiledStateGraph, thread_id: str) -> bool:
+    """
+    Summarize and remove the oldest messages of a thread whose history exceeds the token budget.
+
+    The summary is generated without holding the thread lock; the update is
+    applied only if no turn has written a checkpoint in the meantime (the
+    next turn reschedules it otherwise).
+
+    Args:
+        graph: The compiled chat graph
+        thread_id: The thread to compact
+
+    Returns:
+        True if the thread was compacted
+    """
+    config = {"configurable": {"thread_id": thread_id}}
+    try:
+        snapshot = await graph.aget_state(config)
+        update = await asummarize_conversation(snapshot.values)
+        if not update:
+            _compaction_counters.increment("within_budget")
+            return False
+
+        async with _thread_lock(thread_id):
+            current = await graph.aget_state(config)
+            checkpoint_id = current.config["configurable"].get("checkpoint_id")
+            waiting_for_feedback = current.next == ("human_feedback",)
+            if checkpoint_id != snapshot.config["configurable"].get("checkpoint_id") or \
+                    (current.next and not waiting_for_feedback):
+                _compaction_counters.increment("stale")
+                return False
+
+            # Written as the node that ran last, so the thread stays paused at
+            # human_feedback (or finished) exactly as before
+            await graph.aupdate_state(config, update, as_node="generate_response" if waiting_for_feedback else "end_node")
+
+        _compaction_counters.increment("compacted")
+        _compaction_counters.increment("messages_removed", len(update["messages"]))
+        logger.info(f"Compacted {len(update['messages'])} messages of thread {thread_id}")
+        return True
+
+    except Exception as e:
+        _compaction_counters.increment("failed")
+        logger.error(f"Error compacting thread {thread_id}: {str(e)}")
+        return False
+
+
+def schedule_compaction(graph: CompiledStateGraph, thread_id: str, messages: List[BaseMessage],
+                        summary: Optional[str] = None) -> None:
+    """
+    Compact the thread in the background if the history left by the turn exceeds the token budget.
+
+    Args:
+        graph: The compiled chat graph
+        thread_id: The thread of the turn
+        messages: The thread's messages after the turn
+        summary: The thread's summary, if known
+    """
+    if not messages_to_compact(messages, summary):
+        return
+    pending = _compaction_tasks.get(thread_id)
+    if pending is not None and not pending.done():
+        return
+
+    task = asyncio.create_task(compact_thread(graph, thread_id), name=f"compact-thread-{thread_id}")
+    _compaction_tasks[thread_id] = task
+    task.add_done_callback(lambda _: _compaction_tasks.pop(thread_id, None))
+    _compaction_counters.increment("scheduled")
+
+
+async def stop_compactions() -> None:
+    """
+    Cancel pending background compactions.
+    Called on application shutdown, before the database pools are closed.
+    """
+    tasks = list(_compaction_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def get_compaction_metrics() -> Dict[str, int]:
+    """Return background compaction counters."""
+    return _compaction_counters.snapshot()
+
+
+async def _run_turn(graph: CompiledStateGraph, graph_input: Any, config: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Run one turn of the graph.
+
+    Returns:
+        The state values after the last step, and whether the run stopped at the human_feedback interrupt
+    """
+    values: Dict[str, Any] = {}
+    is_interrupted = False
+    async for mode, chunk in graph.astream(graph_input, config, stream_mode=["values", "updates"]):
+        if mode == "values":
+            values = chunk
+        elif "__interrupt__" in chunk:
+            is_interrupted = True
+    return values, is_interrupted
+
+
+async def process_message(
         message: str,
         thread_id: str,
         is_resuming: bool = False,
-        reset_thread: bool = False
+        reset_thread: bool = False,
+        use_response_cache: bool = True
 ) -> Dict[str, Any]:
     """
     Process a chat message using the LangGraph workflow.
@@ -102,21 +290,21 @@ def process_message(
         thread_id: A unique identifier for this conversation thread
         is_resuming: Whether this is resuming after an interrupt
         reset_thread: Whether to reset the thread and start a new conversation
+        use_response_cache: Whether this thread may be answered from the semantic response cache
 
     Returns:
         dict: The result containing answer, status (completed/interrupted), and thread_id
     """
     try:
-        # Create the chat graph
-        logger.info(f"Creating chat graph for thread {thread_id}")
-        graph = create_chat_graph()
-        logger.info(f"Chat graph created successfully for thread {thread_id}")
+        # Reuse the process-wide compiled chat graph (async checkpointer)
+        graph = await get_async_chat_graph()
 
         # Set up configuration with the thread_id
         config = {
             "configurable": {
                 "thread_id": thread_id,
-                "reset_thread": reset_thread
+                "reset_thread": reset_thread,
+                "use_response_cache": use_response_cache
             }
         }
 
@@ -127,52 +315,31 @@ def process_message(
             graph_input = Command(resume=message)
         else:
             logger.info(f"Starting new graph execution for thread {thread_id}")
-            # For new conversations, build the initial state
-            state = None
-
-            # Try to get existing state for non-reset conversations
-            if not reset_thread:
-                try:
-                    state = graph.get_state(config)
-                    logger.info(f"Retrieved existing state for thread {thread_id}")
-                except Exception as e:
-                    logger.info(f"No existing state found for thread {thread_id}: {str(e)}")
-
-            # Prepare the initial state
-            initial_state = {
-                "input": message,
-                "messages": [],
-                "context": "",
-                "answer": "",
-                "vehicle_info": {},
-                "human_feedback": [],
-                "summary": ""
-            }
+            graph_input = _initial_state(message)
 
-            graph_input = initial_state
+        async with _thread_lock(thread_id):
+            await _restore_if_archived(thread_id)
 
-        # Execute the graph
-        try:
-            logger.info(f"Invoking graph for thread {thread_id}")
-            result = graph.invoke(graph_input, config)
-            logger.info(f"Graph execution completed or paused for thread {thread_id}")
-        except Exception as graph_error:
-            logger.error(f"Error during graph execution: {str(graph_error)}")
-            logger.error(f"Graph execution traceback: {traceback.format_exc()}")
-            raise graph_error
-
-        # Check if we hit an interrupt (graph is waiting at human_feedback node)
-        # Get the current state after execution
-        state = graph.get_state(config)
-
-        # If the next node to execute is human_feedback, we're in an interrupt
-        is_interrupted = False
-        if state.next and any("human_feedback" in node for node in state.next):
-            is_interrupted = True
+            # Execute the graph; the final state and the interrupt come from its
+            # output, so the checkpoint isn't read back after the run
+            try:
+                logger.info(f"Invoking graph for thread {thread_id}")
+                values, is_interrupted = await _run_turn(graph, graph_input, config)
+                logger.info(f"Graph execution completed or paused for thread {thread_id}")
+            except Exception as graph_error:
+                logger.error(f"Error during graph execution: {str(graph_error)}")
+                logger.error(f"Graph execution traceback: {traceback.format_exc()}")
+                raise graph_error
+
+        if is_interrupted:
             logger.info(f"Graph interrupted at human_feedback for thread {thread_id}")
 
+        messages = values.get("messages", [])
+        get_history_cache().put(thread_id, _format_history(messages))
+        schedule_compaction(graph, thread_id, messages, values.get("summary"))
+
         # Get the answer from state
-        answer = state.values.get("answer", "")
+        answer = values.get("answer", "")
         logger.info(f"Final answer for thread {thread_id}: {answer}")
 
         # Return appropriate response based on whether we're interrupted
@@ -181,7 +348,7 @@ def process_message(
             "message": message,
             "answer": answer,
             "status": "interrupted" if is_interrupted else "completed",
-            "interrupt_message": "Proporcione su feedback o escriba 'done' para finalizar" if is_interrupted else None
+            "interrupt_message": INTERRUPT_MESSAGE if is_interrupted else None
         }
 
     except Exception as e:
@@ -197,10 +364,160 @@ def process_message(
             "status": "error"
         }
 
+
+async def stream_message(
+        message: str,
+        thread_id: str,
+        is_resuming: bool = False,
+        reset_thread: bool = False,
+        use_response_cache: bool = True
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Process a chat message and yield events as the graph runs.
+
+    Tokens produced by the generate_response node are forwarded as soon as the
+    LLM emits them; the turn ends with a single trailing event carrying the full
+    answer and the interrupt status.
+
+    Args:
+        message: The user's message
+        thread_id: A unique identifier for this conversation thread
+        is_resuming: Whether this is resuming after an interrupt
+        reset_thread: Whether to reset the thread and start a new conversation
+        use_response_cache: Whether this thread may be answered from the semantic response cache
+
+    Yields:
+        dict: Events of the form {"event": "token" | "end" | "error", "data": {...}}
+    """
+    try:
+        graph = await get_async_chat_graph()
+
+        config = {
+            "configurable": {
+                "thread_id": thread_id,
+                "reset_thread": reset_thread,
+                "use_response_cache": use_response_cache
+            }
+        }
+
+        if is_resuming:
+            logger.info(f"Resuming streamed graph execution for thread {thread_id}")
+            graph_input = Command(resume=message)
+        else:
+            logger.info(f"Starting streamed graph execution for thread {thread_id}")
+            graph_input = _initial_state(message)
+
+        answer = ""
+        values: Dict[str, Any] = {}
+        streamed_tokens = False
+        is_interrupted = False
+
+        async with _thread_lock(thread_id):
+            await _restore_if_archived(thread_id)
+
+            async for mode, chunk in graph.astream(graph_input, config,
+                                                   stream_mode=["messages", "updates", "values"]):
+                if mode == "messages":
+                    message_chunk, metadata = chunk
+                    if metadata.get("langgraph_node") != STREAMED_NODE:
+                        continue
+                    content = getattr(message_chunk, "content", "")
+                    if content:
+                        streamed_tokens = True
+                        yield {"event": "token", "data": {"content": content}}
+
+                elif mode == "values":
+                    # Full state after each step: the whole history and the stored summary
+                    values = chunk
+
+                elif mode == "updates":
+                    if "__interrupt__" in chunk:
+                        is_interrupted = True
+                        logger.info(f"Graph interrupted at human_feedback for thread {thread_id}")
+                        continue
+                    for node_update in chunk.values():
+                        if isinstance(node_update, dict) and node_update.get("answer"):
+                            answer = node_update["answer"]
+
+        messages = values.get("messages", [])
+        if messages:
+            get_history_cache().put(thread_id, _format_history(messages))
+        schedule_compaction(graph, thread_id, messages, values.get("summary"))
+
+        # Answers that didn't come from the LLM (e.g. end_node) are sent whole
+        if answer and not streamed_tokens:
+            yield {"event": "token", "data": {"content": answer}}
+
+        yield {
+            "event": "end",
+            "data": {
+                "thread_id": thread_id,
+                "message": message,
+                "answer": answer,
+                "status": "interrupted" if is_interrupted else "completed",
+                "interrupt_message": INTERRUPT_MESSAGE if is_interrupted else None
+            }
+        }
+
+    except Exception as e:
+        error_detail = str(e) if str(e) else "Unknown error (empty exception message)"
+        logger.error(f"Error streaming message: {error_detail}")
+        logger.error(f"Stack trace: {traceback.format_exc()}")
+        yield {
+            "event": "error",
+            "data": {
+                "thread_id": thread_id,
+                "message": message,
+                "error": error_detail,
+                "status": "error"
+            }
+        }
+
+
+def _format_history(chat_history: List[BaseMessage]) -> List[Dict[str, Any]]:
+    """Format graph messages as role/content dictionaries."""
+    formatted_history = []
+
+    # Process each message in the chat history
+    for message in chat_history:
+        # Skip any items that don't have the expected structure
+        if not hasattr(message, 'content'):
+            continue
+
+        if isinstance(message, HumanMessage):
+            formatted_history.append({
+                "role": "human",
+                "content": message.content
+            })
+        elif isinstance(message, AIMessage):
+            formatted_history.append({
+                "role": "ai",
+                "content": message.content
+            })
+        elif hasattr(message, 'type') and message.type in ["human", "ai"]:
+            formatted_history.append({
+                "role": message.type,
+                "content": message.content
+            })
+        elif hasattr(message, '__class__') and hasattr(message.__class__, '__name__'):
+            # Fallback: Determine the role based on message class name
+            role = "human" if "Human" in message.__class__.__name__ else "ai"
+            formatted_history.append({
+                "role": role,
+                "content": message.content
+            })
+
+    return formatted_history
+
+
 async def get_chat_history(thread_id: str) -> List[Dict[str, Any]]:
     """
     Retrieve the chat history for a given thread.
 
+    Served from the thread history cache when this worker has a fresh copy;
+    otherwise the checkpoint is read (after restoring the thread if it was
+    archived) and the result cached.
+
     Args:
         thread_id: The thread ID
 
@@ -208,16 +525,21 @@ async def get_chat_history(thread_id: str) -> List[Dict[str, Any]]:
         List of message objects with role and content
     """
     try:
-        # Create the chat graph to access its API
-        logger.info(f"Creating chat graph for thread {thread_id}")
-        graph = create_chat_graph()
+        cache = get_history_cache()
+        cached_history = cache.get(thread_id)
+        if cached_history is not None:
+            return cached_history
+
+        # Reuse the compiled chat graph to access its API
+        graph = await get_async_chat_graph()
+        await _restore_if_archived(thread_id)
 
         # Create a configuration for the thread
         config = {"configurable": {"thread_id": thread_id}}
 
         # Retrieve the state
         try:
-            state_snapshot = graph.get_state(config)
+            state_snapshot = await graph.aget_state(config)
             logger.info(f"Retrieved state snapshot for thread {thread_id}")
         except Exception as e:
             logger.error(f"Error retrieving state from graph: {str(e)}")
@@ -232,36 +554,8 @@ async def get_chat_history(thread_id: str) -> List[Dict[str, Any]]:
             return []
 
         # Format into a more user-friendly structure
-        formatted_history = []
-
-        # Process each message in the chat history
-        for message in chat_history:
-            # Skip any items that don't have the expected structure
-            if not hasattr(message, 'content'):
-                continue
-
-            if isinstance(message, HumanMessage):
-                formatted_history.append({
-                    "role": "human",
-                    "content": message.content
-                })
-            elif isinstance(message, AIMessage):
-                formatted_history.append({
-                    "role": "ai",
-                    "content": message.content
-                })
-            elif hasattr(message, 'type') and message.type in ["human", "ai"]:
-                formatted_history.append({
-                    "role": message.type,
-                    "content": message.content
-                })
-            elif hasattr(message, '__class__') and hasattr(message.__class__, '__name__'):
-                # Fallback: Determine the role based on message class name
-                role = "human" if "Human" in message.__class__.__name__ else "ai"
-                formatted_history.append({
-                    "role": role,
-                    "content": message.content
-                })
+        formatted_history = _format_history(chat_history)
+        cache.put(thread_id, formatted_history)
 
         logger.info(f"Retrieved {len(formatted_history)} messages for thread {thread_id}")
         return formatted_history
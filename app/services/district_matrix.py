@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config.settings import (
+    DISTRICT_MATRIX_PATH,
+    DISTRICT_MATRIX_REFRESH_INTERVAL,
+    DISTRICT_MATRIX_MATCH_RADIUS_KM,
+    LOCATION_OFFLINE_MODE
+)
+from app.services.plant_index import haversine_km
+
+logger = logging.getLogger(__name__)
+
+# (distance in km, duration in minutes, estimated)
+MatrixEntry = Tuple[float, float, bool]
+
+
+@dataclass
+class DistrictDistanceMatrix:
+    """
+    Precomputed road distance and drive time from each known district to each plant.
+
+    Rows are districts (with the geocoded origin they were routed from),
+    columns are plants. Entries the routing API couldn't resolve hold the
+    local estimate and are flagged in `estimated`.
+    """
+    districts: List[str]
+    plant_ids: List[str]
+    origins: np.ndarray  # (districts, 2) latitude, longitude
+    distance_km: np.ndarray  # (districts, plants) float32
+    duration_min: np.ndarray  # (districts, plants) float32
+    estimated: np.ndarray  # (districts, plants) bool
+    built_at: float
+
+    def __post_init__(self):
+        self._rows = {district: i for i, district in enumerate(self.districts)}
+        self._columns = {plant_id: j for j, plant_id in enumerate(self.plant_ids)}
+
+    def row_for(self, lat: float, lng: float, district: Optional[str] = None,
+                radius_km: float = DISTRICT_MATRIX_MATCH_RADIUS_KM) -> Optional[int]:
+        """
+        Find the matrix row for a district name, or for an origin that matches a district's geocoded point.
+
+        Returns:
+            The row index, or None if the origin isn't a known district
+        """
+        if district is not None and district in self._rows:
+            return self._rows[district]
+        if not self.districts:
+            return None
+
+        distances = haversine_km(lat, lng, self.origins[:, 0], self.origins[:, 1])
+        row = int(np.argmin(distances))
+        return row if distances[row] <= radius_km else None
+
+    def lookup(self, lat: float, lng: float, plant_ids: List[str],
+               district: Optional[str] = None) -> Optional[Dict[str, MatrixEntry]]:
+        """
+        Return precomputed entries for the given plants from a known district.
+
+        Returns:
+            Mapping of plant ID to (distance km, duration min, estimated), or None
+            if the origin isn't a known district or a plant isn't in the matrix
+        """
+        row = self.row_for(lat, lng, district)
+        if row is None or any(plant_id not in self._columns for plant_id in plant_ids):
+            return None
+
+        return {
+            plant_id: (
+                float(self.distance_km[row, self._columns[plant_id]]),
+                float(self.duration_min[row, self._columns[plant_id]]),
+                bool(self.estimated[row, self._columns[plant_id]])
+            )
+            for plant_id in plant_ids
+        }
+
+    def age(self) -> float:
+        """Seconds since the matrix was built."""
+        return time.time() - self.built_at
+
+    def save(self, path: str = DISTRICT_MATRIX_PATH) -> None:
+        """Write the matrix to a compressed .npz file (atomically)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            districts=np.array(self.districts),
+            plant_ids=np.array(self.plant_ids),
+            origins=self.origins,
+            distance_km=self.distance_km,
+            duration_min=self.duration_min,
+            estimated=self.estimated,
+            built_at=np.array(self.built_at)
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = DISTRICT_MATRIX_PATH) -> "DistrictDistanceMatrix":
+        """Read a matrix written by save."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                districts=[str(district) for district in data["districts"]],
+                plant_ids=[str(plant_id) for plant_id in data["plant_ids"]],
+                origins=data["origins"],
+                distance_km=data["distance_km"],
+                duration_min=data["duration_min"],
+                estimated=data["estimated"],
+                built_at=float(data["built_at"])
+            )
+
+
+def build_district_matrix() -> DistrictDistanceMatrix:
+    """
+    Route every known district to every plant through the location service.
+
+    Districts are geocoded through the geocode cache; a district the providers
+    can't resolve is left out rather than stored with the fallback point.
+
+    Returns:
+        The new matrix (not saved)
+    """
+    # Imported here: the location service consults this module in calculate_distances
+    from app.services.location_matcher import DISTRICTS
+    from app.services.location_provider import get_location_service
+    from app.services.plant_registry import PLANTS
+
+    service = get_location_service()
+    plants = list(PLANTS.values())
+    plant_ids = [plant.id for plant in plants]
+
+    districts, origins, distances, durations, estimated = [], [], [], [], []
+    for district in sorted(set(DISTRICTS.values())):
+        coordinates = service.geocode(district)
+        if coordinates is None:
+            logger.warning(f"Skipping district '{district}': could not geocode it")
+            continue
+
+        lat, lng = coordinates
+        results = {
+            result["id"]: result
+            for result in service.calculate_distances(lat, lng, plants, top_k=len(plants), use_matrix=False)
+        }
+        districts.append(district)
+        origins.append((lat, lng))
+        distances.append([results[plant_id]["distance_km"] for plant_id in plant_ids])
+        durations.append([results[plant_id]["duration_min"] for plant_id in plant_ids])
+        estimated.append([results[plant_id].get("estimated", False) for plant_id in plant_ids])
+
+    return DistrictDistanceMatrix(
+        districts=districts,
+        plant_ids=plant_ids,
+        origins=np.array(origins, dtype=np.float64).reshape(-1, 2),
+        distance_km=np.array(distances, dtype=np.float32).reshape(-1, len(plant_ids)),
+        duration_min=np.array(durations, dtype=np.float32).reshape(-1, len(plant_ids)),
+        estimated=np.array(estimated, dtype=bool).reshape(-1, len(plant_ids)),
+        built_at=time.time()
+    )
+
+
+# Singleton instance
+_district_matrix: Optional[DistrictDistanceMatrix] = None
+_district_matrix_lock = threading.Lock()
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def get_district_matrix() -> Optional[DistrictDistanceMatrix]:
+    """Get the loaded matrix, or None if none has been loaded or built yet."""
+    return _district_matrix
+
+
+def load_district_matrix(path: str = DISTRICT_MATRIX_PATH) -> Optional[DistrictDistanceMatrix]:
+    """
+    Load the matrix file into the singleton.
+
+    Returns:
+        The matrix, or None if the file doesn't exist or can't be read
+    """
+    global _district_matrix
+
+    if not os.path.exists(path):
+        logger.info(f"No district matrix at {path}")
+        return None
+
+    try:
+        matrix = DistrictDistanceMatrix.load(path)
+    except Exception as e:
+        logger.error(f"Error loading district matrix from {path}: {str(e)}")
+        return None
+
+    with _district_matrix_lock:
+        _district_matrix = matrix
+    logger.info(f"Loaded district matrix: {len(matrix.districts)} districts x {len(matrix.plant_ids)} plants")
+    return matrix
+
+
+def refresh_district_matrix(path: str = DISTRICT_MATRIX_PATH) -> DistrictDistanceMatrix:
+    """Rebuild the matrix, save it and swap it into the singleton."""
+    global _district_matrix
+
+    matrix = build_district_matrix()
+    matrix.save(path)
+    with _district_matrix_lock:
+        _district_matrix = matrix
+    logger.info(f"District matrix rebuilt: {len(matrix.districts)} districts x {len(matrix.plant_ids)} plants")
+    return matrix
+
+
+async def _refresh_periodically(interval: int) -> None:
+    """Rebuild the matrix whenever it is older than interval."""
+    while True:
+        matrix = get_district_matrix()
+        wait = interval - matrix.age() if matrix is not None else 0
+        if wait > 0:
+            await asyncio.sleep(wait)
+            # Another worker may have rebuilt the file meanwhile
+            await asyncio.to_thread(load_district_matrix)
+            continue
+
+        try:
+            await asyncio.to_thread(refresh_district_matrix)
+        except Exception as e:
+            logger.error(f"Error refreshing district matrix: {str(e)}")
+            await asyncio.sleep(min(interval, 3600))
+
+
+async def start_district_matrix(interval: int = DISTRICT_MATRIX_REFRESH_INTERVAL) -> None:
+    """
+    Load the matrix file and schedule its refresh.
+    Called on application startup; a missing or stale matrix is rebuilt in the background.
+    """
+    global _refresh_task
+
+    await asyncio.to_thread(load_district_matrix)
+    if interval <= 0 or LOCATION_OFFLINE_MODE or _refresh_task is not None:
+        return
+    _refresh_task = asyncio.create_task(_refresh_periodically(interval), name="district-matrix-refresh")
+
+
+async def stop_district_matrix() -> None:
+    """
+    Cancel the scheduled refresh.
+    Called on application shutdown.
+    """
+    global _refresh_task
+
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        await asyncio.gather(_refresh_task, return_exceptions=True)
+        _refresh_task = None
+
+
+def main() -> None:
+    """Build the district x plant matrix file."""
+    parser = argparse.ArgumentParser(description="Build the district to plant distance matrix")
+    parser.add_argument("--output", default=DISTRICT_MATRIX_PATH, help="Path of the .npz file to write")
+    args = parser.parse_args()
+
+    matrix = refresh_district_matrix(args.output)
+    print(f"Wrote {args.output}: {len(matrix.districts)} districts x {len(matrix.plant_ids)} plants, "
+          f"{int(matrix.estimated.sum())} estimated entries")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,18 +1,32 @@
+import asyncio
 import io
 import logging
 import os
 from datetime import datetime
 from typing import Dict, Any, List, Optional, Tuple, BinaryIO
-from uuid import uuid4
+from uuid import UUID, uuid4, uuid5
 
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseUpload
 from google.oauth2 import service_account
-from langchain_openai import OpenAIEmbeddings
-from qdrant_client import QdrantClient
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client.http import models
 
-from app.config.settings import QDRANT_URL, QDRANT_API_KEY, OPENAI_API_KEY
+from app.config.settings import (
+    QDRANT_URL,
+    QDRANT_API_KEY,
+    QDRANT_PREFER_GRPC,
+    QDRANT_GRPC_PORT,
+    OPENAI_API_KEY,
+    EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_CONCURRENCY,
+    CHUNK_SIZE_TOKENS,
+    CHUNK_OVERLAP_TOKENS,
+    QDRANT_UPSERT_BATCH_SIZE
+)
+from app.services.embedding_cache import get_cached_embeddings
 from app.util.text_extractor import TextExtractor
 
 logger = logging.getLogger(__name__)
@@ -23,22 +37,39 @@ class DocumentService:
     Service for handling document operations, including:
     - Uploading to Google Drive
     - Processing text content
+    - Splitting it into overlapping, token-sized chunks
     - Creating vector embeddings
     - Storing in Qdrant
     """
 
-    def __init__(self):
-        """Initialize the service with the necessary clients."""
+    def __init__(self, qdrant_client: Optional[QdrantClient] = None,
+                 async_qdrant_client: Optional[AsyncQdrantClient] = None):
+        """
+        Initialize the service with the necessary clients.
+
+        Args:
+            qdrant_client: Optional sync client; built from settings if omitted
+            async_qdrant_client: Optional async client (e.g. AsyncQdrantClient(":memory:")); built from settings if omitted
+        """
         try:
-            # Initialize Qdrant client
-            self.qdrant_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+            # Initialize Qdrant clients: the sync one serves the sync graph nodes,
+            # the async one every coroutine caller
+            self.qdrant_client = qdrant_client or QdrantClient(**self._qdrant_client_kwargs())
+            self.async_qdrant_client = async_qdrant_client or AsyncQdrantClient(**self._qdrant_client_kwargs())
 
-            # Initialize OpenAI embeddings
-            self.embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+            # Initialize OpenAI embeddings behind the shared embedding cache
+            self.embeddings = get_cached_embeddings()
 
             # Initialize Google Drive service
             self.drive_service = self._initialize_drive_service()
 
+            # Token-aware splitter so chunks stay under the embedding model's limit
+            self.text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+                model_name=EMBEDDING_MODEL,
+                chunk_size=CHUNK_SIZE_TOKENS,
+                chunk_overlap=CHUNK_OVERLAP_TOKENS
+            )
+
             # Collection name for Qdrant
             self.collection_name = "chat_docs"
 
@@ -50,6 +81,16 @@ class DocumentService:
             logger.error(f"Error initializing DocumentService: {str(e)}")
             raise
 
+    @staticmethod
+    def _qdrant_client_kwargs() -> Dict[str, Any]:
+        """Connection settings shared by the sync and async Qdrant clients."""
+        return {
+            "url": QDRANT_URL,
+            "api_key": QDRANT_API_KEY,
+            "prefer_grpc": QDRANT_PREFER_GRPC,
+            "grpc_port": QDRANT_GRPC_PORT
+        }
+
     def _initialize_drive_service(self):
         """Initialize and return a Google Drive service client."""
         credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
@@ -83,6 +124,13 @@ class DocumentService:
                     )
                 )
                 logger.info(f"Created Qdrant collection: {self.collection_name}")
+
+                # Index the parent link so a document's chunks can be deleted by filter
+                self.qdrant_client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name="metadata.parent_document_id",
+                    field_schema=models.PayloadSchemaType.KEYWORD
+                )
             else:
                 logger.info(f"Qdrant collection already exists: {self.collection_name}")
         except Exception as e:
@@ -90,14 +138,16 @@ class DocumentService:
             raise
 
     async def upload_document(self, file_name: str, file_content: bytes, mime_type: str,
-                              folder_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> Dict[
-        str, Any]:
+                              folder_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None,
+                              document_id: Optional[str] = None,
+                              drive_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Process a document by:
         1. Optionally uploading to Google Drive (if folder_id is provided)
         2. Extracting text content
-        3. Creating embeddings
-        4. Storing in Qdrant
+        3. Splitting it into overlapping chunks
+        4. Creating embeddings in concurrent batches
+        5. Storing the chunks in Qdrant in batches
 
         Args:
             file_name: Name of the file
@@ -105,32 +155,32 @@ class DocumentService:
             mime_type: MIME type of the file
             folder_id: Optional Google Drive folder ID to upload to
             metadata: Additional metadata to store with the document
+            document_id: ID for the document (a new one by default). Chunk IDs derive from it,
+                so uploading again with the same ID overwrites the chunks instead of duplicating them.
+            drive_metadata: Metadata of a Drive file already uploaded for this document;
+                when given, the Drive upload is skipped
 
         Returns:
             Dictionary with metadata about the processed document
         """
         try:
-            drive_metadata = {}
-
-            # Upload to Google Drive if folder ID is provided and Drive service is available
-            if folder_id and self.drive_service:
-                drive_metadata = self._upload_to_drive(folder_id, file_name, file_content, mime_type)
-                logger.info(
-                    f"Document uploaded to Google Drive: {drive_metadata.get('name')} (ID: {drive_metadata.get('id')})")
+            if drive_metadata is None:
+                drive_metadata = await self.upload_to_drive(folder_id, file_name, file_content, mime_type)
 
-            # Extract text content from the document
-            text_content = TextExtractor.extract_text_content(file_content, mime_type)
+            # Extract text content from the document (CPU-bound, keep it off the event loop)
+            text_content = await asyncio.to_thread(TextExtractor.extract_text_content, file_content, mime_type)
 
             # Skip empty documents
             if not text_content.strip():
                 logger.warning(f"No text content extracted from document: {file_name}")
                 return {"error": "No text content could be extracted from this document"}
 
-            # Create vector embedding
-            vector = await self.embeddings.aembed_query(text_content)
+            # Split into chunks and embed them
+            chunks = await asyncio.to_thread(self.text_splitter.split_text, text_content)
+            vectors = await self._embed_chunks(chunks)
 
-            # Generate a unique ID for the document in Qdrant
-            point_id = str(uuid4())
+            # Generate a unique ID for the parent document
+            document_id = document_id or str(uuid4())
 
             # Combine all metadata
             combined_metadata = {
@@ -141,27 +191,36 @@ class DocumentService:
                 **(metadata or {})
             }
 
-            # Store in Qdrant
-            self.qdrant_client.upsert(
-                collection_name=self.collection_name,
-                points=[models.PointStruct(
-                    id=point_id,
+            # One point per chunk, each linking back to the parent document
+            points = [
+                models.PointStruct(
+                    id=str(uuid5(UUID(document_id), str(index))),
                     vector=vector,
                     payload={
-                        "content": text_content,
-                        "metadata": combined_metadata,
+                        "content": chunk,
+                        "metadata": {
+                            **combined_metadata,
+                            "parent_document_id": document_id,
+                            "chunk_index": index,
+                            "chunk_count": len(chunks)
+                        },
                         "type": "document"
                     }
-                )]
-            )
+                )
+                for index, (chunk, vector) in enumerate(zip(chunks, vectors))
+            ]
+
+            # Store in Qdrant
+            await self._upsert_points(points)
 
-            logger.info(f"Document processed and stored in Qdrant with ID: {point_id}")
+            logger.info(f"Document processed and stored in Qdrant with ID: {document_id} ({len(chunks)} chunks)")
 
             return {
-                "document_id": point_id,
+                "document_id": document_id,
                 "drive_file_id": drive_metadata.get("id") if drive_metadata else None,
                 "filename": file_name,
                 "content_length": len(text_content),
+                "chunk_count": len(chunks),
                 "metadata": combined_metadata
             }
 
@@ -169,6 +228,51 @@ class DocumentService:
             logger.error(f"Error processing document {file_name}: {str(e)}")
             raise
 
+    async def _embed_chunks(self, chunks: List[str]) -> List[List[float]]:
+        """
+        Embed chunks with batched aembed_documents calls, at most
+        EMBEDDING_CONCURRENCY batches in flight at once.
+
+        Args:
+            chunks: The chunk texts
+
+        Returns:
+            One vector per chunk, in order
+        """
+        semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+
+        async def embed_batch(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self.embeddings.aembed_documents(batch)
+
+        batches = [chunks[i:i + EMBEDDING_BATCH_SIZE] for i in range(0, len(chunks), EMBEDDING_BATCH_SIZE)]
+        results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+    async def _upsert_points(self, points: List[models.PointStruct]) -> None:
+        """Upsert points to Qdrant in batches of QDRANT_UPSERT_BATCH_SIZE."""
+        for start in range(0, len(points), QDRANT_UPSERT_BATCH_SIZE):
+            await self.async_qdrant_client.upsert(
+                collection_name=self.collection_name,
+                points=points[start:start + QDRANT_UPSERT_BATCH_SIZE]
+            )
+
+    async def upload_to_drive(self, folder_id: Optional[str], file_name: str, file_content: bytes,
+                              mime_type: str) -> Dict[str, Any]:
+        """
+        Upload a file to Google Drive if a folder ID is provided and the Drive service is available.
+
+        Returns:
+            The Drive file metadata, or an empty dict if nothing was uploaded
+        """
+        if not (folder_id and self.drive_service):
+            return {}
+
+        drive_metadata = await asyncio.to_thread(self._upload_to_drive, folder_id, file_name, file_content, mime_type)
+        logger.info(f"Document uploaded to Google Drive: {drive_metadata.get('name')} (ID: {drive_metadata.get('id')})")
+        return drive_metadata
+
     def _upload_to_drive(self, folder_id: str, file_name: str, file_content: bytes, mime_type: str) -> Dict[str, Any]:
         """Upload a file to Google Drive and return its metadata."""
         if not self.drive_service:
@@ -205,32 +309,64 @@ class DocumentService:
             query_vector = self.embeddings.embed_query(query)
 
             # Search in Qdrant
-            search_results = self.qdrant_client.search(
+            search_results = self.qdrant_client.query_points(
                 collection_name=self.collection_name,
-                query_vector=query_vector,
+                query=query_vector,
                 limit=limit
             )
 
-            # Format the results
-            documents = []
-            for result in search_results:
-                payload = result.payload
-                documents.append({
-                    "id": result.id,
-                    "score": result.score,
-                    "content": payload.get("content", ""),
-                    "metadata": payload.get("metadata", {})
-                })
+            return self._format_search_results(search_results.points)
+
+        except Exception as e:
+            logger.error(f"Error searching documents: {str(e)}")
+            raise
+
+    async def asearch_documents(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Async version of search_documents that doesn't block the event loop.
+
+        Args:
+            query: The search query
+            limit: Maximum number of results to return
+
+        Returns:
+            List of document data including content and metadata
+        """
+        try:
+            # Create query embedding
+            query_vector = await self.embeddings.aembed_query(query)
+
+            # Search in Qdrant without blocking the event loop
+            search_results = await self.async_qdrant_client.query_points(
+                collection_name=self.collection_name,
+                query=query_vector,
+                limit=limit
+            )
 
-            return documents
+            return self._format_search_results(search_results.points)
 
         except Exception as e:
             logger.error(f"Error searching documents: {str(e)}")
             raise
 
+    @staticmethod
+    def _format_search_results(search_results) -> List[Dict[str, Any]]:
+        """Convert Qdrant scored points into plain document dictionaries."""
+        documents = []
+        for result in search_results:
+            payload = result.payload
+            documents.append({
+                "id": result.id,
+                "score": result.score,
+                "content": payload.get("content", ""),
+                "metadata": payload.get("metadata", {})
+            })
+
+        return documents
+
     def delete_document(self, document_id: str) -> bool:
         """
-        Delete a document from the vector store.
+        Delete a document and all of its chunks from the vector store.
 
         Args:
             document_id: The ID of the document to delete
@@ -241,12 +377,46 @@ class DocumentService:
         try:
             self.qdrant_client.delete(
                 collection_name=self.collection_name,
-                points_selector=models.PointIdsList(
-                    points=[document_id]
-                )
+                points_selector=self._document_selector(document_id)
             )
             logger.info(f"Document deleted from Qdrant: {document_id}")
             return True
         except Exception as e:
             logger.error(f"Error deleting document {document_id}: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+
+    async def adelete_document(self, document_id: str) -> bool:
+        """
+        Async version of delete_document.
+
+        Args:
+            document_id: The ID of the document to delete
+
+        Returns:
+            True if the deletion was successful
+        """
+        try:
+            await self.async_qdrant_client.delete(
+                collection_name=self.collection_name,
+                points_selector=self._document_selector(document_id)
+            )
+            logger.info(f"Document deleted from Qdrant: {document_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting document {document_id}: {str(e)}")
+            return False
+
+    @staticmethod
+    def _document_selector(document_id: str) -> models.FilterSelector:
+        """Select a document's chunks, or the single point of documents stored before chunking."""
+        return models.FilterSelector(
+            filter=models.Filter(
+                should=[
+                    models.FieldCondition(
+                        key="metadata.parent_document_id",
+                        match=models.MatchValue(value=document_id)
+                    ),
+                    models.HasIdCondition(has_id=[document_id])
+                ]
+            )
+        )
@@ -0,0 +1,376 @@
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from app.config.settings import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_CACHE_BACKEND,
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_MEMORY_SIZE,
+    EMBEDDING_CACHE_WARMUP_SIZE
+)
+from app.util.metrics import Counters
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_cache_key(model: str, text: str) -> str:
+    """Content hash identifying the embedding of text under model."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore(ABC):
+    """Persistent tier of the embedding cache."""
+
+    @abstractmethod
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return the stored vectors for the keys that exist."""
+
+    @abstractmethod
+    def put_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        """Store vectors, ignoring keys that already exist."""
+
+    def hottest(self, limit: int) -> Dict[str, np.ndarray]:
+        """Return up to limit of the most frequently read vectors."""
+        return {}
+
+
+class PostgresEmbeddingStore(EmbeddingStore):
+    """Stores vectors in the embedding_cache table."""
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        from app.database.engine import SessionLocal
+        from app.database.models import EmbeddingCacheEntry
+
+        if not keys:
+            return {}
+
+        with SessionLocal() as session:
+            rows = (
+                session.query(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.embedding)
+                .filter(EmbeddingCacheEntry.content_hash.in_(keys))
+                .all()
+            )
+            found = {row.content_hash: np.frombuffer(row.embedding, dtype=np.float32) for row in rows}
+
+            if found:
+                # Track read frequency so warm-up can preload the hottest entries
+                session.query(EmbeddingCacheEntry).filter(
+                    EmbeddingCacheEntry.content_hash.in_(list(found))
+                ).update({EmbeddingCacheEntry.hits: EmbeddingCacheEntry.hits + 1}, synchronize_session=False)
+                session.commit()
+
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        from sqlalchemy.dialects.postgresql import insert
+        from app.database.engine import SessionLocal
+        from app.database.models import EmbeddingCacheEntry
+
+        if not vectors:
+            return
+
+        rows = [
+            {
+                "content_hash": key,
+                "model": self.model,
+                "dims": int(vector.shape[0]),
+                "embedding": vector.astype(np.float32).tobytes(),
+                "hits": 0
+            }
+            for key, vector in vectors.items()
+        ]
+        with SessionLocal() as session:
+            session.execute(insert(EmbeddingCacheEntry).values(rows).on_conflict_do_nothing())
+            session.commit()
+
+    def hottest(self, limit: int) -> Dict[str, np.ndarray]:
+        from app.database.engine import SessionLocal
+        from app.database.models import EmbeddingCacheEntry
+
+        with SessionLocal() as session:
+            rows = (
+                session.query(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.embedding)
+                .filter(EmbeddingCacheEntry.model == self.model)
+                .order_by(EmbeddingCacheEntry.hits.desc())
+                .limit(limit)
+                .all()
+            )
+        return {row.content_hash: np.frombuffer(row.embedding, dtype=np.float32) for row in rows}
+
+
+class DiskEmbeddingStore(EmbeddingStore):
+    """Stores each vector as a raw float32 file under a sharded directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.f32")
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        for key in keys:
+            path = self._path(key)
+            if os.path.exists(path):
+                found[key] = np.fromfile(path, dtype=np.float32)
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        for key, vector in vectors.items():
+            path = self._path(key)
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so readers never see a partial file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            vector.astype(np.float32).tofile(tmp_path)
+            os.replace(tmp_path, path)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with an in-memory LRU tier and an optional persistent tier.
+
+    Texts are keyed by a content hash; misses from both tiers are embedded in
+    batches of batch_size with the underlying model and written back to both.
+    """
+
+    def __init__(self, underlying: Embeddings, model: str, store: Optional[EmbeddingStore] = None,
+                 memory_size: int = EMBEDDING_CACHE_MEMORY_SIZE, batch_size: int = EMBEDDING_BATCH_SIZE):
+        self.underlying = underlying
+        self.model = model
+        self.store = store
+        self.memory_size = memory_size
+        self.batch_size = batch_size
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = Counters("memory_hits", "persistent_hits", "misses", "batches", "store_errors")
+
+    # Memory tier
+
+    def _memory_get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+        return found
+
+    def _memory_put(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in vectors.items():
+                self._memory[key] = vector
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    # Persistent tier (errors degrade to a miss)
+
+    def _store_get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if self.store is None or not keys:
+            return {}
+        try:
+            return self.store.get_many(keys)
+        except Exception as e:
+            self.metrics.increment("store_errors")
+            logger.error(f"Error reading embedding cache store: {str(e)}")
+            return {}
+
+    def _store_put(self, vectors: Dict[str, np.ndarray]) -> None:
+        if self.store is None or not vectors:
+            return
+        try:
+            self.store.put_many(vectors)
+        except Exception as e:
+            self.metrics.increment("store_errors")
+            logger.error(f"Error writing embedding cache store: {str(e)}")
+
+    # Lookup pipeline
+
+    def _lookup(self, texts: List[str]) -> Tuple[List[str], Dict[str, np.ndarray], Dict[str, str]]:
+        """Resolve texts from the memory tier; return keys, found vectors and missing key->text."""
+        keys = [embedding_cache_key(self.model, text) for text in texts]
+        found = self._memory_get(keys)
+        self.metrics.increment("memory_hits", sum(1 for key in keys if key in found))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing[key] = text
+        return keys, found, missing
+
+    def _record_persistent_hits(self, found: Dict[str, np.ndarray], missing: Dict[str, str],
+                                persisted: Dict[str, np.ndarray]) -> None:
+        self.metrics.increment("persistent_hits", len(persisted))
+        self._memory_put(persisted)
+        found.update(persisted)
+        for key in persisted:
+            missing.pop(key, None)
+
+    def _batches(self, missing: Dict[str, str]) -> Iterable[List[str]]:
+        keys = list(missing)
+        for start in range(0, len(keys), self.batch_size):
+            yield keys[start:start + self.batch_size]
+
+    def _record_embedded(self, found: Dict[str, np.ndarray], batch_keys: List[str],
+                         vectors: List[List[float]]) -> Dict[str, np.ndarray]:
+        self.metrics.increment("batches")
+        self.metrics.increment("misses", len(batch_keys))
+        embedded = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(batch_keys, vectors)}
+        self._memory_put(embedded)
+        found.update(embedded)
+        return embedded
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts)
+
+        if missing:
+            self._record_persistent_hits(found, missing, self._store_get(list(missing)))
+
+        for batch_keys in self._batches(missing):
+            vectors = self.underlying.embed_documents([missing[key] for key in batch_keys])
+            self._store_put(self._record_embedded(found, batch_keys, vectors))
+
+        return [found[key].tolist() for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts)
+
+        if missing and self.store is not None:
+            persisted = await asyncio.to_thread(self._store_get, list(missing))
+            self._record_persistent_hits(found, missing, persisted)
+
+        for batch_keys in self._batches(missing):
+            vectors = await self.underlying.aembed_documents([missing[key] for key in batch_keys])
+            embedded = self._record_embedded(found, batch_keys, vectors)
+            if self.store is not None:
+                await asyncio.to_thread(self._store_put, embedded)
+
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    # Warm-up and metrics
+
+    def warm_up(self, texts: List[str]) -> int:
+        """Embed texts through the cache so both tiers hold them; returns the count."""
+        unique_texts = list(dict.fromkeys(text for text in texts if text.strip()))
+        if unique_texts:
+            self.embed_documents(unique_texts)
+        return len(unique_texts)
+
+    def warm_up_from_store(self, limit: int = EMBEDDING_CACHE_WARMUP_SIZE) -> int:
+        """Preload the most frequently read persisted vectors into memory; returns the count."""
+        if self.store is None or limit <= 0:
+            return 0
+        try:
+            vectors = self.store.hottest(min(limit, self.memory_size))
+        except Exception as e:
+            logger.error(f"Error warming up embedding cache: {str(e)}")
+            return 0
+        self._memory_put(vectors)
+        return len(vectors)
+
+    def get_metrics(self) -> Dict[str, object]:
+        """Return hit/miss counters and hit rates."""
+        metrics = self.metrics.snapshot()
+        lookups = metrics["memory_hits"] + metrics["persistent_hits"] + metrics["misses"]
+        hits = metrics["memory_hits"] + metrics["persistent_hits"]
+        with self._lock:
+            memory_entries = len(self._memory)
+        return {
+            **metrics,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": memory_entries,
+            "store": type(self.store).__name__ if self.store is not None else None
+        }
+
+
+# Singleton instances, one per model
+_cached_embeddings: Dict[str, CachedEmbeddings] = {}
+_cached_embeddings_lock = threading.Lock()
+
+
+def create_embedding_store(model: str, kind: str = EMBEDDING_CACHE_BACKEND) -> Optional[EmbeddingStore]:
+    """Create the persistent tier by name ("postgres", "disk" or "none")."""
+    if kind == "postgres":
+        return PostgresEmbeddingStore(model)
+    if kind == "disk":
+        return DiskEmbeddingStore(os.path.join(EMBEDDING_CACHE_DIR, model))
+    if kind == "none":
+        return None
+    raise ValueError(f"Unknown embedding cache backend: {kind}")
+
+
+def get_cached_embeddings(model: str = EMBEDDING_MODEL) -> CachedEmbeddings:
+    """
+    Get or create the cached OpenAI embeddings for a model.
+    This is a singleton pattern so every caller shares the same memory tier.
+    """
+    embeddings = _cached_embeddings.get(model)
+    if embeddings is not None:
+        return embeddings
+
+    with _cached_embeddings_lock:
+        embeddings = _cached_embeddings.get(model)
+        if embeddings is None:
+            embeddings = CachedEmbeddings(
+                OpenAIEmbeddings(model=model),
+                model=model,
+                store=create_embedding_store(model)
+            )
+            preloaded = embeddings.warm_up_from_store()
+            _cached_embeddings[model] = embeddings
+            logger.info(f"Embedding cache initialized for {model} ({preloaded} entries preloaded)")
+
+    return embeddings
+
+
+def get_embedding_cache_metrics() -> Dict[str, object]:
+    """Return metrics for every cached embeddings model."""
+    return {model: embeddings.get_metrics() for model, embeddings in _cached_embeddings.items()}
+
+
+def main() -> None:
+    """Warm the embedding cache with frequent queries, one per line in a file."""
+    parser = argparse.ArgumentParser(description="Warm up the embedding cache")
+    parser.add_argument("queries_file", help="Text file with one query per line, most frequent first")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="Embedding model to warm up")
+    parser.add_argument("--limit", type=int, default=None, help="Only warm the first N queries")
+    args = parser.parse_args()
+
+    with open(args.queries_file, encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    if args.limit is not None:
+        queries = queries[:args.limit]
+
+    embeddings = get_cached_embeddings(args.model)
+    count = embeddings.warm_up(queries)
+    print(f"Warmed {count} queries: {embeddings.get_metrics()}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,242 @@
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from app.config.settings import (
+    GEOCODE_CACHE_MEMORY_SIZE,
+    GEOCODE_CACHE_TTL,
+    GEOCODE_CACHE_NEGATIVE_TTL
+)
+from app.util.metrics import Counters
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# (latitude, longitude), or None when the location couldn't be geocoded
+LatLng = Tuple[float, float]
+Geocoder = Callable[[str], Optional[LatLng]]
+
+
+def normalize_location(location: str) -> str:
+    """Normalize location text (case, accents, whitespace) so variants share a cache key."""
+    folded = unicodedata.normalize("NFKD", location.lower())
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return _WHITESPACE_RE.sub(" ", folded).strip(" ,.")[:255]
+
+
+class GeocodeCache:
+    """
+    Two-tier cache in front of a geocoder.
+
+    Lookups go to an in-process LRU first, then to the geocode_cache table
+    (shared by all workers), and only then to the geocoder. Locations the
+    geocoder can't resolve are cached too, with a shorter TTL, so repeated
+    unknown text doesn't hit the API; transport errors are never cached.
+    """
+
+    def __init__(self, provider: str, geocoder: Geocoder, memory_size: int = GEOCODE_CACHE_MEMORY_SIZE,
+                 ttl: int = GEOCODE_CACHE_TTL, negative_ttl: int = GEOCODE_CACHE_NEGATIVE_TTL):
+        """
+        Args:
+            provider: Provider name, part of the persistent cache key
+            geocoder: Function returning (lat, lng) for a location, None if not found; raises on errors
+            memory_size: Maximum entries in the in-process LRU
+            ttl: Seconds a resolved location stays cached
+            negative_ttl: Seconds a failed lookup stays cached
+        """
+        self.provider = provider
+        self.geocoder = geocoder
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.metrics = Counters("memory_hits", "db_hits", "negative_hits", "misses", "geocoded", "not_found",
+                                "errors")
+        self._memory: "OrderedDict[str, Tuple[Optional[LatLng], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, location: str) -> Optional[LatLng]:
+        """
+        Return the coordinates of a location, or None if it can't be geocoded.
+
+        Raises:
+            Exception: Whatever the geocoder raises on a transport or API error
+        """
+        key = normalize_location(location)
+
+        found, value = self._memory_get(key)
+        if found:
+            self.metrics.increment("memory_hits" if value is not None else "negative_hits")
+            return value
+
+        found, value, expires_at = self._db_get(key)
+        if found:
+            self.metrics.increment("db_hits" if value is not None else "negative_hits")
+            self._memory_put(key, value, expires_at)
+            return value
+
+        self.metrics.increment("misses")
+        try:
+            value = self.geocoder(location)
+        except Exception:
+            self.metrics.increment("errors")
+            raise
+
+        self.metrics.increment("geocoded" if value is not None else "not_found")
+        self._put(key, value)
+        return value
+
+    def preload(self, locations: Iterable[str]) -> int:
+        """
+        Fill the memory tier for a known set of locations.
+
+        Entries already in the table are loaded with one query; the rest are geocoded.
+
+        Returns:
+            Number of locations now cached in memory
+        """
+        keys = {normalize_location(location): location for location in locations}
+
+        for key, (value, expires_at) in self._db_get_many(list(keys)).items():
+            self._memory_put(key, value, expires_at)
+
+        loaded = 0
+        for key, location in keys.items():
+            try:
+                self.get(location)
+                loaded += 1
+            except Exception as e:
+                logger.warning(f"Could not preload geocode for '{location}': {str(e)}")
+
+        logger.info(f"Preloaded {loaded}/{len(keys)} locations into the {self.provider} geocode cache")
+        return loaded
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the hit rate."""
+        metrics = self.metrics.snapshot()
+        hits = metrics["memory_hits"] + metrics["db_hits"] + metrics["negative_hits"]
+        lookups = hits + metrics["misses"]
+        with self._lock:
+            memory_entries = len(self._memory)
+        return {
+            **metrics,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": memory_entries
+        }
+
+    # Memory tier
+
+    def _memory_get(self, key: str) -> Tuple[bool, Optional[LatLng]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._memory[key]
+                return False, None
+            self._memory.move_to_end(key)
+            return True, value
+
+    def _memory_put(self, key: str, value: Optional[LatLng], expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (value, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    # Persistent tier
+
+    def _db_get(self, key: str) -> Tuple[bool, Optional[LatLng], float]:
+        entries = self._db_get_many([key])
+        if key not in entries:
+            return False, None, 0.0
+        value, expires_at = entries[key]
+        return True, value, expires_at
+
+    def _db_get_many(self, keys: list) -> Dict[str, Tuple[Optional[LatLng], float]]:
+        """Load unexpired entries for keys; database errors are logged and treated as misses."""
+        from app.database.engine import SessionLocal
+        from app.database.models import GeocodeCacheEntry
+
+        if not keys:
+            return {}
+
+        try:
+            with SessionLocal() as session:
+                rows = (
+                    session.query(GeocodeCacheEntry)
+                    .filter(GeocodeCacheEntry.provider == self.provider)
+                    .filter(GeocodeCacheEntry.location_key.in_(keys))
+                    .filter(GeocodeCacheEntry.expires_at > datetime.utcnow())
+                    .all()
+                )
+                # Convert the remaining lifetime to a wall-clock deadline for the memory tier
+                now = datetime.utcnow()
+                return {
+                    row.location_key: (
+                        (row.lat, row.lng) if row.found else None,
+                        time.time() + (row.expires_at - now).total_seconds()
+                    )
+                    for row in rows
+                }
+        except Exception as e:
+            self.metrics.increment("errors")
+            logger.error(f"Error reading geocode cache: {str(e)}")
+            return {}
+
+    def _put(self, key: str, value: Optional[LatLng]) -> None:
+        """Store a lookup result in both tiers."""
+        from app.database.engine import SessionLocal
+        from app.database.models import GeocodeCacheEntry
+
+        ttl = self.ttl if value is not None else self.negative_ttl
+        self._memory_put(key, value, time.time() + ttl)
+
+        try:
+            with SessionLocal() as session:
+                session.merge(GeocodeCacheEntry(
+                    provider=self.provider,
+                    location_key=key,
+                    found=value is not None,
+                    lat=value[0] if value is not None else None,
+                    lng=value[1] if value is not None else None,
+                    expires_at=datetime.utcnow() + timedelta(seconds=ttl)
+                ))
+                session.commit()
+        except Exception as e:
+            self.metrics.increment("errors")
+            logger.error(f"Error writing geocode cache: {str(e)}")
+
+
+# One cache per geocoding provider
+_geocode_caches: Dict[str, GeocodeCache] = {}
+_geocode_caches_lock = threading.Lock()
+
+
+def get_geocode_cache(provider: str, geocoder: Geocoder) -> GeocodeCache:
+    """
+    Get or create the GeocodeCache for a provider.
+
+    Args:
+        provider: Provider name ("mapbox", "google")
+        geocoder: The provider's geocoder, used on first creation
+
+    Returns:
+        The provider's cache
+    """
+    if provider not in _geocode_caches:
+        with _geocode_caches_lock:
+            if provider not in _geocode_caches:
+                _geocode_caches[provider] = GeocodeCache(provider, geocoder)
+    return _geocode_caches[provider]
+
+
+def get_geocode_cache_metrics() -> Dict[str, Any]:
+    """Return metrics for every provider's geocode cache."""
+    return {provider: cache.get_metrics() for provider, cache in _geocode_caches.items()}
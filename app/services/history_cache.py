@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.settings import HISTORY_CACHE_SIZE, HISTORY_CACHE_TTL
+from app.util.metrics import Counters
+
+# Formatted chat history: [{"role": "human" | "ai", "content": ...}]
+History = List[Dict[str, Any]]
+
+
+class ThreadHistoryCache:
+    """
+    In-process LRU of formatted chat histories by thread.
+
+    Turns write their resulting history through, and any checkpoint this
+    worker writes for a thread invalidates its entry; the TTL bounds how long
+    a turn served by another worker can go unseen.
+    """
+
+    def __init__(self, max_entries: int = HISTORY_CACHE_SIZE, ttl: float = HISTORY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.metrics = Counters("hits", "misses", "invalidations")
+        self._entries: "OrderedDict[str, Tuple[History, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, thread_id: str) -> Optional[History]:
+        """Return the cached history, or None if it's missing or expired."""
+        with self._lock:
+            entry = self._entries.get(thread_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(thread_id)
+                self.metrics.increment("hits")
+                return entry[0]
+            if entry is not None:
+                del self._entries[thread_id]
+        self.metrics.increment("misses")
+        return None
+
+    def put(self, thread_id: str, history: History) -> None:
+        """Cache the history of a thread."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[thread_id] = (history, time.monotonic() + self.ttl)
+            self._entries.move_to_end(thread_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, thread_id: str) -> None:
+        """Drop the cached history of a thread."""
+        with self._lock:
+            if self._entries.pop(thread_id, None) is not None:
+                self.metrics.increment("invalidations")
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of cached threads."""
+        with self._lock:
+            size = len(self._entries)
+        return {**self.metrics.snapshot(), "entries": size}
+
+
+# Singleton instance
+_history_cache = ThreadHistoryCache()
+
+
+def get_history_cache() -> ThreadHistoryCache:
+    """Get the process-wide chat history cache."""
+    return _history_cache
+
+
+def get_history_cache_metrics() -> Dict[str, int]:
+    """Return chat history cache counters."""
+    return _history_cache.get_metrics()
@@ -0,0 +1,40 @@
+import re
+
+from app.services.location_matcher import fold_accents
+
+# Brands and models from the extraction prompt, plus other common ones in Peru
+_BRANDS = ["toyota", "hyundai", "kia", "nissan", "chevrolet", "suzuki", "mitsubishi", "honda", "mazda",
+           "volkswagen", "ford", "renault", "subaru", "changan", "jac", "great wall"]
+_MODELS = ["avanza", "yaris", "corolla", "hilux", "rav4", "rush", "fortuner", "land cruiser", "prado", "etios",
+           "raize", "agya", "accent", "elantra", "tucson", "santa fe", "creta", "rio", "cerato", "sportage",
+           "picanto", "seltos", "sentra", "versa", "x-trail", "frontier", "kicks", "march"]
+
+_PATTERNS = [
+    # Prices and budgets: "S/ 50,000", "$20000", "20 mil", "30k", "soles", "dólares", "presupuesto"
+    r"s/\.?\s*\d", r"\$\s*\d", r"\b\d+(?:[.,]\d+)?\s*(?:mil|k|soles|dolares|usd|lucas)\b",
+    r"\b(?:presupuesto|precio|cuota|inicial|financiamiento|financiar|credito|contado)\b",
+    # Engine, transmission, capacity
+    r"\b\d(?:[.,]\d)?\s*(?:l|litros?)\b", r"\b\d{3,4}\s*cc\b", r"\b(?:vvt-?i|turbo|diesel|gasolinera?|glp|gnv|hibrido)\b",
+    r"\b(?:automatic[oa]|mecanic[oa]|manual|cvt|transmision|caja)\b",
+    r"\b\d+\s*(?:pasajeros|asientos|personas|plazas|filas)\b",
+    # Features
+    r"\b(?:maletera|maletero|pantalla|airbags?|bolsas de aire|camara|sensores?|4x4|traccion|rendimiento|consumo)\b",
+    # Buyer situation and contact details
+    r"\b(?:familia|trabajo|taxi|uber|parte de pago|usado|semanas?|meses?)\b",
+    r"\b9\d{2}[\s-]?\d{3}[\s-]?\d{3}\b", r"[\w.+-]+@[\w-]+\.[\w.]+", r"\b(?:me llamo|mi nombre es|soy)\b",
+    # Brands and models
+    r"\b(?:" + "|".join(re.escape(name).replace(r"\ ", r"\s+") for name in _BRANDS + _MODELS) + r")\b",
+]
+
+# One compiled alternation, matched against accent-folded lowercase text
+_INFO_RE = re.compile("|".join(f"(?:{pattern})" for pattern in _PATTERNS))
+
+
+def has_extractable_info(text: str) -> bool:
+    """
+    Cheap check for facts the vehicle info extractor could capture (prices,
+    models, engine, transmission, capacity, features, contact details).
+
+    False means the LLM extraction can be skipped for this message.
+    """
+    return bool(text) and _INFO_RE.search(fold_accents(text)) is not None
@@ -0,0 +1,407 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from sqlalchemy import func, or_, select, update
+
+from app.config.settings import (
+    INGESTION_WORKERS,
+    INGESTION_QUEUE_SIZE,
+    INGESTION_MAX_PENDING,
+    INGESTION_MAX_ATTEMPTS,
+    INGESTION_POLL_INTERVAL,
+    INGESTION_STALE_AFTER,
+    INGESTION_STALE_SWEEP_INTERVAL,
+    INGESTION_RETRY_BACKOFF
+)
+from app.database.engine import AsyncSessionLocal
+from app.database.pool import get_pool_budget, ingestion_connections
+from app.database.models import IngestionJob
+from app.services.document_service import DocumentService
+from app.util.metrics import Counters
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionBacklogFullError(Exception):
+    """Raised when the pending job backlog is too large to accept more files."""
+
+
+def _job_to_dict(job: IngestionJob) -> Dict[str, Any]:
+    """Public view of a job (without the file content)."""
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error,
+        "result": job.result,
+        "next_attempt_at": job.next_attempt_at,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+
+class IngestionService:
+    """
+    Background document ingestion backed by the ingestion_jobs table.
+
+    Uploads are stored as pending jobs and return immediately. A dispatcher
+    claims pending jobs with SELECT ... FOR UPDATE SKIP LOCKED (so several
+    processes can share the table) only while the bounded in-memory queue has
+    room, and a pool of workers runs DocumentService.upload_document on them.
+
+    Retries are idempotent: chunk IDs derive from the job ID, so a retry
+    overwrites the chunks of a failed attempt, and a Drive upload is reused.
+    Failed attempts are retried with exponential backoff.
+    """
+
+    def __init__(self, document_service_provider: Callable[[], DocumentService],
+                 workers: int = INGESTION_WORKERS, queue_size: int = INGESTION_QUEUE_SIZE):
+        self.document_service_provider = document_service_provider
+        self.workers = workers
+        self.queue_size = queue_size
+        self.metrics = Counters("enqueued", "completed", "failed", "retried", "requeued_stale")
+        self._queue: Optional[asyncio.Queue] = None
+        self._wake_up: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        # Jobs this process claimed and hasn't finished, requeued on stop()
+        self._claimed: Set[str] = set()
+
+    # API side
+
+    async def enqueue(self, files: List[Tuple[str, bytes, str]], folder_id: Optional[str] = None,
+                      metadata: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Store files as pending ingestion jobs.
+
+        Args:
+            files: (file name, content, MIME type) tuples
+            folder_id: Optional Google Drive folder ID to upload to
+            metadata: Additional metadata stored with every document
+
+        Returns:
+            The created jobs
+
+        Raises:
+            IngestionBacklogFullError: If the pending backlog is over INGESTION_MAX_PENDING
+        """
+        async with AsyncSessionLocal() as session:
+            pending = await session.scalar(
+                select(func.count()).select_from(IngestionJob).where(IngestionJob.status == "pending")
+            )
+            if pending + len(files) > INGESTION_MAX_PENDING:
+                raise IngestionBacklogFullError(
+                    f"Ingestion backlog is full ({pending} pending jobs), try again later"
+                )
+
+            jobs = [
+                IngestionJob(
+                    id=str(uuid4()),
+                    filename=file_name,
+                    mime_type=mime_type,
+                    folder_id=folder_id,
+                    document_metadata=metadata,
+                    content=content,
+                    status="pending",
+                    attempts=0
+                )
+                for file_name, content, mime_type in files
+            ]
+            session.add_all(jobs)
+            # Flush to apply column defaults, and read the jobs before commit expires them
+            await session.flush()
+            created = [_job_to_dict(job) for job in jobs]
+            await session.commit()
+
+        self.metrics.increment("enqueued", len(created))
+        if self._wake_up is not None:
+            self._wake_up.set()
+
+        logger.info(f"Enqueued {len(created)} ingestion jobs")
+        return created
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's status, or None if it doesn't exist."""
+        async with AsyncSessionLocal() as session:
+            job = await session.get(IngestionJob, job_id)
+            return _job_to_dict(job) if job is not None else None
+
+    async def get_queue_stats(self) -> Dict[str, Any]:
+        """Return job counts per status plus worker counters."""
+        async with AsyncSessionLocal() as session:
+            rows = await session.execute(
+                select(IngestionJob.status, func.count()).group_by(IngestionJob.status)
+            )
+            by_status = {status: count for status, count in rows.all()}
+
+        return {
+            "jobs": by_status,
+            "queued_in_process": self._queue.qsize() if self._queue is not None else 0,
+            **self.metrics.snapshot()
+        }
+
+    # Worker side
+
+    async def start(self) -> None:
+        """Start the dispatcher and worker tasks."""
+        if self._tasks:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._wake_up = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._dispatch(), name="ingestion-dispatcher")]
+        self._tasks += [
+            asyncio.create_task(self._work(), name=f"ingestion-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Ingestion service started with {self.workers} workers")
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks and return the jobs they had claimed but not finished to pending."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        try:
+            await self._release_claimed_jobs()
+        except Exception as e:
+            # Left running, they are requeued by the stale job sweep
+            logger.error(f"Error requeuing claimed ingestion jobs: {str(e)}")
+        logger.info("Ingestion service stopped")
+
+    async def _release_claimed_jobs(self) -> None:
+        """Return this process's queued and in-flight jobs to pending."""
+        if not self._claimed:
+            return
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                update(IngestionJob)
+                .where(IngestionJob.id.in_(self._claimed), IngestionJob.status == "running")
+                # Interrupted by the shutdown, not failed: the attempt doesn't count
+                .values(status="pending", attempts=IngestionJob.attempts - 1, next_attempt_at=None)
+            )
+            await session.commit()
+
+        self._claimed.clear()
+        if result.rowcount:
+            logger.info(f"Requeued {result.rowcount} claimed ingestion jobs on shutdown")
+
+    async def _requeue_stale_jobs(self) -> None:
+        """Return jobs left running by a crashed process to pending (never this process's own jobs)."""
+        cutoff = datetime.utcnow() - timedelta(seconds=INGESTION_STALE_AFTER)
+        stale = [IngestionJob.status == "running", IngestionJob.started_at < cutoff]
+        if self._claimed:
+            stale.append(IngestionJob.id.notin_(self._claimed))
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(update(IngestionJob).where(*stale).values(status="pending"))
+            await session.commit()
+
+        if result.rowcount:
+            self.metrics.increment("requeued_stale", result.rowcount)
+            logger.warning(f"Requeued {result.rowcount} stale ingestion jobs")
+
+    async def _claim_jobs(self, limit: int) -> List[str]:
+        """Atomically mark up to limit pending jobs (past their retry backoff) as running and return their IDs."""
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(IngestionJob.id)
+                .where(IngestionJob.status == "pending",
+                       or_(IngestionJob.next_attempt_at.is_(None), IngestionJob.next_attempt_at <= now))
+                .order_by(IngestionJob.created_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            job_ids = list(result.scalars().all())
+
+            if job_ids:
+                await session.execute(
+                    update(IngestionJob)
+                    .where(IngestionJob.id.in_(job_ids))
+                    .values(status="running", started_at=now, attempts=IngestionJob.attempts + 1)
+                )
+            await session.commit()
+
+        self._claimed.update(job_ids)
+        return job_ids
+
+    async def _dispatch(self) -> None:
+        """
+        Feed claimed jobs to the workers, never claiming more than the queue can hold,
+        and requeue stale jobs every INGESTION_STALE_SWEEP_INTERVAL seconds.
+        """
+        loop = asyncio.get_running_loop()
+        next_sweep = loop.time()
+        while True:
+            try:
+                if loop.time() >= next_sweep:
+                    next_sweep = loop.time() + INGESTION_STALE_SWEEP_INTERVAL
+                    await self._requeue_stale_jobs()
+
+                # Cleared before claiming so wake-ups during the claim aren't lost
+                self._wake_up.clear()
+
+                free_slots = self._queue.maxsize - self._queue.qsize()
+                job_ids = await self._claim_jobs(free_slots) if free_slots > 0 else []
+
+                for job_id in job_ids:
+                    await self._queue.put(job_id)
+
+                if not job_ids or self._queue.full():
+                    # Backpressure: sleep until a job is enqueued or a worker frees a slot,
+                    # polling for work enqueued by other processes
+                    try:
+                        await asyncio.wait_for(self._wake_up.wait(), timeout=INGESTION_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error dispatching ingestion jobs: {str(e)}")
+                await asyncio.sleep(INGESTION_POLL_INTERVAL)
+
+    async def _work(self) -> None:
+        """Process jobs from the queue until cancelled."""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Left running; the stale job sweep of some process requeues it
+                self._claimed.discard(job_id)
+                logger.error(f"Unexpected error processing ingestion job {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _process_job(self, job_id: str) -> None:
+        """
+        Run the ingestion pipeline for one job and record the outcome.
+
+        No session is held while the document is uploaded, extracted and
+        embedded: the job is read in one short session and its outcome written
+        in another. The document ID is the job ID, so every attempt writes the
+        same chunk IDs.
+        """
+        async with AsyncSessionLocal() as session:
+            job = await session.get(IngestionJob, job_id)
+            if job is None or job.status != "running":
+                self._claimed.discard(job_id)
+                return
+            filename, attempts, drive_file = job.filename, job.attempts, job.drive_file
+            upload_args = {
+                "file_name": job.filename,
+                "file_content": job.content,
+                "mime_type": job.mime_type,
+                "folder_id": job.folder_id,
+                "metadata": job.document_metadata,
+                "document_id": job.id
+            }
+
+        outcome: Dict[str, Any] = {"finished_at": None}
+        try:
+            document_service = self.document_service_provider()
+            if drive_file is None:
+                drive_file = await document_service.upload_to_drive(
+                    upload_args["folder_id"], filename, upload_args["file_content"], upload_args["mime_type"]
+                )
+                await self._save_drive_file(job_id, attempts, drive_file)
+
+            result = await document_service.upload_document(**upload_args, drive_metadata=drive_file)
+            if "error" in result:
+                # Nothing to extract; retrying won't help
+                raise ValueError(result["error"])
+
+            outcome.update(status="completed", result=result, error=None,
+                           content=None)  # The document lives in Qdrant now
+            self.metrics.increment("completed")
+            logger.info(f"Ingestion job {job_id} completed: {filename}")
+
+        except Exception as e:
+            outcome["error"] = str(e)
+            if attempts < INGESTION_MAX_ATTEMPTS and not isinstance(e, ValueError):
+                delay = INGESTION_RETRY_BACKOFF * 2 ** (attempts - 1)
+                outcome.update(status="pending", next_attempt_at=datetime.utcnow() + timedelta(seconds=delay))
+                self.metrics.increment("retried")
+                logger.warning(f"Ingestion job {job_id} failed (attempt {attempts}), retrying in {delay:.0f}s: {str(e)}")
+            else:
+                outcome["status"] = "failed"
+                self.metrics.increment("failed")
+                logger.error(f"Ingestion job {job_id} failed: {str(e)}")
+
+        outcome["finished_at"] = datetime.utcnow()
+        async with AsyncSessionLocal() as session:
+            # Only if the job is still this attempt (not requeued as stale and claimed again meanwhile)
+            await session.execute(
+                update(IngestionJob)
+                .where(IngestionJob.id == job_id, IngestionJob.status == "running",
+                       IngestionJob.attempts == attempts)
+                .values(**outcome)
+            )
+            await session.commit()
+
+        self._claimed.discard(job_id)
+        if self._wake_up is not None:
+            self._wake_up.set()
+
+    @staticmethod
+    async def _save_drive_file(job_id: str, attempts: int, drive_file: Dict[str, Any]) -> None:
+        """Record the Drive upload on the job, so later attempts don't upload the file again."""
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(IngestionJob)
+                .where(IngestionJob.id == job_id, IngestionJob.status == "running",
+                       IngestionJob.attempts == attempts)
+                .values(drive_file=drive_file)
+            )
+            await session.commit()
+
+
+# Singleton instance
+_ingestion_service: Optional[IngestionService] = None
+
+
+def get_ingestion_service() -> IngestionService:
+    """Get the IngestionService singleton (created by start_ingestion_service)."""
+    if _ingestion_service is None:
+        raise RuntimeError("Ingestion service has not been started")
+    return _ingestion_service
+
+
+async def start_ingestion_service(document_service_provider: Callable[[], DocumentService]) -> IngestionService:
+    """
+    Create the IngestionService singleton and start its workers.
+    Called on application startup.
+    """
+    global _ingestion_service
+
+    if _ingestion_service is None:
+        # Workers beyond what the async ORM pool can serve would starve the API's sessions
+        workers = INGESTION_WORKERS
+        pool_size = get_pool_budget().sizes["orm_async"]
+        while workers > 1 and ingestion_connections(workers) > pool_size:
+            workers -= 1
+        if workers < INGESTION_WORKERS:
+            logger.warning(f"Capping ingestion workers to {workers} (async ORM pool of {pool_size} connections); "
+                           f"raise DB_MAX_CONNECTIONS or the orm_async share to run {INGESTION_WORKERS}")
+        _ingestion_service = IngestionService(document_service_provider, workers=workers)
+    await _ingestion_service.start()
+    return _ingestion_service
+
+
+async def stop_ingestion_service() -> None:
+    """
+    Stop the ingestion workers.
+    Called on application shutdown.
+    """
+    if _ingestion_service is not None:
+        await _ingestion_service.stop()
@@ -0,0 +1,197 @@
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+from app.config.settings import (
+    LLM_MODEL,
+    OPENAI_BASE_URL,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_KEEPALIVE_EXPIRY,
+    LLM_TIMEOUT,
+    LLM_MAX_RETRIES
+)
+from app.util.metrics import Counters
+
+logger = logging.getLogger(__name__)
+
+# httpcore trace event emitted once per newly opened TCP connection
+_NEW_CONNECTION_EVENT = "connection.connect_tcp.complete"
+
+# Singleton instances
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+_llm_clients: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], ChatOpenAI] = {}
+_lock = threading.Lock()
+
+# Connection reuse metrics
+_metrics = Counters("requests", "new_connections", "llm_clients_created", "llm_client_cache_hits")
+
+
+def _trace(event_name: str, info: Dict[str, Any]) -> None:
+    """httpcore trace callback for the sync client."""
+    if event_name == _NEW_CONNECTION_EVENT:
+        _metrics.increment("new_connections")
+
+
+async def _atrace(event_name: str, info: Dict[str, Any]) -> None:
+    """httpcore trace callback for the async client."""
+    if event_name == _NEW_CONNECTION_EVENT:
+        _metrics.increment("new_connections")
+
+
+def _on_request(request: httpx.Request) -> None:
+    """Count outgoing requests and attach the connection tracer."""
+    _metrics.increment("requests")
+    request.extensions["trace"] = _trace
+
+
+async def _aon_request(request: httpx.Request) -> None:
+    """Async variant of _on_request."""
+    _metrics.increment("requests")
+    request.extensions["trace"] = _atrace
+
+
+def _limits() -> httpx.Limits:
+    """Connection pool limits shared by the sync and async HTTP clients."""
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Get or create the shared sync HTTP client used by all LLM clients.
+    This is a singleton pattern so every call reuses the same keep-alive pool.
+    """
+    global _http_client
+
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    limits=_limits(),
+                    timeout=LLM_TIMEOUT,
+                    event_hooks={"request": [_on_request]}
+                )
+                logger.info("Shared LLM HTTP client initialized")
+
+    return _http_client
+
+
+def get_http_async_client() -> httpx.AsyncClient:
+    """
+    Get or create the shared async HTTP client used by all LLM clients.
+    This is a singleton pattern so every call reuses the same keep-alive pool.
+    """
+    global _http_async_client
+
+    if _http_async_client is None:
+        with _lock:
+            if _http_async_client is None:
+                _http_async_client = httpx.AsyncClient(
+                    limits=_limits(),
+                    timeout=LLM_TIMEOUT,
+                    event_hooks={"request": [_aon_request]}
+                )
+                logger.info("Shared async LLM HTTP client initialized")
+
+    return _http_async_client
+
+
+def get_llm(model: str = LLM_MODEL, **settings: Any) -> ChatOpenAI:
+    """
+    Get a long-lived ChatOpenAI client for a model and settings combination.
+
+    Clients are created once per (model, settings) and share one sync and one
+    async HTTP connection pool, so repeated calls don't pay for new TLS
+    handshakes.
+
+    Args:
+        model: The model name
+        **settings: Extra ChatOpenAI keyword arguments (temperature, base_url, ...)
+
+    Returns:
+        The cached ChatOpenAI instance
+    """
+    key = (model, tuple(sorted(settings.items())))
+
+    llm = _llm_clients.get(key)
+    if llm is not None:
+        _metrics.increment("llm_client_cache_hits")
+        return llm
+
+    # Resolve the shared HTTP clients before taking the registry lock
+    http_client = get_http_client()
+    http_async_client = get_http_async_client()
+
+    with _lock:
+        llm = _llm_clients.get(key)
+        if llm is None:
+            client_kwargs = {
+                "timeout": LLM_TIMEOUT,
+                "max_retries": LLM_MAX_RETRIES,
+                **settings
+            }
+            if OPENAI_BASE_URL and "base_url" not in client_kwargs:
+                client_kwargs["base_url"] = OPENAI_BASE_URL
+
+            llm = ChatOpenAI(
+                model=model,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                **client_kwargs
+            )
+            _llm_clients[key] = llm
+            _metrics.increment("llm_clients_created")
+            logger.info(f"LLM client created for model {model} with settings {dict(settings)}")
+
+    return llm
+
+
+def get_llm_client_metrics() -> Dict[str, Any]:
+    """
+    Return connection reuse metrics for the shared LLM HTTP clients.
+
+    Returns:
+        dict: Request and connection counters plus the reuse ratio
+    """
+    metrics = _metrics.snapshot()
+    requests = metrics["requests"]
+    reused = max(requests - metrics["new_connections"], 0)
+
+    return {
+        **metrics,
+        "reused_connections": reused,
+        "connection_reuse_ratio": round(reused / requests, 4) if requests else 0.0,
+        "cached_llm_clients": len(_llm_clients),
+        "max_connections": LLM_MAX_CONNECTIONS,
+        "max_keepalive_connections": LLM_MAX_KEEPALIVE_CONNECTIONS
+    }
+
+
+async def close_llm_clients() -> None:
+    """
+    Close the shared HTTP clients and drop cached LLM clients.
+    Called on application shutdown.
+    """
+    global _http_client, _http_async_client
+
+    try:
+        if _http_client is not None:
+            _http_client.close()
+        if _http_async_client is not None:
+            await _http_async_client.aclose()
+        logger.info("LLM HTTP clients closed")
+    except Exception as e:
+        logger.error(f"Error closing LLM HTTP clients: {str(e)}")
+
+    with _lock:
+        _llm_clients.clear()
+        _http_client = None
+        _http_async_client = None
@@ -0,0 +1,170 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Keywords users mention, mapped to the district they refer to
+DISTRICTS = {
+    "san juan de lurigancho": "san juan de lurigancho",
+    "sjl": "san juan de lurigancho",
+    "lurigancho": "san juan de lurigancho",
+    "trapiche": "trapiche",
+    "carabayllo": "carabayllo",
+    "comas": "carabayllo",
+    "jicamarca": "jicamarca",
+    "chosica": "chosica",
+    "santa eulalia": "chosica",
+    "callao": "callao",
+    "ate": "ate",
+    "huaycán": "ate",
+    "naranjal": "naranjal",
+    "independencia": "naranjal",
+    "san luis": "san luis",
+    "atocongo": "atocongo",
+    "san juan de miraflores": "atocongo",
+    "surco": "surco",
+    "santiago de surco": "surco",
+    "villa maria": "villa maria del triunfo",
+    "villa maría": "villa maria del triunfo",
+    "vmt": "villa maria del triunfo",
+    "lurin": "lurin",
+    "lurín": "lurin"
+}
+
+# Phrases that usually precede a free-form location, tried in this order
+LOCATION_PHRASES = ["cerca de", "en", "por", "próximo a", "proximo a", "cercano a"]
+FILLER_WORDS = ["mi", "la", "el", "los", "las", "ubicación", "ubicacion"]
+# Words after a phrase that aren't places ("precio en soles", "pago en efectivo", "por favor")
+NON_LOCATION_WORDS = ["soles", "sol", "dolares", "efectivo", "cuotas", "tarjeta", "linea", "total", "general",
+                      "promedio", "minutos", "horas", "dias", "semanas", "meses", "favor"]
+MAX_LOCATION_LENGTH = 30  # characters captured after a location phrase
+
+
+def _fold_char(char: str) -> str:
+    decomposed = "".join(c for c in unicodedata.normalize("NFKD", char) if not unicodedata.combining(c))
+    return decomposed if len(decomposed) == 1 else char
+
+
+# Latin-1 and Latin Extended-A/B, folded once at import
+_FOLD_TABLE = str.maketrans({chr(code): _fold_char(chr(code)) for code in range(0xC0, 0x250)})
+
+
+def fold_accents(text: str) -> str:
+    """
+    Lowercase text and strip accents, one output character per input character.
+
+    Keeping the length lets match positions index the original message.
+    """
+    lowered = text.lower()
+    return lowered if lowered.isascii() else lowered.translate(_FOLD_TABLE)
+
+
+def _alternation(keywords) -> str:
+    """Regex alternation of folded keywords, longest first so "san juan de lurigancho" beats "lurigancho"."""
+    folded = sorted({fold_accents(keyword) for keyword in keywords}, key=len, reverse=True)
+    return "|".join(re.escape(keyword).replace(r"\ ", r"\s+") for keyword in folded)
+
+
+# Compiled once at import; \b keeps "ate" from matching inside "chocolate"
+_DISTRICT_KEYWORDS = {fold_accents(keyword): district for keyword, district in DISTRICTS.items()}
+# Keyword precedence: the first keyword of DISTRICTS found in the message wins, as before the regex
+_DISTRICT_PRIORITY = {keyword: i for i, keyword in reversed(list(enumerate(_DISTRICT_KEYWORDS)))}
+_DISTRICT_RE = re.compile(rf"\b(?:{_alternation(DISTRICTS)})\b")
+_PHRASE_RE = re.compile(rf"\b(?:{_alternation(LOCATION_PHRASES)})\b")
+_PHRASE_ORDER = {fold_accents(phrase): i for i, phrase in reversed(list(enumerate(LOCATION_PHRASES)))}
+_NON_LOCATION_RE = re.compile(rf"^(?:{_alternation(NON_LOCATION_WORDS)})\b")
+
+
+@dataclass
+class LocationMatch:
+    """A district keyword found in a message."""
+    keyword: str
+    district: str
+    start: int
+    end: int
+
+
+def find_districts(message: str) -> List[LocationMatch]:
+    """
+    Find every district keyword in a message in a single pass.
+
+    Args:
+        message: The user's message text
+
+    Returns:
+        Matches in order of appearance, with positions in the original message
+    """
+    folded = fold_accents(message)
+    return [
+        LocationMatch(
+            keyword=match.group(0),
+            district=_DISTRICT_KEYWORDS[" ".join(match.group(0).split())],
+            start=match.start(),
+            end=match.end()
+        )
+        for match in _DISTRICT_RE.finditer(folded)
+    ]
+
+
+def find_location_phrase(message: str) -> Optional[str]:
+    """
+    Return the free-form text following a location phrase ("cerca de", "en", ...).
+
+    Phrases are tried in LOCATION_PHRASES order, each at its first whole-word
+    occurrence; the text is taken from the lowercased message, so accents
+    are kept for geocoding.
+
+    Args:
+        message: The user's message text
+
+    Returns:
+        The location text, or None if no phrase is followed by a plausible location
+    """
+    return _find_location_phrase(message.lower(), fold_accents(message))
+
+
+def _find_location_phrase(lowered: str, folded: str) -> Optional[str]:
+    # One pass for every phrase; each is then tried at its first occurrence, in LOCATION_PHRASES order
+    phrase_ends: Dict[str, int] = {}
+    for match in _PHRASE_RE.finditer(folded):
+        phrase_ends.setdefault(" ".join(match.group(0).split()), match.end())
+
+    for phrase in sorted(phrase_ends, key=_PHRASE_ORDER.__getitem__):
+        end = phrase_ends[phrase]
+        location_text = lowered[end:end + MAX_LOCATION_LENGTH].strip()
+        if _NON_LOCATION_RE.match(folded[end:end + MAX_LOCATION_LENGTH].strip()):
+            continue
+
+        # Remove common filler words
+        for filler in FILLER_WORDS:
+            location_text = location_text.replace(f" {filler} ", " ")
+
+        # If we have a reasonably long string, return it
+        if len(location_text) > 3:
+            return location_text
+    return None
+
+
+def extract_location_from_message(message: str) -> str:
+    """
+    Attempt to extract a location from the user's message.
+
+    District keywords are matched as whole words with accents folded; when
+    several are present, the one listed first in DISTRICTS wins.
+
+    Args:
+        message: The user's message text
+
+    Returns:
+        Extracted location or empty string if none found
+    """
+    folded = fold_accents(message)
+
+    # Check for specific districts or areas in the message
+    keywords = _DISTRICT_RE.findall(folded)
+    if keywords:
+        return _DISTRICT_KEYWORDS[min((" ".join(keyword.split()) for keyword in keywords),
+                                      key=_DISTRICT_PRIORITY.__getitem__)]
+
+    # If no district is found, check for generic location phrases
+    return _find_location_phrase(message.lower(), folded) or ""
@@ -0,0 +1,447 @@
+import asyncio
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.settings import (
+    LOCATION_PROVIDERS,
+    LOCATION_PROVIDER_SLOW_THRESHOLD,
+    LOCATION_PROVIDER_COOLDOWN,
+    ROUTING_TOP_K,
+    LOCATION_OFFLINE_MODE
+)
+from app.services.district_matrix import get_district_matrix
+from app.services.geocode_cache import get_geocode_cache
+from app.services.location_matcher import DISTRICTS
+from app.services.plant_index import estimate_drive
+from app.services.plant_registry import PLANTS, PLANT_INDEX, Plant
+from app.util.metrics import Counters, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Central Lima, used when a location can't be geocoded
+DEFAULT_COORDINATES = (-12.0464, -77.0428)
+
+# (latitude, longitude)
+LatLng = Tuple[float, float]
+# Plant ID to (distance in meters, duration in seconds), None when the provider found no route
+RouteMap = Dict[str, Optional[Tuple[float, float]]]
+
+
+class LocationProvider(ABC):
+    """
+    Geocoding and routing backend (Mapbox, Google Maps, ...).
+
+    Adapters take and return coordinates as (latitude, longitude) and convert
+    to their API's order internally. A method raises when the API call fails,
+    so the LocationService can fail over to the next provider.
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def geocode(self, location: str) -> Optional[LatLng]:
+        """Return the coordinates of a location in Lima, or None if the provider found no match."""
+
+    @abstractmethod
+    def route(self, origin_lat: float, origin_lng: float, plants: List[Plant]) -> RouteMap:
+        """Return driving distance and duration from the origin to each plant."""
+
+    async def aroute(self, origin_lat: float, origin_lng: float, plants: List[Plant]) -> RouteMap:
+        """Async version of route; runs the sync call in a worker thread unless overridden."""
+        return await asyncio.to_thread(self.route, origin_lat, origin_lng, plants)
+
+    async def aclose(self) -> None:
+        """Close the provider's HTTP clients."""
+
+
+def _format_distance(distance_m: float) -> str:
+    """Format a distance in meters for display."""
+    distance_km = distance_m / 1000
+    if distance_km < 1:
+        return f"{int(distance_m)} metros"
+    return f"{distance_km:.1f} km"
+
+
+def _format_duration(duration_s: float) -> str:
+    """Format a duration in seconds for display."""
+    duration_min = duration_s / 60
+    if duration_min < 60:
+        return f"{int(duration_min)} minutos"
+
+    hours = int(duration_min // 60)
+    mins = int(duration_min % 60)
+    duration_text = f"{hours} hora{'s' if hours > 1 else ''}"
+    if mins > 0:
+        duration_text += f" {mins} minutos"
+    return duration_text
+
+
+def _plant_result(plant: Plant, distance_m: float, duration_s: float, estimated: bool = False) -> Dict[str, Any]:
+    """Build the result entry for a plant with a known distance and duration."""
+    prefix = "aprox. " if estimated else ""
+    return {
+        "id": plant.id,
+        "name": plant.name,
+        "address": plant.address,
+        "phone": plant.phone,
+        "hours": plant.hours,
+        "distance_km": distance_m / 1000,
+        "duration_min": duration_s / 60,
+        "distance_text": prefix + _format_distance(distance_m),
+        "duration_text": prefix + _format_duration(duration_s),
+        "estimated": estimated
+    }
+
+
+def _unavailable_result(plant: Plant) -> Dict[str, Any]:
+    """Build the result entry for a plant whose distance is unknown (ranked last)."""
+    return {
+        "id": plant.id,
+        "name": plant.name,
+        "address": plant.address,
+        "phone": plant.phone,
+        "hours": plant.hours,
+        "distance_km": 999,
+        "duration_min": 999,
+        "distance_text": "No disponible",
+        "duration_text": "No disponible",
+        "estimated": False
+    }
+
+
+def _estimated_result(plant: Plant, great_circle_km: float) -> Dict[str, Any]:
+    """Build a result with road distance and drive time estimated from the great-circle distance."""
+    if great_circle_km == float("inf"):
+        return _unavailable_result(plant)
+    road_km, duration_min = estimate_drive(great_circle_km)
+    return _plant_result(plant, road_km * 1000, duration_min * 60, estimated=True)
+
+
+def _rank_plants(origin_lat: float, origin_lng: float, plants: List[Plant]) -> List[Tuple[Plant, float]]:
+    """Rank plants by great-circle distance from the origin, nearest first."""
+    ranked = PLANT_INDEX.nearest(origin_lat, origin_lng, plant_ids={plant.id for plant in plants})
+    ranked_ids = {plant.id for plant, _ in ranked}
+    # Plants outside the shared index are ranked last
+    return ranked + [(plant, float("inf")) for plant in plants if plant.id not in ranked_ids]
+
+
+def _finalize(ranked: List[Tuple[Plant, float]], routes: RouteMap) -> List[Dict[str, Any]]:
+    """Build results from routed plants, fill the rest with local estimates and sort by distance."""
+    final = []
+    for plant, great_circle_km in ranked:
+        route = routes.get(plant.id)
+        if route is not None:
+            final.append(_plant_result(plant, *route))
+            continue
+        if plant.id in routes:
+            logger.warning(f"No route found for plant {plant.name}, using local estimate")
+        final.append(_estimated_result(plant, great_circle_km))
+
+    final.sort(key=lambda x: x["distance_km"])
+    return final
+
+
+class _ProviderStats:
+    """Per-provider latency histograms, counters and failover state."""
+
+    def __init__(self):
+        self.latency = {"geocode": Histogram(), "route": Histogram()}
+        self.counters = Counters("calls", "errors", "slow_calls")
+        self.degraded_until = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.counters.snapshot(),
+            "degraded": self.degraded_until > time.time(),
+            "latency_seconds": {operation: histogram.snapshot() for operation, histogram in self.latency.items()}
+        }
+
+
+class LocationService:
+    """
+    Geocoding and plant distances over one or more LocationProviders.
+
+    Providers are tried in preference order. A provider that raises, or
+    answers slower than slow_threshold, is marked degraded for cooldown
+    seconds and moved to the back of the order, so traffic fails over to the
+    next one; degraded providers are still tried as a last resort. When every
+    provider fails, distances fall back to local great-circle estimates.
+    """
+
+    def __init__(self, providers: List[LocationProvider], slow_threshold: float = LOCATION_PROVIDER_SLOW_THRESHOLD,
+                 cooldown: float = LOCATION_PROVIDER_COOLDOWN):
+        self.providers = providers
+        self.slow_threshold = slow_threshold
+        self.cooldown = cooldown
+        self.metrics = Counters("failovers", "matrix_hits", "offline")
+        self._stats = {provider.name: _ProviderStats() for provider in providers}
+        self._lock = threading.Lock()
+
+    # Failover bookkeeping
+
+    def _ordered_providers(self) -> List[LocationProvider]:
+        now = time.time()
+        healthy = [p for p in self.providers if self._stats[p.name].degraded_until <= now]
+        degraded = [p for p in self.providers if self._stats[p.name].degraded_until > now]
+        return healthy + degraded
+
+    def _record(self, provider: LocationProvider, operation: str, elapsed: float, failed: bool) -> None:
+        stats = self._stats[provider.name]
+        stats.latency[operation].observe(elapsed)
+        stats.counters.increment("calls")
+        if failed:
+            stats.counters.increment("errors")
+        elif elapsed > self.slow_threshold:
+            stats.counters.increment("slow_calls")
+
+        with self._lock:
+            if failed or elapsed > self.slow_threshold:
+                stats.degraded_until = time.time() + self.cooldown
+            else:
+                stats.degraded_until = 0.0
+
+    def _timed_geocoder(self, provider: LocationProvider):
+        """Wrap a provider's geocoder so API calls (not cache hits) are timed."""
+        def geocode(location: str) -> Optional[LatLng]:
+            start = time.perf_counter()
+            try:
+                result = provider.geocode(location)
+            except Exception:
+                self._record(provider, "geocode", time.perf_counter() - start, failed=True)
+                raise
+            self._record(provider, "geocode", time.perf_counter() - start, failed=False)
+            return result
+        return geocode
+
+    # Geocoding
+
+    def geocode(self, location: str) -> Optional[LatLng]:
+        """
+        Geocode a location through each provider's geocode cache, failing over on errors.
+
+        Returns:
+            Tuple of (latitude, longitude), or None if the location can't be geocoded
+
+        Raises:
+            RuntimeError: If every provider failed
+        """
+        for i, provider in enumerate(self._ordered_providers()):
+            if i > 0:
+                self.metrics.increment("failovers")
+            try:
+                return get_geocode_cache(provider.name, self._timed_geocoder(provider)).get(location)
+            except Exception as e:
+                logger.warning(f"Geocoding with {provider.name} failed: {str(e)}")
+        raise RuntimeError("No location provider could geocode the location")
+
+    def get_district_coordinates(self, location: str) -> LatLng:
+        """
+        Get coordinates (latitude, longitude) for a location.
+
+        Args:
+            location: A string representing a location (address, district, etc.)
+
+        Returns:
+            Tuple of (latitude, longitude), central Lima if the location can't be geocoded
+        """
+        try:
+            coordinates = self.geocode(location)
+            if coordinates is not None:
+                logger.info(f"Found coordinates for '{location}': {coordinates[0]}, {coordinates[1]}")
+                return coordinates
+            logger.warning(f"Could not geocode location '{location}'.")
+        except Exception as e:
+            logger.error(f"Error geocoding location '{location}': {str(e)}")
+
+        # Default to central Lima coordinates
+        return DEFAULT_COORDINATES
+
+    def preload_district_coordinates(self) -> int:
+        """
+        Load the coordinates of every known district into the primary provider's geocode cache.
+        Called on application startup.
+
+        Returns:
+            Number of districts cached
+        """
+        if not self.providers:
+            return 0
+        provider = self.providers[0]
+        return get_geocode_cache(provider.name, self._timed_geocoder(provider)).preload(set(DISTRICTS.values()))
+
+    # Distances
+
+    def _matrix_results(self, origin_lat: float, origin_lng: float, plants: List[Plant],
+                        district: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """Answer from the precomputed district matrix if the origin is a known district."""
+        matrix = get_district_matrix()
+        if matrix is None:
+            return None
+
+        entries = matrix.lookup(origin_lat, origin_lng, [plant.id for plant in plants], district)
+        if entries is None:
+            return None
+
+        self.metrics.increment("matrix_hits")
+        results = [
+            _plant_result(plant, entries[plant.id][0] * 1000, entries[plant.id][1] * 60,
+                          estimated=entries[plant.id][2])
+            for plant in plants
+        ]
+        results.sort(key=lambda x: x["distance_km"])
+        return results
+
+    def _prepare(self, origin_lat: float, origin_lng: float, plants: Optional[List[Plant]], top_k: int,
+                 district: Optional[str], use_matrix: bool):
+        """Shared first steps of calculate_distances: matrix lookup, ranking and candidate selection."""
+        plants = list(PLANTS.values()) if plants is None else plants
+        if use_matrix:
+            precomputed = self._matrix_results(origin_lat, origin_lng, plants, district)
+            if precomputed is not None:
+                return precomputed, None, None
+
+        ranked = _rank_plants(origin_lat, origin_lng, plants)
+        if LOCATION_OFFLINE_MODE or not self.providers:
+            self.metrics.increment("offline")
+            return _finalize(ranked, {}), None, None
+
+        return None, ranked, [plant for plant, _ in ranked[:top_k]]
+
+    def calculate_distances(self, origin_lat: float, origin_lng: float, plants: Optional[List[Plant]] = None,
+                            top_k: int = ROUTING_TOP_K, district: Optional[str] = None,
+                            use_matrix: bool = True) -> List[Dict[str, Any]]:
+        """
+        Calculate driving distances from an origin to the plants.
+
+        A known district is answered from the precomputed district matrix.
+        Otherwise plants are ranked by great-circle distance and only the top_k
+        candidates are routed, failing over between providers; every other
+        plant (and any candidate no provider could route) gets a local estimate.
+        In offline mode no provider is called.
+
+        Args:
+            origin_lat: Latitude of origin point
+            origin_lng: Longitude of origin point
+            plants: Plants to rank (all plants if None)
+            top_k: Number of nearest candidates to route
+            district: District the origin was geocoded from, if known
+            use_matrix: Whether to consult the precomputed district matrix
+
+        Returns:
+            List of dictionaries with plant information and distances, nearest first
+        """
+        results, ranked, candidates = self._prepare(origin_lat, origin_lng, plants, top_k, district, use_matrix)
+        if results is not None:
+            return results
+
+        routes: RouteMap = {}
+        for i, provider in enumerate(self._ordered_providers()):
+            if i > 0:
+                self.metrics.increment("failovers")
+            start = time.perf_counter()
+            try:
+                routes = provider.route(origin_lat, origin_lng, candidates)
+            except Exception as e:
+                self._record(provider, "route", time.perf_counter() - start, failed=True)
+                logger.warning(f"Routing with {provider.name} failed: {str(e)}")
+                continue
+            self._record(provider, "route", time.perf_counter() - start, failed=False)
+            break
+
+        return _finalize(ranked, routes)
+
+    async def acalculate_distances(self, origin_lat: float, origin_lng: float, plants: Optional[List[Plant]] = None,
+                                   top_k: int = ROUTING_TOP_K, district: Optional[str] = None,
+                                   use_matrix: bool = True) -> List[Dict[str, Any]]:
+        """Async version of calculate_distances."""
+        results, ranked, candidates = self._prepare(origin_lat, origin_lng, plants, top_k, district, use_matrix)
+        if results is not None:
+            return results
+
+        routes: RouteMap = {}
+        for i, provider in enumerate(self._ordered_providers()):
+            if i > 0:
+                self.metrics.increment("failovers")
+            start = time.perf_counter()
+            try:
+                routes = await provider.aroute(origin_lat, origin_lng, candidates)
+            except Exception as e:
+                self._record(provider, "route", time.perf_counter() - start, failed=True)
+                logger.warning(f"Routing with {provider.name} failed: {str(e)}")
+                continue
+            self._record(provider, "route", time.perf_counter() - start, failed=False)
+            break
+
+        return _finalize(ranked, routes)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return failover counters and per-provider latency histograms."""
+        return {
+            **self.metrics.snapshot(),
+            "providers": {name: stats.snapshot() for name, stats in self._stats.items()}
+        }
+
+    async def aclose(self) -> None:
+        """Close every provider's HTTP clients."""
+        for provider in self.providers:
+            try:
+                await provider.aclose()
+            except Exception as e:
+                logger.error(f"Error closing location provider {provider.name}: {str(e)}")
+
+
+def create_location_provider(name: str) -> LocationProvider:
+    """Create a provider adapter by name ("mapbox" or "google")."""
+    if name == "mapbox":
+        from app.services.location_services_map_box import MapboxLocationProvider
+        return MapboxLocationProvider()
+    if name == "google":
+        from app.services.location_services import GoogleLocationProvider
+        return GoogleLocationProvider()
+    raise ValueError(f"Unknown location provider: {name}")
+
+
+# Singleton instance
+_location_service: Optional[LocationService] = None
+_location_service_lock = threading.Lock()
+
+
+def get_location_service() -> LocationService:
+    """Get or create the LocationService singleton with the providers in LOCATION_PROVIDERS."""
+    global _location_service
+
+    if _location_service is None:
+        with _location_service_lock:
+            if _location_service is None:
+                providers = []
+                for name in [name.strip() for name in LOCATION_PROVIDERS.split(",") if name.strip()]:
+                    try:
+                        providers.append(create_location_provider(name))
+                    except Exception as e:
+                        logger.error(f"Location provider {name} unavailable: {str(e)}")
+                _location_service = LocationService(providers)
+                logger.info(f"Location service initialized with providers: {[p.name for p in providers]}")
+
+    return _location_service
+
+
+def get_location_service_metrics() -> Dict[str, Any]:
+    """Return location service metrics, or an empty dict if it isn't in use."""
+    if _location_service is None:
+        return {}
+    return _location_service.get_metrics()
+
+
+async def close_location_service() -> None:
+    """
+    Close the location providers' HTTP clients.
+    Called on application shutdown.
+    """
+    global _location_service
+
+    if _location_service is not None:
+        await _location_service.aclose()
+        _location_service = None
@@ -0,0 +1,86 @@
+import logging
+from typing import Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config.settings import ROAD_DISTANCE_FACTOR, AVERAGE_DRIVING_SPEED_KMH
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance in kilometers. Works on scalars or NumPy arrays (degrees).
+    """
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def estimate_drive(great_circle_km: float) -> Tuple[float, float]:
+    """
+    Estimate road distance and drive time from a great-circle distance.
+
+    Returns:
+        Tuple of (road distance in km, duration in minutes)
+    """
+    road_km = great_circle_km * ROAD_DISTANCE_FACTOR
+    return road_km, road_km / AVERAGE_DRIVING_SPEED_KMH * 60
+
+
+class PlantSpatialIndex:
+    """
+    In-process index over plant coordinates.
+
+    Coordinates are copied once into NumPy arrays, so ranking every plant by
+    great-circle distance is a single vectorized haversine evaluation.
+    """
+
+    def __init__(self, plants: Iterable):
+        """
+        Args:
+            plants: Plant objects with "id", "lat" and "lng" attributes
+        """
+        self.plants = list(plants)
+        self.lats = np.array([plant.lat for plant in self.plants], dtype=np.float64)
+        self.lngs = np.array([plant.lng for plant in self.plants], dtype=np.float64)
+        self._positions = {plant.id: i for i, plant in enumerate(self.plants)}
+
+    def lat_lng(self, plant_id: str) -> Tuple[float, float]:
+        """Return a plant's (latitude, longitude)."""
+        i = self._positions[plant_id]
+        return float(self.lats[i]), float(self.lngs[i])
+
+    def distances_km(self, lat: float, lng: float) -> np.ndarray:
+        """Great-circle distance from a point to every indexed plant."""
+        return haversine_km(lat, lng, self.lats, self.lngs)
+
+    def nearest(self, lat: float, lng: float, k: Optional[int] = None,
+                plant_ids: Optional[Set[str]] = None) -> List[Tuple[object, float]]:
+        """
+        Rank plants by great-circle distance from a point.
+
+        Args:
+            lat: Latitude of the point
+            lng: Longitude of the point
+            k: Return only the k nearest plants (all if None)
+            plant_ids: Restrict the ranking to these plant IDs
+
+        Returns:
+            List of (plant, distance in km), nearest first
+        """
+        distances = self.distances_km(lat, lng)
+        if plant_ids is not None:
+            distances = np.where([plant.id in plant_ids for plant in self.plants], distances, np.inf)
+
+        order = np.argsort(distances)
+        if k is not None:
+            order = order[:k]
+
+        return [(self.plants[i], float(distances[i])) for i in order if np.isfinite(distances[i])]
+
+    def contains(self, plant_id: str) -> bool:
+        """Whether a plant ID is indexed."""
+        return plant_id in self._positions
@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+from typing import Dict
+
+from app.services.plant_index import PlantSpatialIndex
+
+
+@dataclass(frozen=True)
+class Plant:
+    """Represents a plant location with all relevant details."""
+    id: str
+    name: str
+    address: str
+    phone: str
+    hours: str
+    lat: float
+    lng: float
+
+    @property
+    def lat_lng(self) -> str:
+        """Coordinates as "lat,lng" (Google Maps order)."""
+        return f"{self.lat},{self.lng}"
+
+    @property
+    def lng_lat(self) -> str:
+        """Coordinates as "lng,lat" (Mapbox order)."""
+        return f"{self.lng},{self.lat}"
+
+
+# Plant database shared by every location provider; coordinates are parsed once here
+PLANTS: Dict[str, Plant] = {
+    "sjl": Plant(
+        id="sjl",
+        name="PLANTA SJL 2",
+        address="Av. El Sol 891 (cruce con Av. Santa Rosa, a 1 cdra. del Penal Lurigancho)",
+        phone="908 879 791 / 989 279 922 / 01 715 8727",
+        hours="Lunes a Sábado de 7:00am a 9:00pm",
+        lat=-12.0188,
+        lng=-76.9744
+    ),
+    "trapiche": Plant(
+        id="trapiche",
+        name="PLANTA TRAPICHE",
+        address="Av. Alfredo Mendiola Mz. E-6 Lt. 9 (Antes del cruce Panam. Norte con desvío a Trapiche)",
+        phone="01 710-9245 / 01 710-9246",
+        hours="Lunes a Sábado de 7:00am a 9:00pm",
+        lat=-11.9511,
+        lng=-77.0603
+    ),
+    "carabayllo": Plant(
+        id="carabayllo",
+        name="PLANTA CARABAYLLO",
+        address="Av. Tupac Amaru km. 22 Carretera Lima - Canta (Frente al Paradero San Antonio)",
+        phone="908 879 729 / 989 279 929",
+        hours="Lunes a Sábado de 7:00am a 9:00pm",
+        lat=-11.8503,
+        lng=-77.0344
+    ),
+    "jicamarca": Plant(
+        id="jicamarca",
+        name="PLANTA JICAMARCA",
+        address="Av. Mar del Norte Mz.C, Lt.4 (Antes del portón)",
+        phone="946 309 951 / 989 279 922",
+        hours="Lunes a Sábado de 7:00am a 9:00pm",
+        lat=-11.9350,
+        lng=-76.8954
+    ),
+    "chosica": Plant(
+        id="chosica",
+        name="PLANTA CHOSICA",
+        address="Carretera Central Km. 37.5 (Antes del desvío a Santa Eulalia)",
+        phone="989 279 927 / 989 279 922",
+        hours="Lunes a Sábado de 7:00am a 9:00pm",
+        lat=-11.9419,
+        lng=-76.7056
+    ),
+    "callao1": Plant(
+        id="callao1",
+        name="PLANTA CALLAO 1",
+        address="Av. Néstor Gambeta #8595 (Paradero - Puente Oquendo)",
+        phone="946 311 128 / 01 715-1748 / 01 715-1749",
+        hours="Lunes a Sábado de 7:00am a 9:00pm",
+        lat=-11.9167,
+        lng=-77.1117
+    ),
+    "callao2": Plant(
+        id="callao2",
+        name="PLANTA CALLAO 2",
+        address="Av. Néstor Gambeta #1160 (Antes del cruce con Morales Duárez)",
+        phone="908 879 721 / 01 713-1881",
+        hours="Lunes a Sábado de 7:00am a 9:00pm, Domingos: 8:00am - 2:00pm",
+        lat=-12.0348,
+        lng=-77.1258
+    ),
+    "ate": Plant(
+        id="ate",
+        name="PLANTA ATE",
+        address="Av. Separadora Industrial #2631 (Intersección con Av. Huarochirí)",
+        phone="960 159 264 / 01 715 3757 / 01 715 3756",
+        hours="Lunes a Sábado de 7:00am a 9:00pm, Domingos: 8:00am - 2:00pm",
+        lat=-12.0544,
+        lng=-76.9439
+    ),
+    "ate2": Plant(
+        id="ate2",
+        name="PLANTA ATE 2",
+        address="Av. Asturias 307 - Ate",
+        phone="989 279 922 / 960 157 673",
+        hours="Lunes a Sábado de 7:00am a 9:00pm",
+        lat=-12.0262,
+        lng=-76.9183
+    ),
+    "naranjal": Plant(
+        id="naranjal",
+        name="PLANTA NARANJAL",
+        address="Las Fraguas #399 esquina con Av. Alfredo Mendiola # 4820 - Independencia",
+        phone="017192871 / 908 879 592",
+        hours="Lunes a Sábado de 7:00am a 9:00pm",
+        lat=-11.9803,
+        lng=-77.0600
+    ),
+    "sanluis": Plant(
+        id="sanluis",
+        name="PLANTA SAN LUIS",
+        address="Av. Circunvalación #2100 (Frente al Policlínico San Luis)",
+        phone="908 879 601 / 989 279 922 / 01 715 6912",
+        hours="Lunes a Sábado de 7:00am a 9:00pm, Domingos de 8:00am a 2:00pm",
+        lat=-12.0786,
+        lng=-76.9765
+    ),
+    "atocongo": Plant(
+        id="atocongo",
+        name="PLANTA ATOCONGO",
+        address="Carretera Panamericana Sur km. 11.3 (Frente al Mall del Sur)",
+        phone="908 879 597 / 01 714 1183 / 01 714 1182",
+        hours="Lunes a Sábado de 7:00am a 9:00pm, Domingos de 8:00am a 2:00pm",
+        lat=-12.1554,
+        lng=-76.9814
+    ),
+    "surco": Plant(
+        id="surco",
+        name="PLANTA SURCO",
+        address="Jr. Catalino Miranda #137 (Frente a la Peña del Carajo)",
+        phone="989 279 921 / 01 715 8325 / 01 715 8326",
+        hours="Lunes a Sábado de 7:00am a 9:00pm, Domingos de 8:00am a 2:00pm",
+        lat=-12.1383,
+        lng=-76.9966
+    ),
+    "villamaria": Plant(
+        id="villamaria",
+        name="PLANTA VILLA MARIA DEL TRIUNFO",
+        address="Jose Pardo 385, Villa María del Triunfo (a la altura del paradero Ícaros)",
+        phone="908 879 787 / 01 717 3010 / 01 717 3011",
+        hours="Lunes a Sábado de 7:00am a 9:00pm, Domingos de 8:00am a 2:00pm",
+        lat=-12.1661,
+        lng=-76.9420
+    ),
+    "lurin": Plant(
+        id="lurin",
+        name="PLANTA LURIN",
+        address="Av. Panamericana Sur - Sub Lt. 4 Mz. U - Huertos de Lurín (con calle Los Laureles)",
+        phone="989 860 137 / 989 279 922",
+        hours="Lunes a Sábado de 7:00am a 9:00pm, Domingos: 8:00am - 2:00pm",
+        lat=-12.2524,
+        lng=-76.8971
+    )
+}
+
+# Spatial index over PLANTS, built once at import
+PLANT_INDEX = PlantSpatialIndex(PLANTS.values())
@@ -0,0 +1,334 @@
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.config.settings import (
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_MAX_CANDIDATES
+)
+from app.util.metrics import Counters
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = "¿?¡!.,;: "
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a user query so trivial variations map to the same text."""
+    return _WHITESPACE_RE.sub(" ", query.lower()).strip(_EDGE_PUNCTUATION)
+
+
+def context_fingerprint(context: str) -> str:
+    """Hash the retrieved context so answers are only reused over the same documents."""
+    return hashlib.sha256((context or "").encode("utf-8")).hexdigest()
+
+
+def _unit_vector(vector) -> np.ndarray:
+    """Convert an embedding to a normalized float32 array."""
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+@dataclass
+class CacheQuery:
+    """An embedded, fingerprinted query ready for lookup and storage."""
+    text: str
+    fingerprint: str
+    vector: np.ndarray
+
+
+@dataclass
+class _MemoryEntry:
+    fingerprint: str
+    text: str
+    vector: np.ndarray
+    answer: str
+    created_at: float = field(default_factory=time.time)
+
+
+class ResponseCacheBackend(ABC):
+    """Storage backend for the semantic response cache."""
+
+    @abstractmethod
+    def lookup(self, query: CacheQuery, threshold: float) -> Optional[str]:
+        """Return the cached answer most similar to query above threshold, if any."""
+
+    @abstractmethod
+    def store(self, query: CacheQuery, answer: str) -> None:
+        """Store an answer for query, evicting least recently used entries if full."""
+
+    @abstractmethod
+    def size(self) -> int:
+        """Return the number of cached entries."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every cached entry."""
+
+
+class InMemoryResponseCacheBackend(ResponseCacheBackend):
+    """In-process LRU backend with TTL expiry."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl: int = RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, _MemoryEntry]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, query: CacheQuery, threshold: float) -> Optional[str]:
+        with self._lock:
+            now = time.time()
+            best_id, best_score = None, threshold
+            for entry_id, entry in list(self._entries.items()):
+                if now - entry.created_at > self.ttl:
+                    del self._entries[entry_id]
+                    continue
+                if entry.fingerprint != query.fingerprint:
+                    continue
+                score = float(np.dot(entry.vector, query.vector))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                return None
+
+            # Mark as most recently used
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id].answer
+
+    def store(self, query: CacheQuery, answer: str) -> None:
+        with self._lock:
+            self._entries[self._next_id] = _MemoryEntry(
+                fingerprint=query.fingerprint,
+                text=query.text,
+                vector=query.vector,
+                answer=answer
+            )
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class PostgresResponseCacheBackend(ResponseCacheBackend):
+    """Backend storing entries in the response_cache table, shared by all workers."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl: int = RESPONSE_CACHE_TTL,
+                 max_candidates: int = RESPONSE_CACHE_MAX_CANDIDATES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_candidates = max_candidates
+
+    def lookup(self, query: CacheQuery, threshold: float) -> Optional[str]:
+        from app.database.engine import SessionLocal
+        from app.database.models import ResponseCacheEntry
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        with SessionLocal() as session:
+            candidates = (
+                session.query(ResponseCacheEntry)
+                .filter(ResponseCacheEntry.context_fingerprint == query.fingerprint)
+                .filter(ResponseCacheEntry.created_at >= cutoff)
+                .order_by(ResponseCacheEntry.last_hit_at.desc())
+                .limit(self.max_candidates)
+                .all()
+            )
+            if not candidates:
+                return None
+
+            matrix = np.stack([np.frombuffer(entry.embedding, dtype=np.float32) for entry in candidates])
+            scores = matrix @ query.vector
+            best = int(np.argmax(scores))
+            if scores[best] < threshold:
+                return None
+
+            entry = candidates[best]
+            entry.hits += 1
+            entry.last_hit_at = datetime.utcnow()
+            session.commit()
+            return entry.answer
+
+    def store(self, query: CacheQuery, answer: str) -> None:
+        from app.database.engine import SessionLocal
+        from app.database.models import ResponseCacheEntry
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        with SessionLocal() as session:
+            session.add(ResponseCacheEntry(
+                context_fingerprint=query.fingerprint,
+                query_text=query.text,
+                embedding=query.vector.astype(np.float32).tobytes(),
+                answer=answer
+            ))
+
+            # Expire old entries, then evict the least recently used ones
+            session.query(ResponseCacheEntry).filter(
+                ResponseCacheEntry.created_at < cutoff
+            ).delete(synchronize_session=False)
+            overflow = session.query(ResponseCacheEntry).count() - self.max_entries
+            if overflow > 0:
+                stale_ids = (
+                    session.query(ResponseCacheEntry.id)
+                    .order_by(ResponseCacheEntry.last_hit_at.asc())
+                    .limit(overflow)
+                    .subquery()
+                )
+                session.query(ResponseCacheEntry).filter(
+                    ResponseCacheEntry.id.in_(stale_ids.select())
+                ).delete(synchronize_session=False)
+
+            session.commit()
+
+    def size(self) -> int:
+        from app.database.engine import SessionLocal
+        from app.database.models import ResponseCacheEntry
+
+        with SessionLocal() as session:
+            return session.query(ResponseCacheEntry).count()
+
+    def clear(self) -> None:
+        from app.database.engine import SessionLocal
+        from app.database.models import ResponseCacheEntry
+
+        with SessionLocal() as session:
+            session.query(ResponseCacheEntry).delete(synchronize_session=False)
+            session.commit()
+
+
+class SemanticResponseCache:
+    """
+    Semantic cache in front of generate_response.
+
+    A query is embedded after normalization and fingerprinted with the retrieved
+    context; a cached answer is returned when an entry with the same context
+    fingerprint has a cosine similarity above the threshold.
+    """
+
+    def __init__(self, embeddings: Embeddings, backend: ResponseCacheBackend,
+                 threshold: float = RESPONSE_CACHE_SIMILARITY_THRESHOLD):
+        self.embeddings = embeddings
+        self.backend = backend
+        self.threshold = threshold
+        self.metrics = Counters("hits", "misses", "stores", "skipped", "errors")
+
+    def prepare(self, query: str, context: str) -> CacheQuery:
+        """Embed and fingerprint a query."""
+        text = normalize_query(query)
+        return CacheQuery(text=text, fingerprint=context_fingerprint(context),
+                          vector=_unit_vector(self.embeddings.embed_query(text)))
+
+    async def aprepare(self, query: str, context: str) -> CacheQuery:
+        """Async version of prepare."""
+        text = normalize_query(query)
+        return CacheQuery(text=text, fingerprint=context_fingerprint(context),
+                          vector=_unit_vector(await self.embeddings.aembed_query(text)))
+
+    def lookup(self, query: CacheQuery) -> Optional[str]:
+        """Return a cached answer for the query, or None on a miss or error."""
+        try:
+            answer = self.backend.lookup(query, self.threshold)
+        except Exception as e:
+            self.metrics.increment("errors")
+            logger.error(f"Error looking up response cache: {str(e)}")
+            return None
+
+        self.metrics.increment("hits" if answer is not None else "misses")
+        return answer
+
+    async def alookup(self, query: CacheQuery) -> Optional[str]:
+        """Async version of lookup; backend I/O runs in a worker thread."""
+        return await asyncio.to_thread(self.lookup, query)
+
+    def store(self, query: CacheQuery, answer: str) -> None:
+        """Store an answer; errors are logged and never propagate."""
+        try:
+            self.backend.store(query, answer)
+            self.metrics.increment("stores")
+        except Exception as e:
+            self.metrics.increment("errors")
+            logger.error(f"Error storing response in cache: {str(e)}")
+
+    async def astore(self, query: CacheQuery, answer: str) -> None:
+        """Async version of store; backend I/O runs in a worker thread."""
+        await asyncio.to_thread(self.store, query, answer)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the hit rate."""
+        metrics = self.metrics.snapshot()
+        lookups = metrics["hits"] + metrics["misses"]
+        return {
+            **metrics,
+            "hit_rate": round(metrics["hits"] / lookups, 4) if lookups else 0.0,
+            "backend": type(self.backend).__name__,
+            "threshold": self.threshold
+        }
+
+
+# Singleton instance
+_response_cache: Optional[SemanticResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def create_response_cache_backend(kind: str = RESPONSE_CACHE_BACKEND) -> ResponseCacheBackend:
+    """Create a cache backend by name ("memory" or "postgres")."""
+    if kind == "memory":
+        return InMemoryResponseCacheBackend()
+    if kind == "postgres":
+        return PostgresResponseCacheBackend()
+    raise ValueError(f"Unknown response cache backend: {kind}")
+
+
+def get_response_cache(embeddings: Embeddings) -> Optional[SemanticResponseCache]:
+    """
+    Get or create the SemanticResponseCache singleton.
+
+    Args:
+        embeddings: The embeddings model used on first creation
+
+    Returns:
+        The cache, or None when RESPONSE_CACHE_ENABLED is off
+    """
+    global _response_cache
+
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = SemanticResponseCache(embeddings, create_response_cache_backend())
+                logger.info(f"Semantic response cache initialized with {RESPONSE_CACHE_BACKEND} backend")
+
+    return _response_cache
+
+
+def get_response_cache_metrics() -> Dict[str, Any]:
+    """Return response cache metrics, or an empty dict if the cache isn't in use."""
+    if _response_cache is None:
+        return {"enabled": RESPONSE_CACHE_ENABLED}
+    return {"enabled": True, **_response_cache.get_metrics()}
@@ -0,0 +1,175 @@
+import logging
+import math
+import re
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# (route name, confidence in [0, 1]); the route is None when the classifier has no answer
+Classification = Tuple[Optional[str], float]
+
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation."""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return _WHITESPACE_RE.sub(" ", _NON_WORD_RE.sub(" ", folded)).strip()
+
+
+def char_ngrams(text: str, sizes: Sequence[int] = (2, 3, 4)) -> Counter:
+    """Character n-grams of each word, padded with spaces so word starts and ends are features."""
+    grams = Counter()
+    for word in _normalize(text).split():
+        padded = f" {word} "
+        for n in sizes:
+            grams.update(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1)))
+    return grams
+
+
+class RouteClassifier(ABC):
+    """Backend that assigns user queries to one of the router's routes."""
+
+    name: str = ""
+
+    @abstractmethod
+    def classify_batch(self, queries: List[str]) -> List[Classification]:
+        """Classify several queries at once."""
+
+    def classify(self, query: str) -> Classification:
+        """Classify a single query."""
+        return self.classify_batch([query])[0]
+
+
+class TfidfRouteClassifier(RouteClassifier):
+    """
+    Local classifier over character n-gram TF-IDF vectors of the route utterances.
+
+    A query is scored against each route by its best cosine similarity to
+    that route's utterances; the confidence is the margin between the best
+    and second-best route, so near-ties report low confidence. Runs in
+    microseconds and needs no network.
+    """
+
+    name = "tfidf"
+
+    def __init__(self, utterances: Dict[str, List[str]]):
+        """
+        Args:
+            utterances: Example utterances per route name
+        """
+        self.route_names = list(utterances)
+        documents = [(route, char_ngrams(text)) for route, texts in utterances.items() for text in texts]
+
+        document_frequency = Counter(gram for _, grams in documents for gram in grams)
+        self.vocabulary = {gram: i for i, gram in enumerate(sorted(document_frequency))}
+        total = len(documents)
+        self.idf = np.array(
+            [math.log((1 + total) / (1 + document_frequency[gram])) + 1 for gram in sorted(document_frequency)],
+            dtype=np.float32
+        )
+
+        self.matrix = self._vectorize([grams for _, grams in documents])
+        labels = np.array([self.route_names.index(route) for route, _ in documents])
+        self.route_masks = np.stack([labels == i for i in range(len(self.route_names))])
+
+    def _vectorize(self, gram_counts: List[Counter]) -> np.ndarray:
+        """L2-normalized TF-IDF rows; n-grams outside the vocabulary are ignored."""
+        matrix = np.zeros((len(gram_counts), len(self.vocabulary)), dtype=np.float32)
+        for row, grams in enumerate(gram_counts):
+            for gram, count in grams.items():
+                column = self.vocabulary.get(gram)
+                if column is not None:
+                    matrix[row, column] = 1 + math.log(count)
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def classify_batch(self, queries: List[str]) -> List[Classification]:
+        if not queries:
+            return []
+
+        similarities = self._vectorize([char_ngrams(query) for query in queries]) @ self.matrix.T
+        # Best similarity per route: (queries, routes)
+        route_scores = np.stack(
+            [np.where(mask, similarities, -1).max(axis=1) for mask in self.route_masks], axis=1
+        )
+
+        results = []
+        for scores in route_scores:
+            order = np.argsort(scores)[::-1]
+            best = float(scores[order[0]])
+            if best <= 0:
+                results.append((None, 0.0))
+                continue
+            runner_up = float(scores[order[1]]) if len(order) > 1 else 0.0
+            results.append((self.route_names[order[0]], max(best - max(runner_up, 0.0), 0.0)))
+        return results
+
+
+class EncoderRouteClassifier(RouteClassifier):
+    """
+    Remote classifier backed by a SemanticRouter (embeddings from the API).
+
+    The router is built on first use, so configurations that never fall back
+    to it never create the encoder.
+    """
+
+    name = "encoder"
+
+    def __init__(self, router_factory: Callable[[], object]):
+        self.router_factory = router_factory
+        self._router = None
+        self._router_lock = threading.Lock()
+
+    @property
+    def router(self):
+        # Classification runs in worker threads (asyncio.to_thread); build the router once
+        if self._router is None:
+            with self._router_lock:
+                if self._router is None:
+                    self._router = self.router_factory()
+        return self._router
+
+    def classify_batch(self, queries: List[str]) -> List[Classification]:
+        results = []
+        for query in queries:
+            choice = self.router(query)
+            results.append((choice.name, 1.0) if choice.name else (None, 0.0))
+        return results
+
+
+class HybridRouteClassifier(RouteClassifier):
+    """
+    Local classifier first; only queries below the confidence threshold go to the remote one.
+    """
+
+    name = "hybrid"
+
+    def __init__(self, local: RouteClassifier, remote: RouteClassifier, threshold: float):
+        self.local = local
+        self.remote = remote
+        self.threshold = threshold
+
+    def classify_batch(self, queries: List[str]) -> List[Classification]:
+        results = self.local.classify_batch(queries)
+        unsure = [i for i, (route, confidence) in enumerate(results) if route is None or confidence < self.threshold]
+        if not unsure:
+            return results
+
+        try:
+            for i, classification in zip(unsure, self.remote.classify_batch([queries[i] for i in unsure])):
+                if classification[0] is not None:
+                    results[i] = classification
+        except Exception as e:
+            # Keep the local answers rather than failing the request
+            logger.error(f"Remote route classification failed, using local results: {str(e)}")
+        return results
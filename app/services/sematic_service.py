@@ -1,16 +1,135 @@
+import argparse
 import logging
-from typing import Dict, Any, List, Literal
+import os
+import threading
+import time
+from typing import Dict, Any, Callable, List, Literal, Optional
+
+import numpy as np
 
 from semantic_router import Route
 from semantic_router.encoders import OpenAIEncoder
 from semantic_router.routers import SemanticRouter
 
 from app.graph.state import State
-from app.config.settings import LLM_MODEL
+from app.config.settings import (
+    LLM_MODEL,
+    SEMANTIC_ROUTER_CACHE_PATH,
+    SEMANTIC_ROUTER_BACKEND,
+    SEMANTIC_ROUTER_CONFIDENCE_THRESHOLD
+)
+from app.services.embedding_cache import embedding_cache_key
+from app.services.route_classifier import (
+    RouteClassifier,
+    TfidfRouteClassifier,
+    EncoderRouteClassifier,
+    HybridRouteClassifier
+)
 from app.util.prompt import AMBIGUITY_CLASSIFIER_PROMPT_REQUIREMENT, AMBIGUITY_CLASSIFIER_PROMPT_PLANT
 
 logger = logging.getLogger(__name__)
 
+REQUIREMENT_UTTERANCES = [
+    "¿Qué documentos necesito para la revisión técnica?",
+    "¿Cuáles son los requisitos para pasar la revisión?",
+    "¿Qué papeles debo llevar para mi carro?",
+    "¿Qué necesito para llevar mi vehículo a la revisión?",
+    "¿Qué documentación debo presentar para mi auto?",
+    "¿Qué certificados necesito para llevar mi vehículo?",
+    "¿Cuáles son los requisitos para la revisión técnica de mi camioneta?",
+    "¿Qué necesito presentar para la inspección de mi auto?",
+    "¿Qué papeles tengo que llevar para la revisión técnica?",
+    "¿Qué documentos se requieren para la inspección vehicular?"
+]
+
+PLANT_TARIFF_UTTERANCES = [
+    "¿Dónde puedo hacer la revisión técnica?",
+    "¿Cuánto cuesta la revisión técnica?",
+    "¿Qué plantas hay cerca de mi ubicación?",
+    "¿Cuál es el horario de atención de las plantas?",
+    "¿Cuáles son las tarifas para la revisión técnica?",
+    "¿Tienen planta en San Juan de Lurigancho?",
+    "¿Cuánto me cuesta la revisión para mi taxi?",
+    "¿Qué precio tiene la inspección para una moto?",
+    "¿A qué hora abren las plantas de revisión?",
+    "¿Cuál es la dirección de la planta más cercana?"
+]
+
+
+class UtteranceEmbeddingFile:
+    """
+    Local file with the embeddings of the route utterances, keyed by a hash of (model, utterance).
+
+    Small enough to load whole; rewritten atomically when new utterances are encoded.
+    """
+
+    def __init__(self, path: str = SEMANTIC_ROUTER_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, np.ndarray]:
+        """Return every stored vector; an unreadable file counts as empty."""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                return dict(zip((str(key) for key in data["keys"]), data["vectors"]))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable utterance embedding file {self.path}: {str(e)}")
+            return {}
+
+    def add(self, vectors: Dict[str, np.ndarray]) -> None:
+        """Merge vectors into the file."""
+        with self._lock:
+            merged = {**self.load(), **vectors}
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, keys=np.array(list(merged)),
+                     vectors=np.stack([np.asarray(v, dtype=np.float32) for v in merged.values()]))
+            os.replace(tmp_path, self.path)
+
+
+_utterance_file = UtteranceEmbeddingFile()
+_route_utterances = set(REQUIREMENT_UTTERANCES) | set(PLANT_TARIFF_UTTERANCES)
+
+
+class UtteranceCachedEncoder(OpenAIEncoder):
+    """
+    OpenAIEncoder that reads route utterance embeddings from the local file
+    and only sends the missing ones to the API. User queries are encoded as usual.
+    """
+
+    def __call__(self, docs: List[Any], *args, **kwargs) -> List[List[float]]:
+        if not all(doc in _route_utterances for doc in docs):
+            return super().__call__(docs, *args, **kwargs)
+
+        keys = [embedding_cache_key(self.name, doc) for doc in docs]
+        stored = _utterance_file.load()
+        missing = [(key, doc) for key, doc in zip(keys, docs) if key not in stored]
+        if missing:
+            vectors = super().__call__([doc for _, doc in missing], *args, **kwargs)
+            new = {key: np.asarray(vector, dtype=np.float32) for (key, _), vector in zip(missing, vectors)}
+            try:
+                _utterance_file.add(new)
+            except Exception as e:
+                logger.warning(f"Could not persist utterance embeddings: {str(e)}")
+            stored.update(new)
+
+        logger.info(f"Utterance embeddings: {len(docs) - len(missing)} from file, {len(missing)} encoded")
+        return [stored[key].tolist() for key in keys]
+
+
+def create_route_classifiers(routes: List[Route], router_factory: Callable[[], SemanticRouter],
+                             threshold: float) -> Dict[str, RouteClassifier]:
+    """Build the local, encoder and hybrid classifiers over the same routes."""
+    local = TfidfRouteClassifier({route.name: list(route.utterances) for route in routes})
+    remote = EncoderRouteClassifier(router_factory)
+    return {
+        "local": local,
+        "encoder": remote,
+        "hybrid": HybridRouteClassifier(local, remote, threshold)
+    }
+
 
 class AmbiguityClassifierRouter:
     """
@@ -18,10 +137,13 @@ class AmbiguityClassifierRouter:
     de requisitos y plantas/tarifas.
     """
 
-    def __init__(self):
-        # Inicializar el encoder
-        self.encoder = OpenAIEncoder()
-
+    def __init__(self, backend: str = SEMANTIC_ROUTER_BACKEND,
+                 threshold: float = SEMANTIC_ROUTER_CONFIDENCE_THRESHOLD):
+        """
+        Args:
+            backend: "local" (TF-IDF de n-gramas), "encoder" (OpenAI) o "hybrid"
+            threshold: Confianza mínima del clasificador local antes de consultar al encoder
+        """
         # Crear rutas semánticas
         self.requirement_route = Route(
             name="requirements",
@@ -35,18 +157,7 @@ class AmbiguityClassifierRouter:
             - Condiciones que debe cumplir el vehículo
             Usuarios típicos son dueños de vehículos que buscan prepararse para la revisión técnica.
             """,
-            utterances=[
-                "¿Qué documentos necesito para la revisión técnica?",
-                "¿Cuáles son los requisitos para pasar la revisión?",
-                "¿Qué papeles debo llevar para mi carro?",
-                "¿Qué necesito para llevar mi vehículo a la revisión?",
-                "¿Qué documentación debo presentar para mi auto?",
-                "¿Qué certificados necesito para llevar mi vehículo?",
-                "¿Cuáles son los requisitos para la revisión técnica de mi camioneta?",
-                "¿Qué necesito presentar para la inspección de mi auto?",
-                "¿Qué papeles tengo que llevar para la revisión técnica?",
-                "¿Qué documentos se requieren para la inspección vehicular?"
-            ],
+            utterances=REQUIREMENT_UTTERANCES,
         )
 
         self.plant_tariff_route = Route(
@@ -61,29 +172,47 @@ class AmbiguityClassifierRouter:
             - Formas de pago disponibles
             Usuarios típicos son personas que buscan información logística y de costos.
             """,
-            utterances=[
-                "¿Dónde puedo hacer la revisión técnica?",
-                "¿Cuánto cuesta la revisión técnica?",
-                "¿Qué plantas hay cerca de mi ubicación?",
-                "¿Cuál es el horario de atención de las plantas?",
-                "¿Cuáles son las tarifas para la revisión técnica?",
-                "¿Tienen planta en San Juan de Lurigancho?",
-                "¿Cuánto me cuesta la revisión para mi taxi?",
-                "¿Qué precio tiene la inspección para una moto?",
-                "¿A qué hora abren las plantas de revisión?",
-                "¿Cuál es la dirección de la planta más cercana?"
-            ],
+            utterances=PLANT_TARIFF_UTTERANCES,
         )
 
-        # Configurar el router semántico
         self.routes = [self.requirement_route, self.plant_tariff_route]
-        self.semantic_router = SemanticRouter(
+
+        # Clasificadores: local (sin red) y remoto (el encoder se crea solo si se usa)
+        self.classifiers = create_route_classifiers(self.routes, self._build_semantic_router, threshold)
+        if backend not in self.classifiers:
+            raise ValueError(f"Unknown semantic router backend: {backend}")
+        self.classifier = self.classifiers[backend]
+
+        logger.info(f"Semantic Router para clasificación de ambigüedad inicializado ({backend})")
+
+    def _build_semantic_router(self) -> SemanticRouter:
+        """Configurar el router semántico remoto (los embeddings de las utterances se leen del archivo local)."""
+        self.encoder = UtteranceCachedEncoder()
+        return SemanticRouter(
             encoder=self.encoder,
             routes=self.routes,
             auto_sync="local"
         )
 
-        logger.info("Semantic Router para clasificación de ambigüedad inicializado")
+    def route_queries(self, queries: List[str]) -> List[Literal["requirements", "plant_tariff"]]:
+        """
+        Enruta varias consultas en un solo lote.
+
+        Args:
+            queries: Las consultas del usuario
+
+        Returns:
+            Nombre de la ruta para cada consulta
+        """
+        try:
+            results = self.classifier.classify_batch(queries)
+        except Exception as e:
+            # En caso de error, enrutar por defecto a requisitos
+            logger.error(f"Error en enrutamiento semántico: {str(e)}")
+            return ["requirements"] * len(queries)
+
+        # Sin ruta clara, enrutar por defecto a requisitos
+        return [route or "requirements" for route, _ in results]
 
     def route_query(self, query: str) -> Literal["requirements", "plant_tariff"]:
         """
@@ -95,15 +224,9 @@ class AmbiguityClassifierRouter:
         Returns:
             Nombre de la ruta: "requirements" o "plant_tariff"
         """
-        try:
-            # Usar el router para determinar la ruta más cercana
-            result = self.semantic_router(query)
-            logger.info(f"Consulta: '{query}' enrutada a '{result.name}'")
-            return result.name
-        except Exception as e:
-            # En caso de error, enrutar por defecto a requisitos
-            logger.error(f"Error en enrutamiento semántico: {str(e)}")
-            return "requirements"
+        route_name = self.route_queries([query])[0]
+        logger.info(f"Consulta: '{query}' enrutada a '{route_name}'")
+        return route_name
 
     def get_prompt_template(self, query: str) -> str:
         """
@@ -123,5 +246,56 @@ class AmbiguityClassifierRouter:
             return AMBIGUITY_CLASSIFIER_PROMPT_PLANT
 
 
-# Se puede crear una instancia singleton
-ambiguity_router = AmbiguityClassifierRouter()
\ No newline at end of file
+# Singleton instance, created on first use
+_ambiguity_router: Optional[AmbiguityClassifierRouter] = None
+_ambiguity_router_lock = threading.Lock()
+
+
+def get_ambiguity_router() -> AmbiguityClassifierRouter:
+    """
+    Get or create the AmbiguityClassifierRouter singleton.
+    Thread-safe; only the first caller pays for the route setup.
+    """
+    global _ambiguity_router
+
+    if _ambiguity_router is None:
+        with _ambiguity_router_lock:
+            if _ambiguity_router is None:
+                start = time.perf_counter()
+                _ambiguity_router = AmbiguityClassifierRouter()
+                logger.info(f"Ambiguity router initialized in {time.perf_counter() - start:.2f}s")
+
+    return _ambiguity_router
+
+
+def main() -> None:
+    """Compare the route classifiers' accuracy and latency on a labeled query file."""
+    parser = argparse.ArgumentParser(description="Compare semantic router backends")
+    parser.add_argument("labeled_file", help="TSV file with one 'route<TAB>query' per line")
+    parser.add_argument("--backends", default="local,hybrid,encoder", help="Comma-separated backends to compare")
+    parser.add_argument("--batch-size", type=int, default=32, help="Queries per classify_batch call")
+    args = parser.parse_args()
+
+    with open(args.labeled_file, encoding="utf-8") as f:
+        rows = [line.rstrip("\n").split("\t", 1) for line in f if "\t" in line]
+    labels = [route for route, _ in rows]
+    queries = [query for _, query in rows]
+
+    router = AmbiguityClassifierRouter(backend="local")
+    for backend in args.backends.split(","):
+        classifier = router.classifiers[backend]
+        start = time.perf_counter()
+        predictions = []
+        for i in range(0, len(queries), args.batch_size):
+            predictions += [route or "requirements"
+                            for route, _ in classifier.classify_batch(queries[i:i + args.batch_size])]
+        elapsed = time.perf_counter() - start
+
+        correct = sum(prediction == label for prediction, label in zip(predictions, labels))
+        print(f"{backend:8s} accuracy={correct / len(labels):.3f} ({correct}/{len(labels)}) "
+              f"latency={elapsed / len(labels) * 1000:.2f} ms/query")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
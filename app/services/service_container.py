@@ -0,0 +1,90 @@
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from app.services.document_service import DocumentService
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    Owns the long-lived service instances shared by the routers and graph nodes.
+
+    Services are created once (at startup, or lazily on first use if startup
+    couldn't create them) and closed on shutdown.
+    """
+
+    def __init__(self):
+        self._document_service: Optional[DocumentService] = None
+        self._lock = threading.Lock()
+
+    @property
+    def document_service(self) -> DocumentService:
+        """The shared DocumentService, created on first use."""
+        if self._document_service is None:
+            with self._lock:
+                if self._document_service is None:
+                    self._document_service = DocumentService()
+        return self._document_service
+
+    def start(self) -> None:
+        """Create the services and verify their clients respond."""
+        _ = self.document_service
+        health = self.health()
+        if health["status"] != "healthy":
+            logger.warning(f"Service container started with unhealthy services: {health}")
+        else:
+            logger.info("Service container started")
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Check the clients held by the container.
+
+        Returns:
+            dict: Overall status plus per-client status
+        """
+        if self._document_service is None:
+            return {"status": "not_initialized"}
+
+        service = self._document_service
+        checks = {}
+        try:
+            service.qdrant_client.get_collection(service.collection_name)
+            checks["qdrant"] = "healthy"
+        except Exception as e:
+            logger.error(f"Qdrant health check failed: {str(e)}")
+            checks["qdrant"] = "unhealthy"
+
+        checks["google_drive"] = "available" if service.drive_service else "unavailable"
+
+        return {
+            "status": "healthy" if checks["qdrant"] == "healthy" else "unhealthy",
+            **checks
+        }
+
+    async def shutdown(self) -> None:
+        """Close the clients held by the container."""
+        with self._lock:
+            if self._document_service is not None:
+                try:
+                    self._document_service.qdrant_client.close()
+                    await self._document_service.async_qdrant_client.close()
+                    logger.info("Qdrant clients closed")
+                except Exception as e:
+                    logger.error(f"Error closing Qdrant client: {str(e)}")
+                self._document_service = None
+
+
+# Singleton instance
+_service_container = ServiceContainer()
+
+
+def get_service_container() -> ServiceContainer:
+    """Get the process-wide ServiceContainer."""
+    return _service_container
+
+
+def get_document_service() -> DocumentService:
+    """Get the shared DocumentService from the service container."""
+    return _service_container.document_service
@@ -0,0 +1,190 @@
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+import tiktoken
+from langchain_core.messages import BaseMessage
+
+from app.config.settings import (
+    LLM_MODEL,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_KEEP_RECENT_MESSAGES,
+    PROMPT_TOKEN_TREND_WINDOW,
+    PROMPT_TOKEN_TREND_MAX_THREADS
+)
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators added by the chat format per message
+CHARS_PER_TOKEN = 4  # estimate used when the tokenizer can't be loaded
+TREND_TOP_THREADS = 20  # largest threads listed in the metrics snapshot
+
+
+def _get_encoding(model: str) -> Optional[tiktoken.Encoding]:
+    """Tokenizer of the model; None if it can't be loaded (tiktoken downloads it on first use)."""
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer for {model}, estimating token counts: {str(e)}")
+        return None
+
+
+class MessageTokenCounter:
+    """
+    Token counts for chat messages.
+
+    Counts are memoized by message ID: messages in the checkpoint keep their
+    IDs across turns, so each one is encoded once and a turn only pays for
+    the messages it added.
+    """
+
+    def __init__(self, model: str = LLM_MODEL, max_entries: int = 10000):
+        self.encoding = _get_encoding(model)
+        self.max_entries = max_entries
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count_text(self, text: Optional[str]) -> int:
+        """Tokens in a plain string."""
+        if not text:
+            return 0
+        if self.encoding is None:
+            return len(text) // CHARS_PER_TOKEN + 1
+        return len(self.encoding.encode(text))
+
+    def count_message(self, message: BaseMessage) -> int:
+        """Tokens in one message, including the per-message overhead."""
+        if message.id is not None:
+            with self._lock:
+                count = self._counts.get(message.id)
+                if count is not None:
+                    self._counts.move_to_end(message.id)
+                    return count
+
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        count = self.count_text(content) + MESSAGE_OVERHEAD_TOKENS
+
+        if message.id is not None:
+            with self._lock:
+                self._counts[message.id] = count
+                if len(self._counts) > self.max_entries:
+                    self._counts.popitem(last=False)
+        return count
+
+    def count_messages(self, messages: Sequence[BaseMessage]) -> int:
+        """Tokens in a list of messages."""
+        return sum(self.count_message(message) for message in messages)
+
+
+class PromptTokenTrends:
+    """
+    Prompt sizes of the last turns of each thread.
+
+    Only the most recently active threads are kept; the snapshot lists the
+    largest ones with their growth per turn.
+    """
+
+    def __init__(self, window: int = PROMPT_TOKEN_TREND_WINDOW, max_threads: int = PROMPT_TOKEN_TREND_MAX_THREADS):
+        self.window = window
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, Deque[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, thread_id: str, tokens: int) -> None:
+        """Record the prompt size of one turn."""
+        with self._lock:
+            samples = self._threads.get(thread_id)
+            if samples is None:
+                samples = self._threads[thread_id] = deque(maxlen=self.window)
+                if len(self._threads) > self.max_threads:
+                    self._threads.popitem(last=False)
+            else:
+                self._threads.move_to_end(thread_id)
+            samples.append(tokens)
+
+    def snapshot(self, top: int = TREND_TOP_THREADS) -> Dict[str, Any]:
+        """Return the largest threads' trends and totals over all tracked threads."""
+        with self._lock:
+            threads = {thread_id: list(samples) for thread_id, samples in self._threads.items()}
+
+        largest = sorted(threads.items(), key=lambda item: item[1][-1], reverse=True)[:top]
+        return {
+            "tracked_threads": len(threads),
+            "mean_last_prompt_tokens": round(sum(s[-1] for s in threads.values()) / len(threads), 1) if threads else 0.0,
+            "threads": {
+                thread_id: {
+                    "turns": len(samples),
+                    "last": samples[-1],
+                    "max": max(samples),
+                    # Average growth per turn over the window; ~0 once compaction keeps it bounded
+                    "slope_per_turn": round((samples[-1] - samples[0]) / (len(samples) - 1), 1) if len(samples) > 1 else 0.0
+                }
+                for thread_id, samples in largest
+            }
+        }
+
+
+def messages_within_budget(messages: List[BaseMessage], budget: int = CONTEXT_TOKEN_BUDGET) -> List[BaseMessage]:
+    """
+    The most recent messages that fit in the budget (at least the last one).
+
+    Bounds the prompt even while a compaction of the thread is still pending.
+    """
+    counter = get_token_counter()
+    total, start = 0, len(messages)
+    while start > 0:
+        total += counter.count_message(messages[start - 1])
+        if total > budget and start < len(messages):
+            break
+        start -= 1
+    return messages[start:]
+
+
+def messages_to_compact(messages: List[BaseMessage], summary: Optional[str] = None,
+                        budget: int = CONTEXT_TOKEN_BUDGET,
+                        keep_recent: int = CONTEXT_KEEP_RECENT_MESSAGES) -> List[BaseMessage]:
+    """
+    Messages to fold into the summary, or an empty list while the history is within budget.
+
+    Everything but the last keep_recent messages is compacted once the summary
+    plus messages exceed the budget.
+    """
+    if len(messages) <= keep_recent:
+        return []
+
+    counter = get_token_counter()
+    if counter.count_text(summary) + counter.count_messages(messages) <= budget:
+        return []
+    return messages[:-keep_recent] if keep_recent else list(messages)
+
+
+# Singleton instances
+_token_counter: Optional[MessageTokenCounter] = None
+_token_counter_lock = threading.Lock()
+_prompt_token_trends = PromptTokenTrends()
+
+
+def get_token_counter() -> MessageTokenCounter:
+    """Get the process-wide token counter (the encoding is loaded on first use)."""
+    global _token_counter
+
+    if _token_counter is None:
+        with _token_counter_lock:
+            if _token_counter is None:
+                _token_counter = MessageTokenCounter()
+    return _token_counter
+
+
+def record_prompt_tokens(thread_id: Optional[str], tokens: int) -> None:
+    """Record the prompt size of a turn of the given thread."""
+    if thread_id:
+        _prompt_token_trends.record(thread_id, tokens)
+
+
+def get_prompt_token_metrics() -> Dict[str, Any]:
+    """Return per-thread prompt token trends."""
+    return _prompt_token_trends.snapshot()
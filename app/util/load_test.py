@@ -0,0 +1,128 @@
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+import uuid
+from typing import Any, Dict, List
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def _summarize(latencies: List[float], wall_seconds: float) -> Dict[str, Any]:
+    """Latency percentiles, throughput and overlap of a run (overlap ~1 means requests were serialized)."""
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "wall_s": round(wall_seconds, 3),
+        "p50_ms": round(statistics.median(ordered) * 1000, 1),
+        "p95_ms": round(ordered[max(int(len(ordered) * 0.95) - 1, 0)] * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+        "throughput_rps": round(len(ordered) / wall_seconds, 2),
+        "overlap": round(sum(ordered) / wall_seconds, 2)
+    }
+
+
+async def _timed_post(client: httpx.AsyncClient, path: str, body: Dict[str, Any]) -> float:
+    start = time.perf_counter()
+    response = await client.post(path, json=body)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run_chat(base_url: str, conversations: int, message: str, timeout: float) -> Dict[str, Dict[str, Any]]:
+    """
+    Send one turn on each of several new threads, first one at a time, then all at once.
+
+    With a blocking pipeline the concurrent run takes as long as the sequential
+    one (overlap ~1); with the async pipeline the turns overlap and the wall
+    time approaches that of a single turn.
+    """
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        def body() -> Dict[str, Any]:
+            return {"message": message, "thread_id": f"load-test-{uuid.uuid4()}", "use_response_cache": False}
+
+        start = time.perf_counter()
+        sequential = [await _timed_post(client, "/chat/message", body()) for _ in range(conversations)]
+        sequential_wall = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent = await asyncio.gather(*(_timed_post(client, "/chat/message", body()) for _ in range(conversations)))
+        concurrent_wall = time.perf_counter() - start
+
+    return {"sequential": _summarize(sequential, sequential_wall),
+            "concurrent": _summarize(list(concurrent), concurrent_wall)}
+
+
+async def run_search(base_url: str, requests: int, concurrency: int, query: str, limit: int,
+                     timeout: float) -> Dict[str, Dict[str, Any]]:
+    """
+    Latency of /documents/search, one request at a time and with `concurrency` in flight.
+
+    The first request is sent separately and reported as "first": it includes
+    any per-process setup (client creation, collection check) still left on
+    the request path, which every request used to pay.
+    """
+    body = {"query": query, "limit": limit}
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        start = time.perf_counter()
+        first = await _timed_post(client, "/documents/search", body)
+        first_wall = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sequential = [await _timed_post(client, "/documents/search", body) for _ in range(requests)]
+        sequential_wall = time.perf_counter() - start
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited() -> float:
+            async with semaphore:
+                return await _timed_post(client, "/documents/search", body)
+
+        start = time.perf_counter()
+        concurrent = await asyncio.gather(*(limited() for _ in range(requests)))
+        concurrent_wall = time.perf_counter() - start
+
+    return {"first": _summarize([first], first_wall),
+            "sequential": _summarize(sequential, sequential_wall),
+            "concurrent": _summarize(list(concurrent), concurrent_wall)}
+
+
+def _print_results(results: Dict[str, Dict[str, Any]]) -> None:
+    columns = ["requests", "wall_s", "p50_ms", "p95_ms", "max_ms", "throughput_rps", "overlap"]
+    print("\t".join(["run"] + columns))
+    for name, summary in results.items():
+        print("\t".join([name] + [str(summary[column]) for column in columns]))
+
+
+def main() -> None:
+    """Load test a running API instance."""
+    parser = argparse.ArgumentParser(description="Load test the API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    subparsers = parser.add_subparsers(dest="scenario", required=True)
+
+    chat = subparsers.add_parser("chat", help="Concurrent conversations on /chat/message")
+    chat.add_argument("--conversations", type=int, default=8)
+    chat.add_argument("--message", default="¿Qué necesito para la revisión técnica de mi auto?")
+
+    search = subparsers.add_parser("search", help="Request latency on /documents/search")
+    search.add_argument("--requests", type=int, default=50)
+    search.add_argument("--concurrency", type=int, default=8)
+    search.add_argument("--query", default="requisitos de la revisión técnica")
+    search.add_argument("--limit", type=int, default=5)
+
+    args = parser.parse_args()
+    if args.scenario == "chat":
+        results = asyncio.run(run_chat(args.base_url, args.conversations, args.message, args.timeout))
+    else:
+        results = asyncio.run(run_search(args.base_url, args.requests, args.concurrency, args.query,
+                                         args.limit, args.timeout))
+    _print_results(results)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -0,0 +1,78 @@
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Sequence
+
+
+class Counters:
+    """
+    Thread-safe named counters for in-process metrics.
+    Snapshots are plain dictionaries so they can be returned by the API as-is.
+    """
+
+    def __init__(self, *names: str):
+        self._lock = threading.Lock()
+        self._values: Dict[str, int] = defaultdict(int)
+        for name in names:
+            self._values[name] = 0
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Add amount to the named counter."""
+        with self._lock:
+            self._values[name] += amount
+
+    def get(self, name: str) -> int:
+        """Return the current value of the named counter."""
+        with self._lock:
+            return self._values.get(name, 0)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return a copy of all counters."""
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        """Reset all counters to zero."""
+        with self._lock:
+            for name in self._values:
+                self._values[name] = 0
+
+
+class Histogram:
+    """
+    Thread-safe cumulative histogram (Prometheus-style buckets) for latencies.
+    """
+
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self._lock = threading.Lock()
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last bucket is +Inf
+        self._count = 0
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+            else:
+                self._counts[-1] += 1
+            self._count += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return cumulative bucket counts, count, sum and mean."""
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, count in zip(list(self.buckets) + ["+Inf"], self._counts):
+                running += count
+                cumulative[str(bound)] = running
+            return {
+                "buckets": cumulative,
+                "count": self._count,
+                "sum": round(self._sum, 4),
+                "mean": round(self._sum / self._count, 4) if self._count else 0.0
+            }
@@ -0,0 +1,58 @@
+"""
+Checkpoint round-trips per chat turn: reads, lists and writes counted by the
+instrumented checkpointer while turns run on a new thread through the chat
+service, each followed by one chat history request.
+
+    python -m benchmarks.checkpoint_io [--turns 5] [--message "..."]
+
+Runs against the configured Postgres checkpointer and chat model.
+"""
+import argparse
+import asyncio
+import logging
+import uuid
+from typing import Dict, List
+
+from app.database.instrumented_saver import get_checkpoint_metrics
+from app.services.chat_service import get_chat_history, process_message
+
+COUNTERS = ["reads", "lists", "writes", "write_batches"]
+
+
+async def run_turns(turns: int, messages: List[str]) -> List[Dict[str, int]]:
+    """Run turns on a new thread and return the checkpoint operations of each."""
+    thread_id = f"checkpoint-benchmark-{uuid.uuid4()}"
+    results = []
+    for turn in range(turns):
+        before = get_checkpoint_metrics()
+        result = await process_message(messages[turn % len(messages)], thread_id, is_resuming=turn > 0)
+        await get_chat_history(thread_id)
+        after = get_checkpoint_metrics()
+        results.append({
+            "turn": turn + 1,
+            "status": result.get("status"),
+            **{name: after.get(name, 0) - before.get(name, 0) for name in COUNTERS}
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Count checkpoint reads and writes per chat turn")
+    parser.add_argument("--turns", type=int, default=5, help="Turns to run on a new thread")
+    parser.add_argument("--message", action="append", help="Message to send (repeatable, cycled through turns)")
+    args = parser.parse_args()
+
+    messages = args.message or ["Hola, busco una camioneta para mi familia", "¿Cuánto cuesta la Hilux?"]
+    results = asyncio.run(run_turns(args.turns, messages))
+
+    columns = ["turn", "status"] + COUNTERS
+    print("\t".join(columns))
+    for row in results:
+        print("\t".join(str(row[column]) for column in columns))
+    for column in COUNTERS:
+        print(f"mean {column}/turn: {sum(row[column] for row in results) / len(results):.1f}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
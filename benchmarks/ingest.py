@@ -0,0 +1,163 @@
+"""
+Document ingestion throughput: extraction, chunking, embedding and upserts,
+timed per stage against in-memory Qdrant, with the embeddings called one
+chunk at a time (as before chunked, batched ingestion) and in concurrent
+batches (EMBEDDING_BATCH_SIZE, EMBEDDING_CONCURRENCY).
+
+    python -m benchmarks.ingest [file.pdf] [--pages 500] [--embeddings offline|openai]
+
+Without a path a PDF with --pages pages is generated. Offline embeddings are
+deterministic vectors returned after --embed-latency-ms per API call, which
+stands in for the embeddings round-trip without an API key.
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, Dict, List
+from unittest import mock
+from uuid import uuid4
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
+
+from app.services import document_service
+from app.services.document_service import DocumentService
+from app.util.text_extractor import TextExtractor
+
+VECTOR_SIZE = 1536
+_PAGE_LINES = [
+    "La revision tecnica vehicular verifica frenos, luces, emisiones, suspension y direccion.",
+    "Las plantas atienden de lunes a sabado de 7:00am a 9:00pm y los domingos hasta las 2:00pm.",
+    "El certificado tiene vigencia anual y debe presentarse junto con la tarjeta de propiedad.",
+    "Los vehiculos de transporte publico pasan la inspeccion cada seis meses.",
+] * 10
+
+
+class OfflineEmbeddings:
+    """Deterministic vectors, returned after a fixed delay per call like an embeddings API."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    @staticmethod
+    def _vector(text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [digest[i % len(digest)] / 255.0 + 0.001 for i in range(VECTOR_SIZE)]
+
+
+def synthetic_pdf(pages: int) -> bytes:
+    """A PDF with `pages` pages of text in a standard font, extractable by PyPDF2."""
+    text = " ".join(f"({line}) Tj T*" for line in _PAGE_LINES)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"",
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        stream = f"BT /F1 10 Tf 12 TL 40 800 Td (Pagina {page + 1}) Tj T* {text} ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+                       b"/Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % kid for kid in kids), pages)
+
+    output, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+async def run_ingest(file_content: bytes, mime_type: str, embeddings=None) -> Dict[str, Any]:
+    """
+    Run the ingestion stages on one document against in-memory Qdrant and time each stage.
+    embeddings replaces the service's OpenAI embeddings when given.
+    """
+    async_client = AsyncQdrantClient(":memory:")
+    if embeddings is None:
+        service = DocumentService(qdrant_client=QdrantClient(":memory:"), async_qdrant_client=async_client)
+    else:
+        with mock.patch.object(document_service, "get_cached_embeddings", lambda: embeddings):
+            service = DocumentService(qdrant_client=QdrantClient(":memory:"), async_qdrant_client=async_client)
+    await async_client.create_collection(
+        collection_name=service.collection_name,
+        vectors_config=models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE)
+    )
+
+    timings = {}
+    start = time.perf_counter()
+    text_content = await asyncio.to_thread(TextExtractor.extract_text_content, file_content, mime_type)
+    timings["extract_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    chunks = await asyncio.to_thread(service.text_splitter.split_text, text_content)
+    timings["split_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectors = await service._embed_chunks(chunks)
+    timings["embed_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await service._upsert_points([
+        models.PointStruct(id=str(uuid4()), vector=vector, payload={"content": chunk})
+        for chunk, vector in zip(chunks, vectors)
+    ])
+    timings["upsert_s"] = time.perf_counter() - start
+    await async_client.close()
+
+    total = sum(timings.values())
+    return {
+        "characters": len(text_content),
+        "chunks": len(chunks),
+        **{name: round(seconds, 3) for name, seconds in timings.items()},
+        "total_s": round(total, 3),
+        "chunks_per_s": round(len(chunks) / total, 1) if total else 0.0
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark document ingestion throughput")
+    parser.add_argument("path", nargs="?", help="PDF to ingest; a generated PDF if omitted")
+    parser.add_argument("--pages", type=int, default=500, help="Pages of the generated PDF")
+    parser.add_argument("--embeddings", choices=["offline", "openai"], default="offline")
+    parser.add_argument("--embed-latency-ms", type=float, default=100.0,
+                        help="Delay per call of the offline embeddings")
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, "rb") as file:
+            file_content = file.read()
+    else:
+        file_content = synthetic_pdf(args.pages)
+
+    def embeddings():
+        return OfflineEmbeddings(args.embed_latency_ms / 1000) if args.embeddings == "offline" else None
+
+    runs = {}
+    with mock.patch.object(document_service, "EMBEDDING_BATCH_SIZE", 1), \
+            mock.patch.object(document_service, "EMBEDDING_CONCURRENCY", 1):
+        runs["one chunk per call"] = asyncio.run(run_ingest(file_content, "application/pdf", embeddings()))
+    runs[f"batches of {document_service.EMBEDDING_BATCH_SIZE}, "
+         f"{document_service.EMBEDDING_CONCURRENCY} in flight"] = asyncio.run(
+        run_ingest(file_content, "application/pdf", embeddings())
+    )
+
+    print(f"{len(file_content)} bytes, {args.embeddings} embeddings"
+          + (f" ({args.embed_latency_ms:g} ms per call)" if args.embeddings == "offline" else ""))
+    columns = ["chunks", "extract_s", "split_s", "embed_s", "upsert_s", "total_s", "chunks_per_s"]
+    print("\t".join(["run"] + columns))
+    for name, result in runs.items():
+        print("\t".join([name] + [str(result[column]) for column in columns]))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
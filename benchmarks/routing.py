@@ -0,0 +1,124 @@
+"""
+Nearest-plant routing latency: one lookup routes every plant, timed against a
+local stub of the Mapbox API for the per-plant loop calculate_distances used
+before the Matrix API, a single Matrix request, and the async Directions
+fallback (ROUTING_MAX_CONCURRENCY requests in flight).
+
+    python -m benchmarks.routing [--lookups 20] [--latency-ms 50]
+
+The stub answers every request after --latency-ms, which stands in for the
+Mapbox round-trip without an access token or network access.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List
+from unittest import mock
+
+import httpx
+
+from app.config.settings import ROUTING_MAX_CONCURRENCY, ROUTING_TIMEOUT
+from app.services import location_services_map_box
+from app.services.location_provider import RouteMap
+from app.services.location_services_map_box import MapboxLocationProvider, _directions_request
+from app.services.plant_registry import PLANTS, Plant
+
+ORIGIN = (-12.0464, -77.0428)  # Lima centro
+
+
+class StubMapboxHandler(BaseHTTPRequestHandler):
+    """Answers Directions and Matrix requests after a fixed delay, standing in for the Mapbox API."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, as the real API
+    disable_nagle_algorithm = True
+    latency = 0.05  # seconds per request
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        path = self.path.split("?", 1)[0]
+        destinations = path.rsplit("/", 1)[-1].count(";")
+        if path.startswith("/directions-matrix/"):
+            body = {"code": "Ok",
+                    "distances": [[1000.0 * (i + 1) for i in range(destinations)]],
+                    "durations": [[120.0 * (i + 1) for i in range(destinations)]]}
+        else:
+            body = {"code": "Ok", "routes": [{"distance": 1000.0, "duration": 120.0}]}
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def legacy_route(base_url: str, origin_lat: float, origin_lng: float, plants: List[Plant]) -> RouteMap:
+    """The per-plant loop calculate_distances used before the Matrix API: one blocking request per plant."""
+    routes: RouteMap = {}
+    for plant in plants:
+        path, params = _directions_request(origin_lat, origin_lng, plant)
+        data = httpx.get(f"{base_url}{path}", params=params, timeout=ROUTING_TIMEOUT).json()
+        route = data["routes"][0]
+        routes[plant.id] = (route["distance"], route["duration"])
+    return routes
+
+
+def time_lookups(lookup: Callable[[], RouteMap], lookups: int) -> List[float]:
+    timings = []
+    for _ in range(lookups):
+        start = time.perf_counter()
+        lookup()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def atime_directions(provider: MapboxLocationProvider, plants: List[Plant], lookups: int) -> List[float]:
+    timings = []
+    for _ in range(lookups):
+        semaphore = asyncio.Semaphore(ROUTING_MAX_CONCURRENCY)
+        start = time.perf_counter()
+        await asyncio.gather(*(provider._adirections(semaphore, *ORIGIN, plant) for plant in plants))
+        timings.append(time.perf_counter() - start)
+    await provider.aclose()
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark plant routing against a stub Mapbox server")
+    parser.add_argument("--lookups", type=int, default=20, help="Lookups per strategy")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Stub server delay per request")
+    args = parser.parse_args()
+
+    StubMapboxHandler.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubMapboxHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    plants = list(PLANTS.values())
+    try:
+        # The provider builds its clients from the module's base URL on first use
+        with mock.patch.object(location_services_map_box, "MAPBOX_BASE_URL", base_url):
+            provider = MapboxLocationProvider()
+            results = {
+                "legacy loop": time_lookups(lambda: legacy_route(base_url, *ORIGIN, plants), args.lookups),
+                "matrix": time_lookups(lambda: provider.route(*ORIGIN, plants), args.lookups),
+                "async directions": asyncio.run(atime_directions(provider, plants, args.lookups))
+            }
+    finally:
+        server.shutdown()
+
+    print(f"{len(plants)} plants, {args.latency_ms:g} ms per stub request, {args.lookups} lookups")
+    for name, timings in results.items():
+        print(f"{name}: p50 {statistics.median(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -1,13 +1,21 @@
+import asyncio
 import logging
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers import chat, documents
+from app.routers import chat, documents, metrics
 from app.config.settings import API_HOST, API_PORT, API_WORKERS, LOG_LEVEL
 from app.database.postgres import check_postgres_connection, close_postgres_connections
-from app.database.engine import close_connections
 from app.database.init_db import init_db
+from app.database.checkpoint_maintenance import start_checkpoint_maintenance, stop_checkpoint_maintenance
+from app.graph.chat_graph import warm_up_chat_graph, clear_chat_graph_cache
+from app.services.chat_service import stop_compactions
+from app.services.llm_service import close_llm_clients
+from app.services.district_matrix import start_district_matrix, stop_district_matrix
+from app.services.location_provider import get_location_service, close_location_service
+from app.services.ingestion_service import start_ingestion_service, stop_ingestion_service
+from app.services.service_container import get_service_container, get_document_service
 
 # Setup logging
 logging_level = getattr(logging, LOG_LEVEL.upper(), logging.INFO)
@@ -36,6 +44,7 @@ app.add_middleware(
 # Include routers
 app.include_router(chat.router)
 app.include_router(documents.router)  # Add the documents router
+app.include_router(metrics.router)
 
 
 @app.get("/health")
@@ -52,6 +61,7 @@ def health_check():
     return {
         "status": "healthy",
         "database": db_status,
+        "services": get_service_container().health(),
         "version": "1.0.0"
     }
 
@@ -70,6 +80,30 @@ async def startup_event():
         else:
             logger.error("PostgreSQL connection failed")
 
+        # Create the shared service clients (Qdrant, embeddings, Drive) once
+        logger.info("Starting service container...")
+        await asyncio.to_thread(get_service_container().start)
+
+        # Compile the chat graph once so the first request doesn't pay for it
+        logger.info("Warming up chat graph...")
+        await warm_up_chat_graph()
+
+        # Resolve the known districts once so user lookups don't hit the geocoder
+        logger.info("Preloading district coordinates...")
+        await asyncio.to_thread(get_location_service().preload_district_coordinates)
+
+        # Load the precomputed district x plant matrix and schedule its refresh
+        logger.info("Loading district distance matrix...")
+        await start_district_matrix()
+
+        # Schedule archival of expired threads and pruning of superseded checkpoints
+        logger.info("Scheduling checkpoint maintenance...")
+        await start_checkpoint_maintenance()
+
+        # Start the background document ingestion workers
+        logger.info("Starting ingestion workers...")
+        await start_ingestion_service(get_document_service)
+
     except Exception as e:
         logger.error(f"Error initializing services: {str(e)}")
         # We don't want to crash the app if services fail to initialize
@@ -81,11 +115,32 @@ async def shutdown_event():
     """Clean up resources on shutdown"""
     logger.info("Application shutting down")
 
-    # Close PostgreSQL connections
-    close_postgres_connections()
+    # Stop the ingestion workers before their connections go away
+    await stop_ingestion_service()
+
+    # Cancel the scheduled district matrix refresh
+    await stop_district_matrix()
+
+    # Cancel pending conversation compactions before their connections go away
+    await stop_compactions()
+
+    # Cancel the scheduled checkpoint maintenance
+    await stop_checkpoint_maintenance()
+
+    # Compiled graphs hold references to the pooled saver/store
+    clear_chat_graph_cache()
+
+    # Close the PostgreSQL pools (checkpointer, store and SQLAlchemy engines)
+    await close_postgres_connections()
+
+    # Close the shared LLM HTTP clients
+    await close_llm_clients()
+
+    # Close the location providers' HTTP clients
+    await close_location_service()
 
-    # Close SQLAlchemy connections
-    close_connections()
+    # Close the shared service clients
+    await get_service_container().shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+"""
+DocumentService against Qdrant's local in-memory mode: chunking, batched
+upserts and filtered deletes, through both the sync and async clients.
+Embeddings are deterministic vectors, so no API calls are made.
+"""
+import hashlib
+from typing import List
+
+import pytest
+import pytest_asyncio
+
+document_service = pytest.importorskip("app.services.document_service")
+from qdrant_client import QdrantClient, AsyncQdrantClient  # noqa: E402
+from qdrant_client.http import models  # noqa: E402
+
+VECTOR_SIZE = 1536
+
+
+def _vector(text: str) -> List[float]:
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [digest[i % len(digest)] / 255.0 + 0.001 for i in range(VECTOR_SIZE)]
+
+
+class FakeEmbeddings:
+    """Deterministic embeddings that record the size of each batch."""
+
+    def __init__(self):
+        self.batches: List[int] = []
+
+    def embed_query(self, text: str) -> List[float]:
+        return _vector(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return _vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.batches.append(len(texts))
+        return [_vector(text) for text in texts]
+
+
+@pytest_asyncio.fixture
+async def service(monkeypatch):
+    monkeypatch.delenv("GOOGLE_APPLICATION_CREDENTIALS", raising=False)
+    monkeypatch.setattr(document_service, "get_cached_embeddings", FakeEmbeddings)
+    monkeypatch.setattr(document_service, "EMBEDDING_BATCH_SIZE", 4)
+    monkeypatch.setattr(document_service, "QDRANT_UPSERT_BATCH_SIZE", 3)
+
+    async_client = AsyncQdrantClient(":memory:")
+    service = document_service.DocumentService(qdrant_client=QdrantClient(":memory:"),
+                                               async_qdrant_client=async_client)
+    # In-memory clients don't share storage: create the collection on the async one too
+    await async_client.create_collection(
+        collection_name=service.collection_name,
+        vectors_config=models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE)
+    )
+    yield service
+    await async_client.close()
+    service.qdrant_client.close()
+
+
+def _long_text(paragraphs: int = 40) -> bytes:
+    paragraph = ("La revisión técnica vehicular verifica frenos, luces, emisiones y suspensión. "
+                 "Las plantas atienden de lunes a sábado y el certificado tiene vigencia anual. ") * 8
+    return "\n\n".join(f"Sección {i}. {paragraph}" for i in range(paragraphs)).encode("utf-8")
+
+
+async def _count(client: AsyncQdrantClient, collection: str, document_id: str) -> int:
+    result = await client.count(
+        collection_name=collection,
+        count_filter=models.Filter(must=[models.FieldCondition(
+            key="metadata.parent_document_id", match=models.MatchValue(value=document_id)
+        )]),
+        exact=True
+    )
+    return result.count
+
+
+@pytest.mark.asyncio
+async def test_upload_splits_into_linked_chunks(service):
+    result = await service.upload_document("manual.txt", _long_text(), "text/plain", metadata={"topic": "rtv"})
+
+    assert result["chunk_count"] > 1
+    assert await _count(service.async_qdrant_client, service.collection_name,
+                        result["document_id"]) == result["chunk_count"]
+
+    points, _ = await service.async_qdrant_client.scroll(
+        collection_name=service.collection_name, limit=1000, with_payload=True
+    )
+    metadata = sorted((point.payload["metadata"] for point in points), key=lambda item: item["chunk_index"])
+    assert [item["chunk_index"] for item in metadata] == list(range(result["chunk_count"]))
+    assert all(item["chunk_count"] == result["chunk_count"] and item["topic"] == "rtv" for item in metadata)
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_embedded_in_batches(service):
+    result = await service.upload_document("manual.txt", _long_text(), "text/plain")
+
+    batches = service.embeddings.batches
+    assert sum(batches) == result["chunk_count"]
+    assert max(batches) <= 4
+    assert len(batches) == -(-result["chunk_count"] // 4)
+
+
+@pytest.mark.asyncio
+async def test_upload_with_the_same_document_id_overwrites_chunks(service):
+    document_id = "5f0c2a6e-3b1d-4c8e-9a7f-2d6b8e4c1a30"
+    first = await service.upload_document("manual.txt", _long_text(), "text/plain", document_id=document_id)
+    second = await service.upload_document("manual.txt", _long_text(), "text/plain", document_id=document_id)
+
+    assert first["document_id"] == second["document_id"] == document_id
+    assert await _count(service.async_qdrant_client, service.collection_name, document_id) == first["chunk_count"]
+
+
+@pytest.mark.asyncio
+async def test_empty_document_is_rejected(service):
+    result = await service.upload_document("empty.txt", b"   ", "text/plain")
+    assert "error" in result
+
+
+@pytest.mark.asyncio
+async def test_async_search_returns_chunks(service):
+    await service.upload_document("manual.txt", _long_text(5), "text/plain")
+
+    results = await service.asearch_documents("frenos y luces", limit=3)
+
+    assert 0 < len(results) <= 3
+    assert all(result["content"] and "parent_document_id" in result["metadata"] for result in results)
+
+
+@pytest.mark.asyncio
+async def test_delete_removes_only_that_documents_chunks(service):
+    first = await service.upload_document("a.txt", _long_text(), "text/plain")
+    second = await service.upload_document("b.txt", _long_text(), "text/plain")
+
+    assert await service.adelete_document(first["document_id"])
+
+    assert await _count(service.async_qdrant_client, service.collection_name, first["document_id"]) == 0
+    assert await _count(service.async_qdrant_client, service.collection_name,
+                        second["document_id"]) == second["chunk_count"]
+
+
+@pytest.mark.asyncio
+async def test_sync_delete_removes_pre_chunking_documents(service):
+    # Documents stored before chunking are a single point whose ID is the document ID
+    legacy_id = "0b5e8d52-6a8c-4f38-9b8a-3f4a7c1d2e90"
+    service.qdrant_client.upsert(collection_name=service.collection_name, points=[
+        models.PointStruct(id=legacy_id, vector=_vector("legacy"),
+                           payload={"content": "legacy", "metadata": {"name": "old.txt"}, "type": "document"})
+    ])
+
+    assert service.delete_document(legacy_id)
+
+    assert service.qdrant_client.count(collection_name=service.collection_name, exact=True).count == 0
+
+
+@pytest.mark.asyncio
+async def test_sync_search_returns_chunks(service):
+    texts = ["frenos y luces", "vigencia del certificado"]
+    service.qdrant_client.upsert(collection_name=service.collection_name, points=[
+        models.PointStruct(id=index, vector=_vector(text), payload={"content": text, "metadata": {}})
+        for index, text in enumerate(texts)
+    ])
+
+    results = service.search_documents("frenos y luces", limit=1)
+
+    assert [result["content"] for result in results] == ["frenos y luces"]
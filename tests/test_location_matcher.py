@@ -0,0 +1,109 @@
+"""
+Correctness suite for the compiled district matcher, checked against the
+substring matcher it replaced, plus a micro-benchmark:
+
+    python -m tests.test_location_matcher
+"""
+import timeit
+
+import pytest
+
+from app.services.location_matcher import DISTRICTS, extract_location_from_message, find_districts
+
+
+def legacy_extract_location(message: str) -> str:
+    """extract_location_from_message before the compiled matcher (substring scans)."""
+    message = message.lower()
+
+    for keyword, district in DISTRICTS.items():
+        if keyword in message:
+            return district
+
+    for phrase in ["cerca de", "en", "por", "próximo a", "proximo a", "cercano a"]:
+        if phrase in message:
+            start_idx = message.find(phrase) + len(phrase)
+            end_idx = min(start_idx + 30, len(message))
+            location_text = message[start_idx:end_idx].strip()
+
+            for filler in ["mi", "la", "el", "los", "las", "ubicación", "ubicacion"]:
+                location_text = location_text.replace(f" {filler} ", " ")
+
+            if len(location_text) > 3:
+                return location_text
+
+    return ""
+
+
+# Messages both matchers must resolve the same way
+SAME_AS_LEGACY = [
+    "¿Tienen planta en San Juan de Lurigancho?",
+    "vivo en sjl, cuál me queda más cerca",
+    "Estoy en Lurigancho",
+    "planta cerca de mi casa en Comas",
+    "Soy de Carabayllo",
+    "¿Hay alguna planta en Jicamarca?",
+    "Estoy por Chosica",
+    "vivo en Santa Eulalia",
+    "Trabajo en el Callao",
+    "Estoy en Ate",
+    "Vivo en Huaycán",
+    "por Naranjal o Independencia",
+    "cerca de San Luis",
+    "Vivo en San Juan de Miraflores",
+    "Atocongo queda cerca",
+    "Vivo en Santiago de Surco",
+    "Estoy en Villa María",
+    "planta en vmt",
+    "¿Cuál es la planta de Lurín?",
+    "Vivo en Lurín cerca del mercado",
+    "Estoy por Ate y Comas",
+    "Vivo en Surco pero trabajo en Callao",
+    "cerca de mi casa en Los Olivos",
+    "Quiero ir próximo a Miraflores",
+    "Estoy proximo a la Av. Javier Prado",
+    "¿Dónde puedo hacer la revisión técnica?",
+    "quiero una camioneta",
+    "Hola",
+    "",
+]
+
+# Deliberate differences: keywords inside other words, non-places after a phrase
+EXPECTED_CHANGES = {
+    "me gusta el chocolate": "",  # legacy: "ate"
+    "busco una planta cercano a Puente Piedra": "puente piedra",  # legacy: "te piedra" ("en" in "puente")
+    "¿Atienden los domingos?": "",  # legacy: "den domingos?"
+    "precio en soles": "",  # legacy: "soles", then geocoded
+    "pago en efectivo por favor": "",  # legacy: "efectivo por favor"
+}
+
+
+@pytest.mark.parametrize("message", SAME_AS_LEGACY)
+def test_matches_legacy(message):
+    assert extract_location_from_message(message) == legacy_extract_location(message)
+
+
+@pytest.mark.parametrize("message,expected", EXPECTED_CHANGES.items())
+def test_expected_changes(message, expected):
+    assert extract_location_from_message(message) == expected
+
+
+def test_find_districts_returns_positions():
+    message = "Estoy por Ate y Comas, cerca de Lurín"
+    matches = find_districts(message)
+    assert [match.district for match in matches] == ["ate", "carabayllo", "lurin"]
+    assert [message[match.start:match.end] for match in matches] == ["Ate", "Comas", "Lurín"]
+
+
+def test_multiword_keyword_spans_whitespace():
+    assert extract_location_from_message("vivo en san  juan de\tlurigancho") == "san juan de lurigancho"
+
+
+def _benchmark(number: int = 2000) -> None:
+    corpus = SAME_AS_LEGACY + list(EXPECTED_CHANGES)
+    for name, matcher in [("legacy", legacy_extract_location), ("compiled", extract_location_from_message)]:
+        seconds = timeit.timeit(lambda: [matcher(message) for message in corpus], number=number)
+        print(f"{name}: {seconds / (number * len(corpus)) * 1e6:.2f} µs/message")
+
+
+if __name__ == "__main__":
+    _benchmark()
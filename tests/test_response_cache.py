@@ -0,0 +1,103 @@
+"""
+The semantic response cache in front of generate_response: answers are shared
+across threads only for turns that don't depend on a thread's history.
+Embeddings and the chat model are fakes, so no API calls are made.
+"""
+import hashlib
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+nodes = pytest.importorskip("app.graph.nodes")
+from langchain_core.language_models.fake_chat_models import FakeListChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+from app.services.response_cache import InMemoryResponseCacheBackend, SemanticResponseCache  # noqa: E402
+
+CONTEXT = "La revisión técnica de autos particulares cuesta S/ 120 en todas las plantas."
+
+
+class FakeEmbeddings:
+    """Deterministic query embeddings: identical texts get identical vectors."""
+
+    def embed_query(self, text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [byte / 255.0 + 0.001 for byte in digest]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    embeddings = FakeEmbeddings()
+    cache = SemanticResponseCache(embeddings, InMemoryResponseCacheBackend())
+    monkeypatch.setattr(nodes, "get_response_cache", lambda embeddings: cache)
+    monkeypatch.setattr(nodes, "get_document_service", lambda: SimpleNamespace(embeddings=embeddings))
+    return cache
+
+
+def _use_llm(monkeypatch, *responses: str) -> None:
+    monkeypatch.setattr(nodes, "get_llm", lambda: FakeListChatModel(responses=list(responses)))
+
+
+def _state(**thread_state):
+    return {"input": "¿y cuánto cuesta?", "context": CONTEXT, "messages": [], **thread_state}
+
+
+def _config(thread_id: str):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def test_stateless_turns_share_answers(cache, monkeypatch):
+    _use_llm(monkeypatch, "Cuesta S/ 120.")
+    first = nodes.generate_response(_state(), _config("thread-a"))
+
+    _use_llm(monkeypatch, "should not be called")
+    second = nodes.generate_response(_state(input="Y cuánto cuesta"), _config("thread-b"))
+
+    assert first["answer"] == second["answer"] == "Cuesta S/ 120."
+    assert cache.metrics.snapshot()["hits"] == 1
+
+
+def test_threads_with_different_history_do_not_share_entries(cache, monkeypatch):
+    history_a = [HumanMessage(content="Tengo un Corolla 2015"), AIMessage(content="Perfecto.")]
+    history_b = [HumanMessage(content="Tengo una camioneta Hilux"), AIMessage(content="Perfecto.")]
+
+    _use_llm(monkeypatch, "Para su Corolla cuesta S/ 120.")
+    first = nodes.generate_response(_state(messages=history_a), _config("thread-a"))
+    _use_llm(monkeypatch, "Para su Hilux cuesta S/ 150.")
+    second = nodes.generate_response(_state(messages=history_b), _config("thread-b"))
+
+    assert first["answer"] == "Para su Corolla cuesta S/ 120."
+    assert second["answer"] == "Para su Hilux cuesta S/ 150."
+    assert cache.backend.size() == 0
+    assert cache.metrics.snapshot()["hits"] == 0
+
+
+@pytest.mark.parametrize("thread_state", [
+    {"summary": "El cliente tiene un Corolla 2015."},
+    {"vehicle_info": {"name": "Corolla"}},
+])
+def test_turns_with_thread_state_skip_the_cache(cache, monkeypatch, thread_state):
+    _use_llm(monkeypatch, "Cuesta S/ 120.")
+    nodes.generate_response(_state(), _config("thread-a"))
+
+    _use_llm(monkeypatch, "Para su Corolla cuesta S/ 120.")
+    result = nodes.generate_response(_state(**thread_state), _config("thread-b"))
+
+    assert result["answer"] == "Para su Corolla cuesta S/ 120."
+    assert cache.backend.size() == 1
+
+
+@pytest.mark.asyncio
+async def test_async_path_skips_stateful_turns(cache, monkeypatch):
+    _use_llm(monkeypatch, "Cuesta S/ 120.")
+    await nodes.agenerate_response(_state(), _config("thread-a"))
+
+    _use_llm(monkeypatch, "Para su Corolla cuesta S/ 120.")
+    history = [HumanMessage(content="Tengo un Corolla 2015"), AIMessage(content="Perfecto.")]
+    result = await nodes.agenerate_response(_state(messages=history), _config("thread-b"))
+
+    assert result["answer"] == "Para su Corolla cuesta S/ 120."
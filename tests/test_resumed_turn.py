@@ -0,0 +1,77 @@
+"""
+Turns resumed from human_feedback: the previous turn's context isn't kept in
+the checkpoint, so generate_response retrieves context for the feedback.
+Retrieval and the chat model are fakes, so no API calls are made.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+nodes = pytest.importorskip("app.graph.nodes")
+from langchain_core.language_models.fake_chat_models import FakeListChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+CONTEXT = "La planta de Lurín atiende de lunes a sábado de 7:00am a 9:00pm."
+
+
+@pytest.fixture
+def retrievals(monkeypatch):
+    """Record the inputs context is retrieved for; retrieval returns CONTEXT."""
+    monkeypatch.setattr(nodes, "get_llm", lambda: FakeListChatModel(responses=["Atiende hasta las 9:00pm."]))
+    monkeypatch.setattr(nodes, "get_response_cache", lambda embeddings: None)
+    monkeypatch.setattr(nodes, "get_document_service", lambda: SimpleNamespace(embeddings=None))
+
+    retrievals = []
+
+    def retrieve(state):
+        retrievals.append(state["input"])
+        return {"context": CONTEXT}
+
+    async def aretrieve(state):
+        return retrieve(state)
+
+    async def aclassify(state):
+        return {"route": "plant_tariff"}
+
+    monkeypatch.setattr(nodes, "classify_route", lambda state: {"route": "plant_tariff"})
+    monkeypatch.setattr(nodes, "retrieve_context", retrieve)
+    monkeypatch.setattr(nodes, "aclassify_route", aclassify)
+    monkeypatch.setattr(nodes, "aretrieve_context", aretrieve)
+    return retrievals
+
+
+def _resumed_state():
+    # What generate_response sees after human_feedback: the previous answer, no context
+    return {
+        "input": "¿y la de Lurín hasta qué hora atiende?",
+        "context": "",
+        "answer": "La planta SJL atiende hasta las 9:00pm.",
+        "messages": [HumanMessage(content="¿Hasta qué hora atiende SJL?"),
+                     AIMessage(content="La planta SJL atiende hasta las 9:00pm.")]
+    }
+
+
+def test_resumed_turn_retrieves_context_for_the_feedback(retrievals):
+    result = nodes.generate_response(_resumed_state(), {"configurable": {"thread_id": "t"}})
+
+    assert retrievals == ["¿y la de Lurín hasta qué hora atiende?"]
+    assert result["answer"] == "Atiende hasta las 9:00pm."
+    # Still not kept in the checkpoint
+    assert result["context"] == ""
+
+
+@pytest.mark.asyncio
+async def test_async_resumed_turn_retrieves_context(retrievals):
+    result = await nodes.agenerate_response(_resumed_state(), {"configurable": {"thread_id": "t"}})
+
+    assert retrievals == ["¿y la de Lurín hasta qué hora atiende?"]
+    assert result["answer"] == "Atiende hasta las 9:00pm."
+
+
+def test_new_turn_uses_the_context_already_retrieved(retrievals):
+    state = {"input": "¿Hasta qué hora atiende SJL?", "context": "SJL atiende hasta las 9:00pm.",
+             "answer": "", "messages": []}
+
+    nodes.generate_response(state, {"configurable": {"thread_id": "t"}})
+
+    assert retrievals == []